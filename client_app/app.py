@@ -1,286 +1,381 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from utils.data_loader import load_multiple_excels
-from utils.processor import process_data, build_global_summary, prepare_yoy_data
-from utils.plotter import plot_yoy_comparison, plot_channel_breakdown, plot_volume_mix, plot_yearly_totals
-from utils.exporter import export_to_excel, export_clientes_y_sabores
+from utils.data_loader import cached_plan_index
+from utils.processor import build_global_summary, cached_yoy_data
+from utils.cube import load_sales_cube
+from utils.channel_rules import rules_version
+from utils.filter_index import cached_filter_index
+from utils.result_cache import result_cache, data_key, filter_key
 from utils.license_manager import LicenseManager
+from utils.cache import cache_stats, clear_cache, upload_fingerprints
+from utils.catalog import clear_catalog
+from utils.config import LOAD_MODE_DEFAULT
+from utils.metrics import span
+
+
+def main():
+    st.set_page_config(page_title="📊 Dashboard CCU", layout="wide")
+
+    # ===== VERIFICACIÓN DE LICENCIA =====
+    license_manager = LicenseManager()
+    if not license_manager.require_valid_license():
+        st.stop()
+
+    st.title("📊 Dashboard CCU - Consolidado Global")
+
+    # Caché en disco de archivos ya parseados
+    with st.sidebar:
+        st.markdown("### 🗄️ Caché de archivos")
+        n_archivos, tamano_cache = cache_stats()
+        st.caption(f"{n_archivos} archivos en caché ({tamano_cache / 1024 / 1024:.1f} MB)")
+        if st.button("🗑️ Limpiar caché", help="Borra los archivos ya parseados; se volverán a leer del Excel"):
+            clear_cache()
+            clear_catalog()
+            result_cache().clear()
+            st.cache_data.clear()
+            st.rerun()
+
+        st.markdown("### 📂 Origen de datos")
+        modos_carga = {
+            "archivos": "Archivos subidos",
+            "streaming": "Archivos subidos (streaming)",
+            "historico": "Histórico local",
+        }
+        modo_carga = st.radio(
+            "Modo de carga",
+            list(modos_carga),
+            index=list(modos_carga).index(LOAD_MODE_DEFAULT) if LOAD_MODE_DEFAULT in modos_carga else 0,
+            format_func=modos_carga.get,
+            help="Streaming: lee los archivos por bloques y los agrega por cliente, producto y mes "
+                 "(mucha menos memoria; la vista previa muestra los datos agregados). "
+                 "Histórico local: guarda lo ya procesado por año/mes y solo procesa los archivos nuevos."
+        )
+        if modo_carga == "historico":
+            from utils.store import list_partitions, clear_store
+            particiones = list_partitions()
+            st.caption(f"{len(particiones)} meses en el histórico")
+            if st.button("🗑️ Borrar histórico"):
+                clear_store()
+                result_cache().clear()
+                st.cache_data.clear()
+                st.rerun()
+
+    uploaded_files = st.file_uploader("📁 Subí archivos Excel:", type=["xls", "xlsx", "xlsb"], accept_multiple_files=True)
+
+    # Filtros de fecha
+    col1, col2 = st.columns(2)
+    with col1:
+        date_from = st.date_input("📅 Desde:", value=datetime(2024, 1, 1))
+    with col2:
+        date_to = st.date_input("📅 Hasta:", value=datetime.today())
 
-st.set_page_config(page_title="📊 Dashboard CCU", layout="wide")
-
-# ===== VERIFICACIÓN DE LICENCIA =====
-license_manager = LicenseManager()
-if not license_manager.require_valid_license():
-    st.stop()
-
-st.title("📊 Dashboard CCU - Consolidado Global")
-
-uploaded_files = st.file_uploader("📁 Subí archivos Excel:", type=["xls", "xlsx", "xlsb"], accept_multiple_files=True)
-
-# Filtros de fecha
-col1, col2 = st.columns(2)
-with col1:
-    date_from = st.date_input("📅 Desde:", value=datetime(2024, 1, 1))
-with col2:
-    date_to = st.date_input("📅 Hasta:", value=datetime.today())
-
-# Parámetros manuales
-st.markdown("### ✍️ Parámetros de proyección")
-col1, col2, col3 = st.columns(3)
-with col1:
-    salidas_mes = st.number_input("📆 Salidas del mes", min_value=1, value=20)
-with col2:
-    salidas_actuales = st.number_input("📆 Salidas hasta hoy", min_value=1, value=10)
-with col3:
-    cartera_manual = st.number_input("👥 Cartera", min_value=0, value=1000)
-
-if uploaded_files:
-    df, planes_data = load_multiple_excels(uploaded_files)
-
-    # Excluir las familias 'POP' y 'PALLETS' de todos los análisis
-    if 'Grupo' in df.columns:
-        familias_a_excluir = ['POP', 'PALLETS']
-        df = df[~df['Grupo'].isin(familias_a_excluir)].copy()
-
-    st.subheader("🔍 Vista previa datos crudos")
-    st.dataframe(df.head(10))
-
-    df = process_data(df, date_from, date_to)
-
-    # 🔧 Filtros dinámicos
-    st.markdown("### 🔎 Filtros de análisis")
-
-    # --- Lógica de Filtros ---
-    df_para_filtros = df.copy()
-    filtros_activos = []
-
+    # Parámetros manuales
+    st.markdown("### ✍️ Parámetros de proyección")
     col1, col2, col3 = st.columns(3)
-
     with col1:
-        familia_options = sorted(df_para_filtros['Grupo'].dropna().unique())
-        familia = st.multiselect("Familia", familia_options)
-        if familia:
-            df_para_filtros = df_para_filtros[df_para_filtros["Grupo"].isin(familia)]
-            filtros_activos.append('familia')
-
-        canal_options = sorted(df_para_filtros['Canal'].dropna().unique())
-        canal = st.multiselect("Canal", canal_options)
-        if canal:
-            df_para_filtros = df_para_filtros[df_para_filtros["Canal"].isin(canal)]
-            filtros_activos.append('canal')
-
+        salidas_mes = st.number_input("📆 Salidas del mes", min_value=1, value=20)
     with col2:
-        marca_options = sorted(df_para_filtros['Marcas'].dropna().unique())
-        marca = st.multiselect("Marca", marca_options)
-        if marca:
-            df_para_filtros = df_para_filtros[df_para_filtros["Marcas"].isin(marca)]
-            filtros_activos.append('marca')
-
-        supervisor_options = sorted(df_para_filtros['NomSupervisor'].dropna().unique())
-        supervisor = st.multiselect("Supervisor", supervisor_options)
-        if supervisor:
-            df_para_filtros = df_para_filtros[df_para_filtros["NomSupervisor"].isin(supervisor)]
-            filtros_activos.append('supervisor')
-
+        salidas_actuales = st.number_input("📆 Salidas hasta hoy", min_value=1, value=10)
     with col3:
-        # Lógica híbrida para Calibre, usando la columna pre-procesada 'Calibre_CC'
-        source_df_calibre = df_para_filtros if filtros_activos else df
-        calibre_series = source_df_calibre['Calibre_CC'].dropna()
-        calibre_options = sorted(calibre_series.unique().astype(int))
-        calibre_options = [str(c) for c in calibre_options]
-
-        calibre_seleccionado = st.multiselect("Calibre", calibre_options)
-        if calibre_seleccionado:
-            # Mantener las opciones visuales basadas en 'Calibre_CC', pero filtrar por presencia del número en 'Descripcion'
-            import re
-            calibres_a_filtrar = [int(c) for c in calibre_seleccionado]
-            mask = False
-            for c in calibres_a_filtrar:
-                # Coincidencia del número como token (evitar que 100 matchee 1000)
-                pattern = rf"(?<!\d){re.escape(str(c))}(?!\d)"
-                m = df_para_filtros['Descripcion'].astype(str).str.contains(pattern, case=False, regex=True, na=False)
-                mask = m if isinstance(mask, bool) and mask is False else (mask | m)
-            df_para_filtros = df_para_filtros[mask]
-
-        vendedor_options = sorted(df_para_filtros['NomVendedor'].dropna().unique())
-        vendedor = st.multiselect("Vendedor", vendedor_options)
-        if vendedor:
-            df_para_filtros = df_para_filtros[df_para_filtros["NomVendedor"].isin(vendedor)]
-
-    cliente_options = sorted(df_para_filtros['RazonSocial'].dropna().unique())
-    cliente = st.multiselect("Cliente", cliente_options)
-    if cliente:
-        df_para_filtros = df_para_filtros[df_para_filtros["RazonSocial"].isin(cliente)]
-
-    # Filtro de Plan (solo si se cargó archivo PLANES)
-    if planes_data:
-        st.markdown("#### 📋 Filtro por Plan")
-        plan_options = sorted(planes_data.keys())
-        plan_seleccionado = st.selectbox(
-            "Seleccionar Plan (filtro por códigos de clientes del plan)",
-            ["Todos los planes"] + plan_options,
-            help="Si seleccionas un plan específico, solo se mostrarán los datos de los clientes que pertenecen a ese plan"
+        cartera_manual = st.number_input("👥 Cartera", min_value=0, value=1000)
+
+    hay_historico = modo_carga == "historico" and bool(particiones)
+    if uploaded_files or hay_historico:
+        version_datos = None
+        # Reglas de canal vigentes (canal_reglas.json): si cambian, se vuelve a procesar
+        version_reglas = rules_version()
+        # Huella del contenido de cada archivo subido (una vez por archivo en la sesión)
+        huellas_subidas = upload_fingerprints(
+            uploaded_files or [], st.session_state.setdefault("huellas_archivos", {})
         )
-        
-        if plan_seleccionado != "Todos los planes":
-            # Filtrar por códigos de clientes del plan seleccionado
-            codigos_plan = planes_data[plan_seleccionado]
-            # Convertir CodigoCliente a string para la comparación
-            df_para_filtros_plan = df_para_filtros[
-                df_para_filtros["CodigoCliente"].astype(str).isin(codigos_plan)
-            ].copy()
-            
-            # Mostrar información del filtro aplicado
-            st.info(f"📋 Plan aplicado: {plan_seleccionado} ({len(codigos_plan)} clientes en el plan)")
-            if len(df_para_filtros_plan) > 0:
-                clientes_encontrados = df_para_filtros_plan["CodigoCliente"].nunique()
-                st.success(f"✅ Se encontraron {clientes_encontrados} clientes del plan con datos en el período seleccionado")
-            else:
-                st.warning("⚠️ No se encontraron datos para los clientes de este plan en el período seleccionado")
-            
-            df_para_filtros = df_para_filtros_plan
-
-    df_filtrado = df_para_filtros.copy()
-
-    st.subheader("📊 Resumen consolidado del último mes")
-    resumen = build_global_summary(df_filtrado, date_to, salidas_mes, salidas_actuales, cartera_manual)
-    st.dataframe(resumen)
-
-    st.markdown("<h3 style='text-align: center;'> Indicadores clave</h3>", unsafe_allow_html=True)
-
-    # Primera fila - Métricas de volumen
-    col1, col2, col3 = st.columns(3)
-    col1.metric("HL (Litros Vendidos)", f"{resumen['HL (Litros Vendidos)'].iloc[0]:.1f}")
-    col2.metric("HL Proyectado", f"{resumen['HL Proyectado'].iloc[0]:.1f}")
-    col3.metric("HectoLitro Real", f"{resumen['HectoLitro Real (Acumulado)'].iloc[0]:.1f}")
-
-    # Segunda fila - Métricas financieras
-    col4, col5, col6 = st.columns(3)
-    col4.metric("% Bonificación", resumen['% Bonificación'].iloc[0])
-    col5.metric("$ Bruto", f"${resumen['$ Bruto'].iloc[0]:.1f}")
-    col6.metric("$ Neto", f"${resumen['$ Neto'].iloc[0]:.1f}")
-
-    # Tercera fila - Métricas de clientes
-    col7, col8, col9 = st.columns(3)
-    col7.metric("CCE (Clientes)", f"{resumen['CCE (Clientes con compra)'].iloc[0]:.1f}")
-    col8.metric("Cobertura", resumen['Cobertura'].iloc[0])
-    col9.metric("CCC Ñandú", f"{resumen['CCC Ñandú (Multi-marca)'].iloc[0]:.1f}")
-    
-    # Cuarta fila - Métricas de CCE por tipo de agua
-    col10, col11, col12 = st.columns(3)
-    if 'CCE Agua Pura' in resumen.columns:
-        col10.metric("CCE Agua Pura", f"{resumen['CCE Agua Pura'].iloc[0]:.1f}")
-    if 'CCE Agua Saborizada' in resumen.columns:
-        col11.metric("CCE Agua Saborizada", f"{resumen['CCE Agua Saborizada'].iloc[0]:.1f}")
-    col12.metric(
-        "Sabores por PV (Levite)",
-        f"{resumen['Sabores por PV (Levite)'].iloc[0]:.2f}"
-    )
-    # Quinta fila - Otras métricas de productos
-    col13, col14, col15 = st.columns(3)
-    col13.metric("Drop (Bultos/Clientes)", f"{resumen['Drop (Bultos/Clientes)'].iloc[0]:.1f}")
-    col14.metric("Dif Bruto - Neto", f"${resumen['Diferencia Bruto - Neto'].iloc[0]:.1f}")
-    
-    # Sexta fila - Métricas adicionales
-    col15.metric("Cartera", f"{resumen['Cartera'].iloc[0]:.1f}")
-
-    # ===== NUEVO BOTÓN DE EXPORTACIÓN CCC ÑANDÚ Y PV LEVITE =====
-    st.markdown("---")
-    st.markdown("### 📋 Exportar Información Detallada de Indicadores")
-    
-    if st.button("📊 Exportar CCC Ñandú y PV LEVITE", 
-                help="Descargar un archivo Excel con el detalle de clientes que conforman los indicadores CCC Ñandú y PV Levite"):
-        try:
-            # Llamar a la función de exportación con los datos ya procesados
-            excel_data, filename = export_clientes_y_sabores(df_filtrado)
-            
-            # Crear el botón de descarga
-            st.download_button(
-                label="⬇️ Descargar archivo Excel",
-                data=excel_data,
-                file_name=filename,
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
-            st.success("✅ Archivo generado correctamente. Haz clic en el botón de descarga.")
-        except Exception as e:
-            st.error(f"❌ Error al generar el archivo: {str(e)}")
-    
-    st.markdown("---")
-    st.markdown("<h3 style='text-align: center;'> Gráficos de Comparación Anual</h3>", unsafe_allow_html=True)
-
-    # Preparar datos para los gráficos
-    yoy_data, channel_data = prepare_yoy_data(df_filtrado, date_to)
-    figuras_export = []
-
-    if not yoy_data.empty and not channel_data.empty:
-        # Fila 1: Gráficos de Volumen - Mensual vs Anual
-        st.write("#### Comparación de Volumen")
-        col1, col2 = st.columns(2)
-        with col1:
-            fig_volumen_yoy = plot_yoy_comparison(yoy_data, metric='Volumen', period='YTD')
-            st.plotly_chart(fig_volumen_yoy, use_container_width=True)
-            figuras_export.append(fig_volumen_yoy)
-        with col2:
-            fig_volumen_anual = plot_yearly_totals(yoy_data, metric='Volumen', title_suffix='(YTD)')
-            st.plotly_chart(fig_volumen_anual, use_container_width=True)
-            figuras_export.append(fig_volumen_anual)
+        if modo_carga == "historico":
+            # Solo se procesan los archivos nuevos; el resto se lee del histórico
+            from utils.store import load_from_store, store_version
+            df, planes_data = load_from_store(uploaded_files, date_from, date_to, huellas_subidas)
+            version_datos = store_version()
+
+            st.subheader("🔍 Vista previa histórico")
+            st.dataframe(df.head(10))
+        elif modo_carga == "streaming":
+            # Lectura por bloques: cada bloque se procesa y se agrega (memoria acotada)
+            from utils.streaming import load_multiple_excels_streaming
+            df, planes_data = load_multiple_excels_streaming(uploaded_files, date_from, date_to, reglas_version=version_reglas)
+
+            st.subheader("🔍 Vista previa datos agregados")
+            st.dataframe(df.head(10))
+        else:
+            # Carga, proceso y cubo pre-agregado (se arma una vez; los filtros trabajan sobre el cubo)
+            df, planes_data, vista_previa, reporte_memoria = load_sales_cube(uploaded_files, date_from, date_to, version_reglas)
+
+            st.subheader("🔍 Vista previa datos crudos")
+            st.dataframe(vista_previa)
+
+            total = reporte_memoria.loc["TOTAL"]
+            with st.expander(f"🧮 Memoria de los datos: {total['MB antes']:,.1f} MB → {total['MB después']:,.1f} MB"):
+                st.dataframe(reporte_memoria)
+
+        # 🔧 Filtros dinámicos
+        st.markdown("### 🔎 Filtros de análisis")
+
+        # --- Lógica de Filtros ---
+        # Índice valor -> filas (se arma una vez por dataset); cada filtro es un AND de bitmaps.
+        # Los índices y los resultados se comparten entre sesiones: la clave lleva la huella del
+        # contenido de cada archivo subido (no su nombre y tamaño), la versión del histórico y la de las reglas
+        clave_datos = data_key(modo_carga, huellas_subidas, date_from, date_to, version_datos, version_reglas)
+        indice_filtros = cached_filter_index(df, clave_datos)
+        # Índice plan -> clientes, con la misma clave
+        indice_planes = cached_plan_index(planes_data, df["CodigoCliente"], clave_datos) if planes_data else None
+        seleccion = indice_filtros.all_rows()
+        # Filtros elegidos hasta el momento (las opciones de cada filtro dependen de los anteriores)
+        estado_filtros = []
+
+        col1, col2, col3 = st.columns(3)
 
-        # Fila 2: Gráficos de CCC - Mensual vs Anual
-        st.write("#### Comparación de CCC (YTD)")
-        col1, col2 = st.columns(2)
         with col1:
-            fig_ccc_yoy = plot_yoy_comparison(yoy_data, metric='CCC', period='YTD')
-            st.plotly_chart(fig_ccc_yoy, use_container_width=True)
-            figuras_export.append(fig_ccc_yoy)
-        with col2:
-            fig_ccc_anual = plot_yearly_totals(yoy_data, metric='CCC', title_suffix='(YTD)')
-            st.plotly_chart(fig_ccc_anual, use_container_width=True)
-            figuras_export.append(fig_ccc_anual)
+            familia_options = indice_filtros.options("Grupo", estado_filtros)
+            familia = st.multiselect("Familia", familia_options)
+            if familia:
+                seleccion &= indice_filtros.select("Grupo", familia)
+                estado_filtros.append(("Grupo", familia))
+
+            canal_options = indice_filtros.options("Canal", estado_filtros)
+            canal = st.multiselect("Canal", canal_options)
+            if canal:
+                seleccion &= indice_filtros.select("Canal", canal)
+                estado_filtros.append(("Canal", canal))
 
-        # Fila 3: Gráficos por Canal - Volumen
-        st.write("#### Desglose por Canal - Volumen (YTD)")
-        col1, col2 = st.columns(2)
-        with col1:
-            fig_volumen_canal = plot_channel_breakdown(channel_data, metric='Volumen')
-            st.plotly_chart(fig_volumen_canal, use_container_width=True)
-            figuras_export.append(fig_volumen_canal)
-        with col2:
-            # Crear un DataFrame con los totales por canal y año para el gráfico de barras
-            channel_totals = channel_data.groupby(['Canal', 'Año'])['Volumen'].sum().reset_index()
-            fig_volumen_canal_anual = plot_yearly_totals(channel_totals, metric='Volumen', title_suffix='por Canal (YTD)')
-            st.plotly_chart(fig_volumen_canal_anual, use_container_width=True)
-            figuras_export.append(fig_volumen_canal_anual)
-
-        # Fila 4: Gráficos por Canal - CCC
-        st.write("#### Desglose por Canal - CCC (YTD)")
-        col1, col2 = st.columns(2)
-        with col1:
-            fig_ccc_canal = plot_channel_breakdown(channel_data, metric='CCC')
-            st.plotly_chart(fig_ccc_canal, use_container_width=True)
-            figuras_export.append(fig_ccc_canal)
         with col2:
-            # Crear un DataFrame con los totales por canal y año para el gráfico de barras
-            ccc_totals = channel_data.groupby(['Canal', 'Año'])['CCC'].sum().reset_index()
-            fig_ccc_canal_anual = plot_yearly_totals(ccc_totals, metric='CCC', title_suffix='por Canal (YTD)')
-            st.plotly_chart(fig_ccc_canal_anual, use_container_width=True)
-            figuras_export.append(fig_ccc_canal_anual)
+            marca_options = indice_filtros.options("Marcas", estado_filtros)
+            marca = st.multiselect("Marca", marca_options)
+            if marca:
+                seleccion &= indice_filtros.select("Marcas", marca)
+                estado_filtros.append(("Marcas", marca))
+
+            supervisor_options = indice_filtros.options("NomSupervisor", estado_filtros)
+            supervisor = st.multiselect("Supervisor", supervisor_options)
+            if supervisor:
+                seleccion &= indice_filtros.select("NomSupervisor", supervisor)
+                estado_filtros.append(("NomSupervisor", supervisor))
+
+        with col3:
+            # Lógica híbrida para Calibre, usando la columna pre-procesada 'Calibre_CC'
+            calibre_options = indice_filtros.options("Calibre_CC", estado_filtros)
+            calibre_options = [str(c) for c in sorted(np.array(calibre_options).astype(int))]
+
+            calibre_seleccionado = st.multiselect("Calibre", calibre_options)
+            if calibre_seleccionado:
+                # Mantener las opciones visuales basadas en 'Calibre_CC', pero filtrar por presencia del número en 'Descripcion'
+                # (coincidencia del número como token, para evitar que 100 matchee 1000)
+                calibres = [int(c) for c in calibre_seleccionado]
+                seleccion &= indice_filtros.select_calibres(calibres)
+                estado_filtros.append(("Calibre", calibres))
+
+            vendedor_options = indice_filtros.options("NomVendedor", estado_filtros)
+            vendedor = st.multiselect("Vendedor", vendedor_options)
+            if vendedor:
+                seleccion &= indice_filtros.select("NomVendedor", vendedor)
+                estado_filtros.append(("NomVendedor", vendedor))
+
+        cliente_options = indice_filtros.options("RazonSocial", estado_filtros)
+        cliente = st.multiselect("Cliente", cliente_options)
+        if cliente:
+            seleccion &= indice_filtros.select("RazonSocial", cliente)
+            estado_filtros.append(("RazonSocial", cliente))
+
+        # Filtro de Plan (solo si se cargó archivo PLANES)
+        if planes_data:
+            st.markdown("#### 📋 Filtro por Plan")
+            plan_options = sorted(planes_data.keys())
+            plan_seleccionado = st.selectbox(
+                "Seleccionar Plan (filtro por códigos de clientes del plan)",
+                ["Todos los planes"] + plan_options,
+                help="Si seleccionas un plan específico, solo se mostrarán los datos de los clientes que pertenecen a ese plan"
+            )
 
-        # Fila 5: Mix de Volumen (se mantiene igual)
-        st.write("#### Mix de Volumen por Canal (YTD Año Actual)")
-        fig_mix_volumen = plot_volume_mix(channel_data)
-        st.plotly_chart(fig_mix_volumen, use_container_width=True)
-        figuras_export.append(fig_mix_volumen)
+            if plan_seleccionado != "Todos los planes":
+                # Filtrar por códigos de clientes del plan seleccionado (usando el índice de planes)
+                codigos_plan = planes_data[plan_seleccionado]
+                seleccion &= indice_filtros.from_mask(indice_planes.mask(plan_seleccionado))
+                filas_plan = indice_filtros.rows(seleccion)
+
+                # Mostrar información del filtro aplicado
+                st.info(f"📋 Plan aplicado: {plan_seleccionado} ({len(codigos_plan)} clientes en el plan)")
+                if filas_plan.any():
+                    clientes_encontrados = df.loc[filas_plan, "CodigoCliente"].nunique()
+                    st.success(f"✅ Se encontraron {clientes_encontrados} clientes del plan con datos en el período seleccionado")
+                else:
+                    st.warning("⚠️ No se encontraron datos para los clientes de este plan en el período seleccionado")
+
+        # Resultados ya calculados para esta combinación de datos, filtros y parámetros
+        cache_resultados = result_cache()
+        clave_filtros = filter_key(estado_filtros, plan_seleccionado if planes_data else None)
+        clave_proyeccion = (salidas_mes, salidas_actuales, cartera_manual)
+
+        # Un solo recorte del DataFrame con todos los filtros combinados (solo si hace falta)
+        recorte = {}
+
+        def filtrado():
+            if "df" not in recorte:
+                with span("filters", filtros=len(estado_filtros), filas_entrada=len(df)) as tramo:
+                    recorte["df"] = df[indice_filtros.rows(seleccion)]
+                    tramo.set(filas=len(recorte["df"]))
+            return recorte["df"]
+
+        st.subheader("📊 Resumen consolidado del último mes")
+        resumen = cache_resultados.get_or_compute(
+            ("resumen", clave_datos, clave_filtros, clave_proyeccion),
+            lambda: build_global_summary(filtrado(), date_to, salidas_mes, salidas_actuales, cartera_manual),
+        )
+        st.dataframe(resumen)
+
+        st.markdown("<h3 style='text-align: center;'> Indicadores clave</h3>", unsafe_allow_html=True)
+
+        # Primera fila - Métricas de volumen
+        col1, col2, col3 = st.columns(3)
+        col1.metric("HL (Litros Vendidos)", f"{resumen['HL (Litros Vendidos)'].iloc[0]:.1f}")
+        col2.metric("HL Proyectado", f"{resumen['HL Proyectado'].iloc[0]:.1f}")
+        col3.metric("HectoLitro Real", f"{resumen['HectoLitro Real (Acumulado)'].iloc[0]:.1f}")
+
+        # Segunda fila - Métricas financieras
+        col4, col5, col6 = st.columns(3)
+        col4.metric("% Bonificación", resumen['% Bonificación'].iloc[0])
+        col5.metric("$ Bruto", f"${resumen['$ Bruto'].iloc[0]:.1f}")
+        col6.metric("$ Neto", f"${resumen['$ Neto'].iloc[0]:.1f}")
+
+        # Tercera fila - Métricas de clientes
+        col7, col8, col9 = st.columns(3)
+        col7.metric("CCE (Clientes)", f"{resumen['CCE (Clientes con compra)'].iloc[0]:.1f}")
+        col8.metric("Cobertura", resumen['Cobertura'].iloc[0])
+        col9.metric("CCC Ñandú", f"{resumen['CCC Ñandú (Multi-marca)'].iloc[0]:.1f}")
+
+        # Cuarta fila - Métricas de CCE por tipo de agua
+        col10, col11, col12 = st.columns(3)
+        if 'CCE Agua Pura' in resumen.columns:
+            col10.metric("CCE Agua Pura", f"{resumen['CCE Agua Pura'].iloc[0]:.1f}")
+        if 'CCE Agua Saborizada' in resumen.columns:
+            col11.metric("CCE Agua Saborizada", f"{resumen['CCE Agua Saborizada'].iloc[0]:.1f}")
+        col12.metric(
+            "Sabores por PV (Levite)",
+            f"{resumen['Sabores por PV (Levite)'].iloc[0]:.2f}"
+        )
+        # Quinta fila - Otras métricas de productos
+        col13, col14, col15 = st.columns(3)
+        col13.metric("Drop (Bultos/Clientes)", f"{resumen['Drop (Bultos/Clientes)'].iloc[0]:.1f}")
+        col14.metric("Dif Bruto - Neto", f"${resumen['Diferencia Bruto - Neto'].iloc[0]:.1f}")
+
+        # Sexta fila - Métricas adicionales
+        col15.metric("Cartera", f"{resumen['Cartera'].iloc[0]:.1f}")
+
+        # ===== NUEVO BOTÓN DE EXPORTACIÓN CCC ÑANDÚ Y PV LEVITE =====
+        st.markdown("---")
+        st.markdown("### 📋 Exportar Información Detallada de Indicadores")
+
+        if st.button("📊 Exportar CCC Ñandú y PV LEVITE", 
+                    help="Descargar un archivo Excel con el detalle de clientes que conforman los indicadores CCC Ñandú y PV Levite"):
+            try:
+                # Llamar a la función de exportación con los datos ya procesados
+                from utils.exporter import export_clientes_y_sabores
+                excel_data, filename = export_clientes_y_sabores(filtrado())
+
+                # Crear el botón de descarga
+                st.download_button(
+                    label="⬇️ Descargar archivo Excel",
+                    data=excel_data,
+                    file_name=filename,
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
+                st.success("✅ Archivo generado correctamente. Haz clic en el botón de descarga.")
+            except Exception as e:
+                st.error(f"❌ Error al generar el archivo: {str(e)}")
+
+        st.markdown("---")
+        st.markdown("<h3 style='text-align: center;'> Gráficos de Comparación Anual</h3>", unsafe_allow_html=True)
+
+        # Preparar datos y figuras de los gráficos (guardados por estado de filtros).
+        # Los módulos de gráficos y exportación se importan recién al llegar acá,
+        # para que la pantalla inicial (licencia y carga de archivos) no los espere.
+        from utils.plotter import yoy_figures
+        from utils.exporter import export_to_excel
+
+        # Las tablas interanuales de todos los meses se guardan con una clave sin date_to:
+        # llevar date_to a un fin de mes anterior solo elige otro mes (ver cached_yoy_data)
+        clave_yoy = (
+            "yoy",
+            data_key(modo_carga, huellas_subidas, date_from, None, version_datos, version_reglas),
+            clave_filtros,
+        )
+        figuras = cache_resultados.get_or_compute(
+            ("graficos", clave_datos, clave_filtros),
+            lambda: yoy_figures(*cached_yoy_data(cache_resultados, clave_yoy, filtrado, date_to)),
+        )
 
+        if figuras:
+            # Fila 1: Gráficos de Volumen - Mensual vs Anual
+            st.write("#### Comparación de Volumen")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.plotly_chart(figuras['volumen_yoy'], use_container_width=True)
+            with col2:
+                st.plotly_chart(figuras['volumen_anual'], use_container_width=True)
+
+            # Fila 2: Gráficos de CCC - Mensual vs Anual
+            st.write("#### Comparación de CCC (YTD)")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.plotly_chart(figuras['ccc_yoy'], use_container_width=True)
+            with col2:
+                st.plotly_chart(figuras['ccc_anual'], use_container_width=True)
+
+            # Fila 3: Gráficos por Canal - Volumen
+            st.write("#### Desglose por Canal - Volumen (YTD)")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.plotly_chart(figuras['volumen_canal'], use_container_width=True)
+            with col2:
+                st.plotly_chart(figuras['volumen_canal_anual'], use_container_width=True)
+
+            # Fila 4: Gráficos por Canal - CCC
+            st.write("#### Desglose por Canal - CCC (YTD)")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.plotly_chart(figuras['ccc_canal'], use_container_width=True)
+            with col2:
+                st.plotly_chart(figuras['ccc_canal_anual'], use_container_width=True)
+
+            # Fila 5: Mix de Volumen (se mantiene igual)
+            st.write("#### Mix de Volumen por Canal (YTD Año Actual)")
+            st.plotly_chart(figuras['mix_volumen'], use_container_width=True)
+
+
+
+
+        st.download_button(
+            "📥 Exportar Excel",
+            data=cache_resultados.get_or_compute(
+                ("excel", clave_datos, clave_filtros, clave_proyeccion),
+                lambda: export_to_excel(resumen, figuras=list(figuras.values())),
+            ),
+            file_name="resumen_ventas.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
 
+        # Estado de la caché de resultados (al final, con los accesos de esta ejecución)
+        stats = cache_resultados.stats()
+        with st.sidebar:
+            st.markdown("### ⚡ Caché de resultados")
+            st.caption(
+                f"{stats['entradas']} resultados ({stats['bytes'] / 1024 / 1024:.1f} MB) · "
+                f"aciertos {stats['hits']}/{stats['hits'] + stats['misses']} ({stats['hit_rate']:.0%}) · "
+                f"{stats['evictions']} desalojados"
+            )
 
+    else:
+        st.info("⬆️ Por favor, cargá al menos un archivo Excel.")
 
-    st.download_button(
-        "📥 Exportar Excel",
-        data=export_to_excel(resumen, figuras=figuras_export),
-        file_name="resumen_ventas.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
 
-else:
-    st.info("⬆️ Por favor, cargá al menos un archivo Excel.")
\ No newline at end of file
+# Streamlit ejecuta el script como __main__. Los procesos de los pools (utils/parallel.py,
+# iniciados con forkserver/spawn) lo importan como __mp_main__ y no deben correr la app
+if __name__ == "__main__":
+    main()
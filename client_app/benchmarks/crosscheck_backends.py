@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Compara el motor pandas con el motor DuckDB (utils/duckdb_backend.py):
+process_data, el resumen global y los datos interanuales sobre las mismas
+líneas de venta. Sale con código 1 si hay diferencias.
+
+Las reglas de canal de la comparación se arman sobre los clientes de los
+datos (una por nombre, una por código y una por plan, con un archivo de
+PLANES de prueba), así ambos motores aplican los tres tipos de regla.
+
+Uso:
+    python benchmarks/crosscheck_backends.py --rows 500000
+    python benchmarks/crosscheck_backends.py --files ventas_2024.xlsx ventas_2025.xlsx
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+# Ejecutable desde cualquier directorio: los módulos del dashboard están en client_app/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from memory_profile import synthetic_sales, load_files  # noqa: E402
+from utils import duckdb_backend, processor  # noqa: E402
+
+
+def sample_rules(ventas, n=20):
+    """
+    Reglas de canal y PLANES de prueba sobre los clientes de `ventas`: `n`
+    clientes por nombre, por código y por plan. Los grupos se solapan en
+    parte, así también se compara qué regla gana cuando hay varias.
+    """
+    clientes = ventas.drop_duplicates("CodigoCliente")[["CodigoCliente", "RazonSocial"]].dropna()
+    codigos = clientes["CodigoCliente"].astype(str).tolist()
+    nombres = clientes["RazonSocial"].astype(str).tolist()
+    planes = {"PLAN KA": codigos[:n], "PLAN OTRO": codigos[n:2 * n]}
+    reglas = [
+        {"canal": "SUBDISTRIBUIDOR", "nombres": nombres[n // 2:n + n // 2]},
+        {"canal": "MAYORISTA", "codigos": codigos[n + n // 4:2 * n]},
+        {"canal": "KEY ACCOUNT", "planes": ["PLAN KA"]},
+    ]
+    return planes, reglas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    origen = parser.add_mutually_exclusive_group()
+    origen.add_argument("--rows", type=int, default=200_000, help="filas de datos sintéticos")
+    origen.add_argument("--files", nargs="+", help="archivos Excel de ventas a leer")
+    parser.add_argument("--date-from", default="2024-01-01")
+    parser.add_argument("--date-to", default="2025-06-30")
+    parser.add_argument("--rtol", type=float, default=1e-9, help="tolerancia relativa de las sumas")
+    args = parser.parse_args()
+
+    crudo = load_files(args.files) if args.files else synthetic_sales(args.rows)
+    ventas = processor.exclude_families(crudo)
+    date_from, date_to = pd.Timestamp(args.date_from), pd.Timestamp(args.date_to)
+    planes, reglas = sample_rules(ventas)
+
+    inicio = time.perf_counter()
+    diferencias = duckdb_backend.crosscheck(ventas, date_from, date_to, args.rtol, planes, reglas)
+    segundos = time.perf_counter() - inicio
+
+    print(f"{len(ventas):,} filas comparadas en {segundos:.1f} s")
+    for diferencia in diferencias:
+        print(f"❌ {diferencia}")
+    if diferencias:
+        sys.exit(1)
+    print("✅ Ambos motores coinciden")
+
+
+if __name__ == "__main__":
+    main()
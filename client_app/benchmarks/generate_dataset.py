@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Genera un conjunto de datos sintético con la forma de los archivos del ERP:
+planillas de ventas (.xlsx) con las columnas reales y un archivo PLANES.xlsx.
+
+Las ventas tienen Fecha como serial de Excel, descripciones con calibre y
+bultos ("HEINEKEN LATA 473cc 6x"), sabores Levite (incluida la limonada, que
+no cuenta como sabor), Heineken, Miller e Imperial Golden en 330 para CCC
+Ñandú (con "330 cc" como número suelto, que es lo que cuenta; algunos
+productos traen "330cc", que no cuenta), productos Ñandú sin 330 (que se
+excluyen), familias POP y PALLETS,
+canales, supervisores y vendedores, y los clientes SUBDISTRIBUIDOR de la
+regla de canal por defecto. Las filas se reparten en varios archivos en orden
+de fecha (como las exportaciones por período), sin superar el máximo de filas
+de una hoja de Excel.
+
+Además se escribe dataset.json con los parámetros y el rango de fechas, que
+usa benchmarks/run_benchmarks.py.
+
+Uso:
+    python benchmarks/generate_dataset.py --rows 100k --out datasets/100k
+    python benchmarks/generate_dataset.py --rows 1M --out datasets/1m
+    python benchmarks/generate_dataset.py --rows 10M --out datasets/10m --rows-per-file 1000000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Máximo de filas de datos de una hoja de Excel (más la fila de encabezado)
+EXCEL_MAX_ROWS = 1_048_575
+
+# Días desde el origen de los seriales de Excel
+EXCEL_EPOCH = pd.Timestamp("1899-12-30")
+
+# Columnas de las planillas de ventas, en el orden del ERP
+SALES_COLUMNS = [
+    "Fecha", "CodigoCliente", "RazonSocial", "Canal", "NomSupervisor", "NomVendedor",
+    "Grupo", "Rubro", "Marcas", "Descripcion", "Kg", "Kg_Lt", "NetoSD", "PorcDescLinea",
+]
+
+# Clientes que la regla de canal por defecto pasa a SUBDISTRIBUIDOR
+SUBDISTRIBUIDORES = ["NIETO RAUL EDGARDO", "DISTRIBUCIONES ALDANA S.R.L", "PALMA JOSÉ LUCAS", "CREDE FERNANDO MIGUEL"]
+
+CANALES = ["AUTOSERVICIO", "KIOSCO", "MAYORISTA", "ALMACEN", "SUPERMERCADO"]
+PESOS_CANAL = [0.25, 0.30, 0.10, 0.25, 0.10]
+
+APELLIDOS = ["GOMEZ", "FERNANDEZ", "LOPEZ", "DIAZ", "MARTINEZ", "PEREZ", "GARCIA", "SANCHEZ",
+             "ROMERO", "SOSA", "ALVAREZ", "TORRES", "RUIZ", "RAMIREZ", "FLORES", "BENITEZ"]
+NOMBRES = ["JUAN", "MARIA", "CARLOS", "ANA", "JORGE", "LAURA", "LUIS", "SILVIA", "MIGUEL", "ROSA"]
+RUBROS_CLIENTE = ["", " S.R.L.", " S.A.", " - DESPENSA", " - MAXIKIOSCO"]
+
+
+def product_catalog():
+    """Productos: Descripcion, Marcas, Rubro, Grupo, precio por litro y peso relativo en las ventas."""
+    productos = []
+
+    def agregar(descripcion, marca, rubro, grupo, precio, peso):
+        productos.append((descripcion, marca, rubro, grupo, precio, peso))
+
+    # Cervezas: Heineken, Miller e Imperial Golden cuentan para CCC Ñandú cuando el 330 es un
+    # número suelto ("330 cc"); "330cc" pegado no cuenta (la botella de Heineken queda afuera)
+    for texto, peso in [("LATA 330 cc 6x", 3), ("BOTELLA 330cc 24x", 2), ("LATA 473cc 6x", 4), ("1000cc 12x", 3)]:
+        agregar(f"HEINEKEN {texto}", "HEINEKEN", "CERVEZA", "CERVEZAS", 1400, peso)
+    for texto, peso in [("GENUINE DRAFT 330 cc 24x", 2), ("GENUINE DRAFT LATA 473cc 6x", 2)]:
+        agregar(f"MILLER {texto}", "MILLER", "CERVEZA", "CERVEZAS", 1300, peso)
+    for texto, peso in [("GOLDEN 330 cc 24x", 3), ("GOLDEN LATA 473cc 6x", 3), ("CREAM STOUT 473cc 6x", 1),
+                        ("APA 1000cc 12x", 2)]:
+        agregar(f"IMPERIAL {texto}", "IMPERIAL", "CERVEZA", "CERVEZAS", 1200, peso)
+    for texto, peso in [("LATA 473cc 6x", 4), ("1000cc 12x", 4), ("330cc 24x", 1)]:
+        agregar(f"SCHNEIDER {texto}", "SCHNEIDER", "CERVEZA", "CERVEZAS", 900, peso)
+    # Ñandú: solo cuenta en calibre 330; el resto se descarta en process_data
+    agregar("ÑANDU MIX 330 cc 6x", "ÑANDU", "CERVEZA", "CERVEZAS", 1100, 1)
+    agregar("ÑANDU MIX 1000cc 6x", "ÑANDU", "CERVEZA", "CERVEZAS", 1000, 1)
+
+    # Levite: sabores de una y dos palabras; la limonada no cuenta como sabor
+    for sabor in ["POMELO", "NARANJA", "MANZANA", "DURAZNO", "UVA", "POMELO ROSADO", "LIMONADA"]:
+        for calibre, bultos, peso in [(500, 12, 1), (1500, 6, 3), (2250, 6, 2)]:
+            agregar(f"LEVITE {sabor} {calibre}cc {bultos}x", "LEVITE", "SABORISADAS", "AGUAS", 600, peso)
+
+    # Agua pura
+    for calibre, bultos, peso in [(500, 12, 2), (1500, 6, 4), (6000, 2, 2)]:
+        agregar(f"CACHANTUN AGUA {calibre}cc {bultos}x", "CACHANTUN", "AGUA", "AGUAS", 400, peso)
+
+    # Gaseosas
+    for marca in ["PEPSI", "7UP", "MIRINDA", "PASO DE LOS TOROS"]:
+        for calibre, bultos, peso in [(500, 12, 1), (1500, 6, 2), (2250, 8, 3)]:
+            agregar(f"{marca} {calibre}cc {bultos}x", marca, "GASEOSAS", "BEBIDAS", 700, peso)
+
+    # Familias que se excluyen de todos los análisis
+    agregar("HELADERA EXHIBIDORA HEINEKEN", "HEINEKEN", "MATERIAL POP", "POP", 0, 0.2)
+    agregar("AFICHE LEVITE", "LEVITE", "MATERIAL POP", "POP", 0, 0.2)
+    agregar("PALLET MADERA", "SIN MARCA", "PALLETS", "PALLETS", 0, 0.2)
+
+    tabla = pd.DataFrame(productos, columns=["Descripcion", "Marcas", "Rubro", "Grupo", "Precio", "Peso"])
+    # Litros por bulto a partir de la descripción (los productos POP no tienen volumen)
+    calibre = pd.to_numeric(tabla["Descripcion"].str.extract(r"(\d+)\s*cc")[0], errors="coerce").fillna(0)
+    unidades = pd.to_numeric(tabla["Descripcion"].str.extract(r"(\d+)x")[0], errors="coerce").fillna(1)
+    tabla["Litros"] = calibre / 1000 * unidades
+    return tabla
+
+
+def client_table(n_clientes, rng):
+    """Clientes: código, razón social, canal, vendedor y supervisor (fijos por cliente)."""
+    n_vendedores = max(n_clientes // 60, 5)
+    n_supervisores = max(n_vendedores // 8, 2)
+    razon = np.char.add(
+        np.char.add(rng.choice(APELLIDOS, n_clientes), " "),
+        rng.choice(NOMBRES, n_clientes),
+    )
+    razon = np.char.add(razon, rng.choice(RUBROS_CLIENTE, n_clientes)).astype(object)
+    razon[:len(SUBDISTRIBUIDORES)] = SUBDISTRIBUIDORES[:n_clientes]
+    vendedor = rng.integers(0, n_vendedores, n_clientes)
+    supervisor_de = rng.integers(0, n_supervisores, n_vendedores)
+    return pd.DataFrame({
+        "CodigoCliente": 10001 + np.arange(n_clientes),
+        "RazonSocial": razon,
+        "Canal": rng.choice(CANALES, n_clientes, p=PESOS_CANAL).astype(object),
+        "NomVendedor": np.char.add("VENDEDOR ", (vendedor + 1).astype(str)).astype(object),
+        "NomSupervisor": np.char.add("SUPERVISOR ", (supervisor_de[vendedor] + 1).astype(str)).astype(object),
+    })
+
+
+def sales_frame(n_filas, seed=0, start="2024-01-01", months=24, n_clientes=None):
+    """
+    Líneas de venta sintéticas (DataFrame con SALES_COLUMNS, ordenado por fecha).
+    Pocos clientes concentran buena parte de las compras, como en los datos reales.
+    """
+    rng = np.random.default_rng(seed)
+    productos = product_catalog()
+    clientes = client_table(n_clientes or max(n_filas // 120, 50), rng)
+
+    # Clientes con actividad desigual y productos según su peso
+    peso_cliente = 1.0 / (np.arange(len(clientes)) + 10.0)
+    cliente = rng.choice(len(clientes), n_filas, p=peso_cliente / peso_cliente.sum())
+    producto = rng.choice(len(productos), n_filas, p=(productos["Peso"] / productos["Peso"].sum()).to_numpy())
+
+    inicio = pd.Timestamp(start)
+    fin = inicio + pd.DateOffset(months=months)
+    dias = (fin - inicio).days
+    serial = np.sort((inicio - EXCEL_EPOCH).days + rng.integers(0, dias, n_filas))
+
+    # Bultos por línea; ~2% de devoluciones (Kg negativos)
+    cajas = rng.geometric(0.35, n_filas).astype(float)
+    cajas[rng.random(n_filas) < 0.02] *= -1
+    kg = np.round(cajas * productos["Litros"].to_numpy()[producto], 2)
+    precio = productos["Precio"].to_numpy()[producto] * rng.uniform(0.9, 1.1, n_filas)
+
+    df = pd.DataFrame({
+        "Fecha": serial,
+        "Kg": kg,
+        "Kg_Lt": kg,
+        "NetoSD": np.round(kg * precio, 2),
+        "PorcDescLinea": rng.choice([0.0, 0.0, 0.0, 5.0, 10.0, 15.0], n_filas),
+    })
+    for col in ["Descripcion", "Marcas", "Rubro", "Grupo"]:
+        df[col] = productos[col].to_numpy()[producto]
+    for col in ["CodigoCliente", "RazonSocial", "Canal", "NomSupervisor", "NomVendedor"]:
+        df[col] = clientes[col].to_numpy()[cliente]
+    return df[SALES_COLUMNS]
+
+
+def plans_frame(codigos, seed=0):
+    """Hoja de PLANES: nombre del plan en la primera fila y los códigos de clientes debajo."""
+    rng = np.random.default_rng(seed + 1)
+    planes = {}
+    for nombre, fraccion in [("PLAN HEINEKEN", 0.15), ("PLAN LEVITE", 0.25), ("PLAN KA", 0.03)]:
+        elegidos = np.sort(rng.choice(codigos, max(int(len(codigos) * fraccion), 1), replace=False))
+        valores = elegidos.astype(object)
+        # Algunos códigos cargados como texto, como pasa en las planillas reales
+        texto = rng.random(len(valores)) < 0.1
+        valores[texto] = [str(v) for v in elegidos[texto]]
+        planes[nombre] = pd.Series(valores, dtype=object)
+    hoja = pd.DataFrame(planes)
+    return pd.concat([pd.DataFrame([hoja.columns], columns=hoja.columns), hoja], ignore_index=True)
+
+
+def write_workbook(path, df, header=True):
+    """Escribe `df` en un .xlsx fila por fila (xlsxwriter en modo de memoria constante)."""
+    import xlsxwriter
+
+    libro = xlsxwriter.Workbook(path, {"constant_memory": True, "nan_inf_to_errors": True})
+    hoja = libro.add_worksheet("Hoja1")
+    fila_inicial = 0
+    if header:
+        hoja.write_row(0, 0, list(df.columns))
+        fila_inicial = 1
+    columnas = [df[col].tolist() for col in df.columns]
+    for i, fila in enumerate(zip(*columnas)):
+        hoja.write_row(fila_inicial + i, 0, [None if v is None or v != v else v for v in fila])
+    libro.close()
+
+
+def parse_size(texto):
+    """Cantidad de filas: 100000, 100k, 1M, 10M."""
+    texto = str(texto).strip().lower().replace("_", "")
+    factor = {"k": 1_000, "m": 1_000_000}.get(texto[-1:], 1)
+    return int(float(texto[:-1] if factor > 1 else texto) * factor)
+
+
+def generate(out, n_filas, seed=0, start="2024-01-01", months=24, rows_per_file=250_000, n_clientes=None,
+             max_workers=None):
+    """
+    Genera las planillas de ventas, PLANES.xlsx y dataset.json en `out`. Las
+    planillas se escriben en paralelo (max_workers procesos; por defecto uno
+    por CPU). Retorna el manifiesto.
+    """
+    if rows_per_file > EXCEL_MAX_ROWS:
+        raise ValueError(f"Una hoja de Excel admite hasta {EXCEL_MAX_ROWS:,} filas de datos")
+    os.makedirs(out, exist_ok=True)
+    ventas = sales_frame(n_filas, seed, start, months, n_clientes)
+
+    inicios = range(0, n_filas, rows_per_file)
+    archivos = [f"ventas_{i:0{len(str(len(inicios)))}d}.xlsx" for i in range(1, len(inicios) + 1)]
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(archivos)))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futuros = [
+            executor.submit(write_workbook, os.path.join(out, nombre), ventas.iloc[inicio:inicio + rows_per_file])
+            for nombre, inicio in zip(archivos, inicios)
+        ]
+        for nombre, inicio, futuro in zip(archivos, inicios, futuros):
+            futuro.result()
+            print(f"  {nombre}: {min(rows_per_file, n_filas - inicio):,} filas", flush=True)
+
+    write_workbook(os.path.join(out, "PLANES.xlsx"), plans_frame(ventas["CodigoCliente"].unique(), seed), header=False)
+
+    fechas = EXCEL_EPOCH + pd.to_timedelta(ventas["Fecha"].iloc[[0, -1]].to_numpy(), unit="D")
+    manifiesto = {
+        "filas": n_filas,
+        "seed": seed,
+        "clientes": int(ventas["CodigoCliente"].nunique()),
+        "productos": int(ventas["Descripcion"].nunique()),
+        "desde": fechas[0].date().isoformat(),
+        "hasta": fechas[1].date().isoformat(),
+        "archivos": archivos,
+        "planes": "PLANES.xlsx",
+    }
+    with open(os.path.join(out, "dataset.json"), "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, indent=2, ensure_ascii=False)
+    return manifiesto
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="100k", help="líneas de venta: 100k, 1M, 10M, ...")
+    parser.add_argument("--out", required=True, help="directorio de salida")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start", default="2024-01-01", help="primer día de ventas")
+    parser.add_argument("--months", type=int, default=24, help="meses de ventas")
+    parser.add_argument("--rows-per-file", type=int, default=250_000, help="filas por planilla de ventas")
+    parser.add_argument("--clients", type=int, help="clientes (por defecto, uno cada 120 filas)")
+    parser.add_argument("--workers", type=int, help="procesos para escribir las planillas (por defecto, uno por CPU)")
+    args = parser.parse_args()
+
+    n_filas = parse_size(args.rows)
+    inicio = time.perf_counter()
+    print(f"Generando {n_filas:,} filas en {args.out}")
+    try:
+        manifiesto = generate(args.out, n_filas, args.seed, args.start, args.months, args.rows_per_file, args.clients,
+                              args.workers)
+    except ValueError as e:
+        sys.exit(f"❌ {e}")
+    print(f"✅ {len(manifiesto['archivos'])} planillas, {manifiesto['clientes']:,} clientes, "
+          f"{manifiesto['desde']} a {manifiesto['hasta']} ({time.perf_counter() - inicio:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
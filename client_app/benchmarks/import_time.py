@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Tiempo de importación al arrancar el dashboard (app.py) y la línea de comandos
+(cli.py), medido con `python -X importtime` en procesos nuevos.
+
+Para cada punto de entrada toma los imports de nivel de módulo del script y
+mide dos corridas: solo las librerías externas (las del script más
+BASE_LIBRARIES) y todos los imports. Lo que agregan los módulos del dashboard
+al arranque (los módulos que se cargan solo en la segunda corrida) se compara
+contra --budget-ms. Además verifica que ninguno de
+los módulos pesados que solo hacen falta para gráficos, exportación, licencia
+o paralelismo (HEAVY_MODULES) se cargue al arrancar, salvo que ya los traiga
+una librería externa. Sale con código 1 si algo falla.
+
+Uso:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --budget-ms 100 --repeat 5 --top 15
+"""
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Scripts cuyo arranque se mide
+ENTRY_POINTS = ("app.py", "cli.py")
+
+# Librerías que el pipeline necesita siempre: se cuentan como externas aunque
+# el script no las importe directamente (cli.py las trae vía utils)
+BASE_LIBRARIES = ("numpy", "pandas", "pyarrow")
+
+# Módulos que se importan recién en la sección que los usa
+HEAVY_MODULES = (
+    "plotly.express",
+    "plotly.subplots",
+    "xlsxwriter",
+    "requests",
+    "duckdb",
+    "kaleido",
+    "concurrent.futures.process",
+    "multiprocessing.shared_memory",
+)
+
+
+def startup_imports(script):
+    """Sentencias import de nivel de módulo de `script` (las que corren al arrancar)."""
+    with open(os.path.join(APP_DIR, script), encoding="utf-8") as f:
+        arbol = ast.parse(f.read(), filename=script)
+    return [nodo for nodo in arbol.body if isinstance(nodo, (ast.Import, ast.ImportFrom))]
+
+
+def _is_dashboard(nodo):
+    if isinstance(nodo, ast.ImportFrom):
+        return (nodo.module or "").split(".")[0] == "utils"
+    return any(alias.name.split(".")[0] == "utils" for alias in nodo.names)
+
+
+def import_code(nodos):
+    return "\n".join(ast.unparse(nodo) for nodo in nodos) or "pass"
+
+
+def importtime(codigo):
+    """
+    Corre `codigo` en un proceso nuevo con -X importtime.
+    Retorna {módulo: (propio_us, acumulado_us)} en orden de importación.
+    """
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=APP_DIR, capture_output=True, text=True,
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(f"falló la importación:\n{proceso.stderr[-2000:]}")
+    modulos = {}
+    for linea in proceso.stderr.splitlines():
+        if not linea.startswith("import time:"):
+            continue
+        propio, acumulado, nombre = linea[len("import time:"):].split("|")
+        if not propio.strip().isdigit():
+            continue  # encabezado
+        modulos[nombre.strip()] = (int(propio), int(acumulado))
+    return modulos
+
+
+def total_ms(modulos):
+    return sum(propio for propio, _ in modulos.values()) / 1000
+
+
+def measure(script, repeticiones):
+    """
+    Mide el arranque de `script`. Retorna (total_ms, agregado_ms, módulos de
+    la última corrida completa, módulos que agregan los del dashboard), con
+    las medianas de las corridas.
+    """
+    nodos = startup_imports(script)
+    externos = import_code(
+        [n for n in nodos if not _is_dashboard(n)] + [ast.Import([ast.alias(nombre)]) for nombre in BASE_LIBRARIES]
+    )
+    completo = import_code(nodos)
+    totales, agregados = [], []
+    for _ in range(repeticiones):
+        base = importtime(externos)
+        todos = importtime(completo)
+        propios = {nombre: tiempos for nombre, tiempos in todos.items() if nombre not in base}
+        totales.append(total_ms(todos))
+        agregados.append(total_ms(propios))
+    return statistics.median(totales), statistics.median(agregados), todos, propios
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=150.0,
+                        help="máximo que pueden sumar los módulos del dashboard al arranque (mediana, ms)")
+    parser.add_argument("--repeat", type=int, default=3, help="corridas por punto de entrada")
+    parser.add_argument("--top", type=int, default=10, help="módulos más caros a listar")
+    args = parser.parse_args()
+
+    fallas = []
+    for script in ENTRY_POINTS:
+        total, agregado, todos, propios = measure(script, args.repeat)
+        print(f"{script}: {total:.0f} ms de imports, {agregado:.0f} ms del dashboard "
+              f"(presupuesto {args.budget_ms:.0f} ms)")
+        caros = sorted(propios.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+        for nombre, (propio, acumulado) in caros:
+            print(f"  {propio / 1000:>8.1f} ms  (acumulado {acumulado / 1000:>7.1f} ms)  {nombre}")
+
+        if agregado > args.budget_ms:
+            fallas.append(f"{script}: {agregado:.0f} ms supera el presupuesto de {args.budget_ms:.0f} ms")
+        for modulo in HEAVY_MODULES:
+            if modulo in propios:
+                fallas.append(f"{script}: importa {modulo} al arrancar")
+            elif modulo in todos:
+                print(f"  (ℹ️ {modulo} ya lo importa una librería externa)")
+        print()
+
+    if fallas:
+        for falla in fallas:
+            print(f"❌ {falla}")
+        sys.exit(1)
+    print("✅ Arranque dentro del presupuesto y sin módulos pesados")
+
+
+if __name__ == "__main__":
+    main()
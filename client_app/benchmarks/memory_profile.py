@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Perfil de memoria del pipeline del dashboard, etapa por etapa.
+
+Para cada etapa (lectura, compactación, exclusión de familias, process_data, cubo, índice de
+filtros, filtrado, resumen global, datos interanuales) informa el tiempo, el
+pico de RSS del proceso durante la etapa, la memoria extra que pidió la etapa
+(pico menos RSS al empezar) y, con --tracemalloc, el pico de memoria asignada
+por Python/numpy. Al final compara la memoria extra de la etapa más cara contra
+el tamaño de los datos crudos en memoria y muestra el reporte de memoria por
+columna de la compactación (--no-compact mide el pipeline sin compactar).
+
+Uso:
+    python benchmarks/memory_profile.py --rows 2000000
+    python benchmarks/memory_profile.py --files ventas_2024.xlsx ventas_2025.xlsx
+    python benchmarks/memory_profile.py --rows 500000 --max-ratio 2.0   # falla si se supera
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+# Ejecutable desde cualquier directorio: los módulos del dashboard están en client_app/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.compact import compact_frame, memory_report  # noqa: E402
+from utils.cube import build_cube  # noqa: E402
+from utils.data_loader import parse_files  # noqa: E402
+from utils.filter_index import FilterIndex  # noqa: E402
+from utils.metrics import current_rss  # noqa: E402
+from utils.processor import exclude_families, process_data, build_global_summary, prepare_yoy_data  # noqa: E402
+from utils.schema import apply_schema  # noqa: E402
+
+MB = 1024 * 1024
+
+
+class PeakSampler:
+    """Muestrea el RSS en un hilo aparte y recuerda el máximo desde el último reset."""
+
+    def __init__(self, intervalo=0.005):
+        self.intervalo = intervalo
+        self.pico = current_rss()
+        self._fin = threading.Event()
+        self._hilo = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._fin.is_set():
+            self.pico = max(self.pico, current_rss())
+            time.sleep(self.intervalo)
+
+    def start(self):
+        self._hilo.start()
+        return self
+
+    def reset(self):
+        self.pico = current_rss()
+
+    def stop(self):
+        self._fin.set()
+        self._hilo.join()
+
+
+def synthetic_sales(n_filas, seed=0):
+    """Líneas de venta sintéticas con las columnas y tipos del esquema de entrada."""
+    rng = np.random.default_rng(seed)
+    n_clientes = max(n_filas // 150, 10)
+    # El 330 va como número suelto ("330 CC"), como en el ERP, para que cuente en CCC Ñandú
+    productos = np.array([
+        f"{marca} {sabor} {calibre} CC {bultos}x" if calibre == 330 else f"{marca} {sabor} {calibre}cc {bultos}x"
+        for marca in ["LEVITE", "HEINEKEN", "MILLER", "IMPERIAL GOLDEN", "CRISTAL", "AGUA PURA"]
+        for sabor in ["POMELO", "NARANJA", "MANZANA", "LIMONADA", "ORIGINAL"]
+        for calibre in [330, 500, 1000, 1500, 2250]
+        for bultos in [6, 12]
+    ], dtype=object)
+    marcas = np.array([p.rsplit(" ", 3)[0].split(" ")[0] for p in productos], dtype=object)
+    prod = rng.integers(0, len(productos), n_filas)
+    cliente = rng.integers(0, n_clientes, n_filas)
+    kg = np.round(rng.gamma(2.0, 8.0, n_filas), 2)
+    kg[rng.random(n_filas) < 0.02] *= -1
+    df = pd.DataFrame({
+        "Fecha": (45292 + rng.integers(0, 730, n_filas)).astype("float64"),
+        "Kg": kg,
+        "Kg_Lt": kg,
+        "Descripcion": productos[prod],
+        "NetoSD": np.round(kg * rng.uniform(800, 1200, n_filas), 2),
+        "PorcDescLinea": rng.choice([0.0, 5.0, 10.0], n_filas),
+        "CodigoCliente": cliente + 1000,
+        "RazonSocial": np.char.add("CLIENTE ", cliente.astype(str)).astype(object),
+        "Marcas": marcas[prod],
+        "Rubro": np.where(marcas[prod] == "AGUA", "AGUA", "CERVEZA").astype(object),
+        "Grupo": rng.choice(np.array(["BEBIDAS", "CERVEZAS", "AGUAS", "POP"], dtype=object), n_filas, p=[.4, .4, .19, .01]),
+        "Canal": rng.choice(np.array(["MAYORISTA", "MINORISTA", "AUTOSERVICIO"], dtype=object), n_filas),
+        "NomSupervisor": rng.choice(np.array(["SUP A", "SUP B", "SUP C"], dtype=object), n_filas),
+        "NomVendedor": np.char.add("VEND ", (cliente % 40).astype(str)).astype(object),
+    })
+    return apply_schema(df)
+
+
+def load_files(paths):
+    files = [(os.path.basename(p), open(p, "rb").read()) for p in paths]
+    dfs = []
+    for name, df, error in parse_files(files):
+        if error is not None:
+            raise SystemExit(f"Error leyendo {name}: {error}")
+        if isinstance(df, pd.DataFrame):
+            dfs.append(df)
+    return pd.concat(dfs, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    origen = parser.add_mutually_exclusive_group()
+    origen.add_argument("--rows", type=int, default=1_000_000, help="filas de datos sintéticos")
+    origen.add_argument("--files", nargs="+", help="archivos Excel de ventas a leer")
+    parser.add_argument("--date-from", default="2024-01-01")
+    parser.add_argument("--date-to", default="2025-12-31")
+    parser.add_argument("--tracemalloc", action="store_true", help="medir también el pico de tracemalloc (más lento)")
+    parser.add_argument("--no-compact", action="store_true", help="no compactar los datos leídos")
+    parser.add_argument("--max-ratio", type=float, help="falla si alguna etapa pide más de N veces los datos crudos")
+    args = parser.parse_args()
+
+    muestreo = PeakSampler().start()
+    base_rss = current_rss()
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    resultados = []
+    datos = {}
+
+    def etapa(nombre, func):
+        muestreo.reset()
+        antes = current_rss()
+        if args.tracemalloc:
+            tracemalloc.reset_peak()
+        inicio = time.perf_counter()
+        valor = func()
+        segundos = time.perf_counter() - inicio
+        pico_traced = tracemalloc.get_traced_memory()[1] if args.tracemalloc else None
+        resultados.append((nombre, segundos, muestreo.pico, muestreo.pico - antes, pico_traced, current_rss()))
+        return valor
+
+    if args.files:
+        crudo = etapa("lectura", lambda: load_files(args.files))
+    else:
+        crudo = etapa("lectura (sintético)", lambda: synthetic_sales(args.rows))
+    tamano_crudo = crudo.memory_usage(deep=True).sum()
+
+    date_from, date_to = pd.Timestamp(args.date_from), pd.Timestamp(args.date_to)
+    reporte = None
+    if not args.no_compact:
+        compacto = etapa("compact_frame", lambda: compact_frame(crudo))
+        reporte = memory_report(crudo, compacto)
+        crudo = compacto
+    datos["ventas"] = etapa("exclude_families", lambda: exclude_families(crudo))
+    datos["procesado"] = etapa("process_data", lambda: process_data(datos["ventas"], date_from, date_to))
+    datos["cubo"] = etapa("build_cube", lambda: build_cube(datos["procesado"]))
+    indice = etapa("FilterIndex", lambda: FilterIndex(datos["cubo"]))
+
+    def filtrar():
+        seleccion = indice.all_rows()
+        canales = indice.options("Canal")[:2]
+        seleccion &= indice.select("Canal", canales)
+        return datos["cubo"][indice.rows(seleccion)]
+
+    filtrado = etapa("filtros", filtrar)
+    etapa("build_global_summary", lambda: build_global_summary(filtrado, date_to, 20, 10, 1000))
+    etapa("prepare_yoy_data", lambda: prepare_yoy_data(filtrado, date_to))
+    muestreo.stop()
+
+    print(f"Filas crudas: {len(crudo):,}   datos crudos en memoria: {tamano_crudo / MB:,.1f} MB   "
+          f"RSS inicial: {base_rss / MB:,.1f} MB")
+    print(f"Filas procesadas: {len(datos['procesado']):,}   filas del cubo: {len(datos['cubo']):,}")
+    print()
+    encabezado = f"{'etapa':<22}{'seg':>9}{'pico RSS MB':>14}{'extra MB':>11}{'RSS final MB':>14}"
+    if args.tracemalloc:
+        encabezado += f"{'pico traced MB':>16}"
+    print(encabezado)
+    for nombre, segundos, pico, extra, pico_traced, final in resultados:
+        linea = f"{nombre:<22}{segundos:>9.2f}{pico / MB:>14,.1f}{extra / MB:>11,.1f}{final / MB:>14,.1f}"
+        if args.tracemalloc:
+            linea += f"{pico_traced / MB:>16,.1f}"
+        print(linea)
+
+    if reporte is not None:
+        print()
+        print(reporte.to_string())
+
+    # Memoria extra de la etapa más cara (sin contar la lectura), relativa a los datos crudos
+    nombre, _, _, extra, _, _ = max(resultados[1:], key=lambda r: r[3])
+    ratio = extra / tamano_crudo if tamano_crudo else 0
+    print()
+    print(f"Pico de RSS total: {max(r[2] for r in resultados) / MB:,.1f} MB")
+    print(f"Etapa más cara: {nombre}, {extra / MB:,.1f} MB extra = {ratio:.2f} x datos crudos")
+    if args.max_ratio is not None and ratio > args.max_ratio:
+        print(f"❌ Se superó el límite de {args.max_ratio:.2f} x")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
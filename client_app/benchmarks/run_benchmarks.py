@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Benchmarks del pipeline completo sobre un conjunto de datos generado con
+benchmarks/generate_dataset.py.
+
+Mide, con N repeticiones cada una: load_multiple_excels (sin caché en disco y
+con la caché ya armada), load_planes_file, process_data, build_cube,
+build_global_summary, prepare_yoy_data, los gráficos interanuales
+(yoy_figures) y los dos exportadores. Guarda los resultados en JSON (tiempos
+de cada repetición, mediana, mínimo, filas y crecimiento de memoria, más el
+entorno y el dataset) para poder comparar corridas con --compare.
+
+Uso:
+    python benchmarks/run_benchmarks.py --data datasets/1m --output resultados/1m.json
+    python benchmarks/run_benchmarks.py --rows 100k            # genera el dataset en un directorio temporal
+    python benchmarks/run_benchmarks.py --data datasets/1m --compare resultados/antes.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# La caché en disco de archivos parseados va a un directorio propio de la corrida
+# (se fija antes de importar los módulos del dashboard, que la leen de la configuración)
+_CACHE_DIR = tempfile.mkdtemp(prefix="dashboard_bench_cache_")
+os.environ["DASHBOARD_CACHE_DIR"] = _CACHE_DIR
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import streamlit.logger  # noqa: E402
+
+# Fuera de `streamlit run`, los avisos de Streamlit (cachés sin runtime) solo ensucian la salida
+streamlit.logger.set_log_level("error")
+
+# Ejecutable desde cualquier directorio: los módulos del dashboard están en client_app/
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate_dataset import generate, parse_size  # noqa: E402
+from utils.cache import clear_cache  # noqa: E402
+from utils.config import BACKEND  # noqa: E402
+from utils.cube import build_cube  # noqa: E402
+from utils.data_loader import load_planes_file, read_files  # noqa: E402
+from utils.exporter import export_to_excel, export_clientes_y_sabores  # noqa: E402
+from utils.metrics import current_rss, rows  # noqa: E402
+from utils.plotter import yoy_figures  # noqa: E402
+from utils.processor import exclude_families, process_data, build_global_summary, prepare_yoy_data  # noqa: E402
+
+MB = 1024 * 1024
+
+# Formato de los archivos de resultados (subir si cambia la estructura)
+RESULTS_VERSION = 1
+
+
+class NamedBytes(io.BytesIO):
+    """Contenido de un archivo con nombre, como los que entrega st.file_uploader."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            super().__init__(f.read())
+        self.name = os.path.basename(path)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    """Datos del entorno de la corrida (para no comparar peras con manzanas)."""
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "motor": BACKEND,
+        "commit": git_commit(),
+    }
+
+
+def measure(nombre, func, repeticiones, antes=None):
+    """
+    Corre `func` `repeticiones` veces (llamando a `antes` previo a cada una) y
+    retorna (último resultado, medición).
+    """
+    tiempos, memoria = [], []
+    resultado = None
+    for _ in range(repeticiones):
+        if antes is not None:
+            antes()
+        resultado = None
+        rss = current_rss()
+        inicio = time.perf_counter()
+        resultado = func()
+        tiempos.append(time.perf_counter() - inicio)
+        memoria.append((current_rss() - rss) / MB)
+    medicion = {
+        "segundos": [round(t, 6) for t in tiempos],
+        "mediana": round(statistics.median(tiempos), 6),
+        "minimo": round(min(tiempos), 6),
+        "memoria_mb": round(max(memoria), 1),
+        "filas": rows(resultado),
+    }
+    print(f"  {nombre:<28}{medicion['mediana']:>10.3f} s  (mín {medicion['minimo']:.3f})", flush=True)
+    return resultado, medicion
+
+
+def run(data_dir, repeticiones, export_figures=False):
+    """Corre todas las etapas sobre el dataset de `data_dir`. Retorna el diccionario de resultados."""
+    with open(os.path.join(data_dir, "dataset.json"), encoding="utf-8") as f:
+        dataset = json.load(f)
+    rutas = [os.path.join(data_dir, nombre) for nombre in dataset["archivos"] + [dataset["planes"]]]
+    date_from, date_to = pd.Timestamp(dataset["desde"]), pd.Timestamp(dataset["hasta"])
+
+    def cargar(archivos, date_from, date_to):
+        # Cuerpo de load_multiple_excels sin la interfaz ni la caché de Streamlit
+        df, planes, _, _ = read_files([(a.name, a.getvalue()) for a in archivos], date_from, date_to)
+        return df, planes
+
+    etapas = {}
+
+    def etapa(nombre, func, antes=None):
+        resultado, etapas[nombre] = measure(nombre, func, repeticiones, antes)
+        return resultado
+
+    archivos = [NamedBytes(ruta) for ruta in rutas]
+    ventas, planes = etapa(
+        "load_multiple_excels", lambda: cargar(archivos, date_from, date_to), antes=clear_cache,
+    )
+    etapa("load_multiple_excels_cache", lambda: cargar(archivos, date_from, date_to))
+    etapa("load_planes_file", lambda: load_planes_file(NamedBytes(rutas[-1])))
+
+    ventas = exclude_families(ventas)
+    procesado = etapa("process_data", lambda: process_data(ventas, date_from, date_to, planes))
+    etapa("build_cube", lambda: build_cube(procesado))
+    resumen = etapa("build_global_summary", lambda: build_global_summary(procesado, date_to, 20, 10, 1000))
+    yoy_data, channel_data = etapa("prepare_yoy_data", lambda: prepare_yoy_data(procesado, date_to))
+    figuras = etapa("yoy_figures", lambda: yoy_figures(yoy_data, channel_data))
+    etapa(
+        "export_to_excel",
+        lambda: export_to_excel(resumen, figuras=list(figuras.values()) if export_figures else None),
+    )
+    etapa("export_clientes_y_sabores", lambda: export_clientes_y_sabores(procesado))
+
+    return {
+        "version": RESULTS_VERSION,
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "entorno": environment(),
+        "dataset": dataset,
+        "repeticiones": repeticiones,
+        "etapas": etapas,
+    }
+
+
+def compare(anterior, actual):
+    """Tabla de medianas de dos corridas: anterior, actual y cociente (actual / anterior)."""
+    print()
+    print(f"{'etapa':<30}{'anterior s':>12}{'actual s':>12}{'cociente':>10}")
+    for nombre, medicion in actual["etapas"].items():
+        previa = anterior.get("etapas", {}).get(nombre)
+        if previa is None:
+            print(f"{nombre:<30}{'-':>12}{medicion['mediana']:>12.3f}{'-':>10}")
+            continue
+        cociente = medicion["mediana"] / previa["mediana"] if previa["mediana"] else float("inf")
+        print(f"{nombre:<30}{previa['mediana']:>12.3f}{medicion['mediana']:>12.3f}{cociente:>9.2f}x")
+    if anterior.get("dataset", {}).get("filas") != actual["dataset"].get("filas"):
+        print("⚠️ Las corridas usan datasets de distinto tamaño")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    origen = parser.add_mutually_exclusive_group(required=True)
+    origen.add_argument("--data", help="directorio generado con generate_dataset.py")
+    origen.add_argument("--rows", help="generar un dataset temporal de N filas (100k, 1M, ...)")
+    parser.add_argument("--repeat", type=int, default=3, help="repeticiones de cada etapa")
+    parser.add_argument("--output", help="archivo JSON de resultados (por defecto benchmarks/resultados/<fecha>.json)")
+    parser.add_argument("--compare", help="resultados de una corrida anterior para comparar")
+    parser.add_argument("--export-figures", action="store_true", help="incluir las imágenes de los gráficos en el Excel")
+    args = parser.parse_args()
+
+    temporal = None
+    try:
+        data_dir = args.data
+        if args.rows:
+            temporal = data_dir = tempfile.mkdtemp(prefix="dashboard_bench_data_")
+            print(f"Generando dataset de {parse_size(args.rows):,} filas...")
+            generate(data_dir, parse_size(args.rows))
+
+        print(f"Benchmarks sobre {data_dir} ({args.repeat} repeticiones)")
+        resultados = run(data_dir, args.repeat, args.export_figures)
+    finally:
+        shutil.rmtree(_CACHE_DIR, ignore_errors=True)
+        if temporal:
+            shutil.rmtree(temporal, ignore_errors=True)
+
+    salida = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "resultados",
+        f"{datetime.now():%Y%m%d_%H%M%S}_{resultados['dataset']['filas']}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, indent=2, ensure_ascii=False)
+    print(f"✅ Resultados en {salida}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), resultados)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Genera los Excel del dashboard sin interfaz (por ejemplo, en una tarea nocturna):
+resumen_ventas.xlsx y la planilla de CCC Ñandú / PV Levite, a partir de un
+directorio (o una lista) de planillas de ventas y, opcionalmente, PLANES.
+
+Usa la misma licencia que la aplicación (license_config.json).
+
+Uso:
+    python cli.py /datos/ventas --desde 2024-01-01 --hasta 2025-06-30 --salida /datos/reportes
+    python cli.py ventas_2024.xlsx ventas_2025.xlsx PLANES.xlsx --filtro Canal=KIOSCO,MAYORISTA --plan "PLAN A"
+    python cli.py /datos/ventas --filtro Calibre=330 --figuras   # gráficos en el resumen (requiere kaleido)
+"""
+import argparse
+import os
+import sys
+from datetime import date, datetime
+
+# Los módulos del dashboard se importan relativos a este directorio
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Fuera de `streamlit run`, los avisos de Streamlit (cachés sin runtime) solo ensucian la salida
+import streamlit.logger  # noqa: E402
+streamlit.logger.set_log_level("error")
+
+from utils import pipeline  # noqa: E402
+
+# Columnas que acepta --filtro (nombre en la interfaz -> columna)
+FILTER_NAMES = {
+    "familia": "Grupo", "canal": "Canal", "marca": "Marcas", "supervisor": "NomSupervisor",
+    "vendedor": "NomVendedor", "cliente": "RazonSocial", "calibre": "Calibre",
+}
+
+
+def parse_filter(texto):
+    """Convierte "Canal=KIOSCO,MAYORISTA" en ("Canal", ["KIOSCO", "MAYORISTA"])."""
+    nombre, separador, valores = texto.partition("=")
+    if not separador or not valores:
+        raise argparse.ArgumentTypeError(f"filtro inválido '{texto}' (se espera COLUMNA=valor1,valor2)")
+    columna = FILTER_NAMES.get(nombre.strip().lower(), nombre.strip())
+    if columna not in FILTER_NAMES.values():
+        raise argparse.ArgumentTypeError(f"columna de filtro desconocida '{nombre}'")
+    return columna, [v.strip() for v in valores.split(",") if v.strip()]
+
+
+def parse_date(texto):
+    return datetime.strptime(texto, "%Y-%m-%d").date()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("fuentes", nargs="+", help="planillas de ventas / PLANES, o directorios que las contienen")
+    parser.add_argument("--desde", type=parse_date, default=date(2024, 1, 1), help="AAAA-MM-DD (por defecto 2024-01-01)")
+    parser.add_argument("--hasta", type=parse_date, default=date.today(), help="AAAA-MM-DD (por defecto hoy)")
+    parser.add_argument("--salida", default=".", help="directorio donde se escriben los Excel")
+    parser.add_argument("--filtro", type=parse_filter, action="append", default=[],
+                        help="COLUMNA=valor1,valor2 (familia, canal, marca, supervisor, vendedor, cliente, calibre)")
+    parser.add_argument("--plan", help="solo los clientes de este plan del archivo PLANES")
+    parser.add_argument("--salidas-mes", type=int, default=pipeline.DEFAULT_SALIDAS_MES)
+    parser.add_argument("--salidas-actuales", type=int, default=pipeline.DEFAULT_SALIDAS_ACTUALES)
+    parser.add_argument("--cartera", type=int, default=pipeline.DEFAULT_CARTERA)
+    parser.add_argument("--figuras", action="store_true", help="incluir los gráficos interanuales en el resumen")
+    parser.add_argument("--workers", type=int, help="procesos para leer las planillas (por defecto, uno por CPU)")
+    args = parser.parse_args()
+
+    from utils.license_manager import LicenseManager
+    # Sin interfaz: los errores de conexión vuelven en el mensaje en lugar de ir a st.error
+    valida, mensaje = LicenseManager().check_license_status(show_errors=False)
+    if not valida:
+        sys.exit(f"🚫 Licencia inválida: {mensaje}")
+
+    filtros = {}
+    for columna, valores in args.filtro:
+        filtros.setdefault(columna, []).extend(valores)
+
+    try:
+        resultado = pipeline.run(
+            args.fuentes, args.desde, args.hasta, filtros=filtros, plan=args.plan,
+            salidas_mes=args.salidas_mes, salidas_actuales=args.salidas_actuales, cartera=args.cartera,
+            figures=args.figuras, max_workers=args.workers,
+        )
+    except (OSError, ValueError) as e:
+        sys.exit(f"❌ {e}")
+
+    for nombre, error in resultado["errores"]:
+        print(f"❌ Error leyendo {nombre}: {error}", file=sys.stderr)
+    if resultado["ventas"] == 0:
+        sys.exit("❌ No hay ventas en los archivos para el período elegido")
+    if resultado["datos"].empty or resultado["resumen"].empty:
+        sys.exit("❌ No hay ventas para el período y los filtros elegidos")
+
+    os.makedirs(args.salida, exist_ok=True)
+    salidas = [
+        ("resumen_ventas.xlsx", resultado["resumen_excel"]),
+        (resultado["clientes_excel_nombre"], resultado["clientes_excel"]),
+    ]
+    for nombre, contenido in salidas:
+        ruta = os.path.join(args.salida, nombre)
+        with open(ruta, "wb") as f:
+            f.write(contenido)
+        print(f"✅ {ruta}")
+    print(resultado["resumen"].T.to_string(header=False))
+    return 1 if resultado["errores"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+# utils/cache.py
+"""
+Caché en disco de los archivos Excel ya parseados.
+
+Cada archivo se guarda en formato Parquet, identificado por la huella (SHA-256)
+de su contenido más el motor de lectura y las versiones de las librerías.
+Volver a subir un archivo ya visto evita el parseo con openpyxl/pyxlsb.
+El tamaño total está acotado y se desalojan primero los menos usados (LRU).
+"""
+import hashlib
+import os
+import uuid
+from importlib import metadata
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.config import CACHE_DIR, CACHE_MAX_MB
+
+# Subir este número cuando cambie la forma en que se parsean los archivos
+CACHE_VERSION = 1
+
+# Filas por grupo en los Parquet: las estadísticas min/max de cada grupo
+# permiten saltear los que quedan fuera de un filtro (ej. por fecha)
+ROW_GROUP_SIZE = 65_536
+
+EXCEL_CACHE_DIR = os.path.join(CACHE_DIR, "excel")
+
+
+def file_bytes(file):
+    """Devuelve el contenido completo de un archivo subido (o un BytesIO)."""
+    if hasattr(file, "getvalue"):
+        return file.getvalue()
+    pos = file.tell()
+    file.seek(0)
+    data = file.read()
+    file.seek(pos)
+    return data
+
+
+def fingerprint(data):
+    """Huella SHA-256 del contenido de un archivo."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def upload_fingerprints(files, memo=None):
+    """
+    Huellas SHA-256 del contenido de archivos subidos, en orden.
+    memo: dict (ej. en st.session_state) donde se guarda la huella de cada
+    archivo por su file_id, para no volver a leerlo en cada ejecución.
+    """
+    huellas = []
+    for file in files:
+        file_id = getattr(file, "file_id", None)
+        if memo is None or file_id is None:
+            huellas.append(fingerprint(file_bytes(file)))
+            continue
+        if file_id not in memo:
+            memo[file_id] = fingerprint(file_bytes(file))
+        huellas.append(memo[file_id])
+    return tuple(huellas)
+
+
+def _version(paquete):
+    try:
+        return metadata.version(paquete)
+    except metadata.PackageNotFoundError:
+        return "?"
+
+
+def cache_key(huella, engine, **opciones):
+    """
+    Clave de caché: huella del contenido + motor de lectura y su versión
+    + versión de pandas + opciones de lectura.
+    """
+    partes = [
+        f"v{CACHE_VERSION}",
+        huella,
+        str(engine),
+        _version(engine) if engine else _version("openpyxl"),
+        _version("pandas"),
+    ]
+    partes += [f"{k}={opciones[k]}" for k in sorted(opciones)]
+    return hashlib.sha256("|".join(partes).encode("utf-8")).hexdigest()
+
+
+def _path(key):
+    return os.path.join(EXCEL_CACHE_DIR, f"{key}.parquet")
+
+
+def normalize_for_parquet(df):
+    """
+    Deja el DataFrame en una forma que Parquet puede guardar:
+    nombres de columna como texto y columnas con tipos mezclados
+    (ej. códigos numéricos y alfanuméricos) convertidas a texto, manteniendo los nulos.
+    """
+    if not all(isinstance(c, str) for c in df.columns):
+        df = df.rename(columns=str)
+    mezcladas = []
+    for col in df.columns:
+        if df[col].dtype == object:
+            try:
+                pa.array(df[col], from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                mezcladas.append(col)
+    if mezcladas:
+        df = df.copy()
+        for col in mezcladas:
+            s = df[col]
+            df[col] = s.where(s.isna(), s.astype(str))
+    return df
+
+
+def cached_schema(key):
+    """Esquema Arrow del archivo en caché (solo lee el pie del Parquet), o None."""
+    try:
+        return pq.read_schema(_path(key))
+    except Exception:
+        return None
+
+
+def load_cached(key, filters=None):
+    """
+    Devuelve el DataFrame guardado para la clave, o None si no está en caché.
+    filters: filtros de pyarrow; los grupos de filas que no cumplen no se leen.
+    """
+    path = _path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        df = pd.read_parquet(path, filters=filters)
+    except Exception:
+        # Archivo corrupto o incompleto: se descarta
+        _remove(path)
+        return None
+    # Marcar como usado recientemente (para el desalojo LRU)
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return df
+
+
+def store_cached(key, df):
+    """
+    Guarda el DataFrame en la caché y aplica el límite de tamaño.
+    Retorna el DataFrame normalizado, igual al que devolverá load_cached.
+    """
+    df = normalize_for_parquet(df)
+    os.makedirs(EXCEL_CACHE_DIR, exist_ok=True)
+    path = _path(key)
+    # Escritura atómica: otro proceso nunca ve un archivo a medio escribir
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        df.to_parquet(tmp, index=False, row_group_size=ROW_GROUP_SIZE)
+        os.replace(tmp, path)
+    except Exception:
+        _remove(tmp)
+        return df
+    enforce_size_limit()
+    return df
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _entries():
+    """Lista de (ruta, tamaño, último uso) de los archivos en caché."""
+    if not os.path.isdir(EXCEL_CACHE_DIR):
+        return []
+    entradas = []
+    for nombre in os.listdir(EXCEL_CACHE_DIR):
+        if not nombre.endswith(".parquet"):
+            continue
+        path = os.path.join(EXCEL_CACHE_DIR, nombre)
+        try:
+            info = os.stat(path)
+        except OSError:
+            continue
+        entradas.append((path, info.st_size, info.st_mtime))
+    return entradas
+
+
+def enforce_size_limit(max_mb=None):
+    """Desaloja los archivos usados hace más tiempo hasta quedar bajo el límite."""
+    limite = (CACHE_MAX_MB if max_mb is None else max_mb) * 1024 * 1024
+    entradas = sorted(_entries(), key=lambda e: e[2])
+    total = sum(e[1] for e in entradas)
+    for path, size, _ in entradas:
+        if total <= limite:
+            break
+        _remove(path)
+        total -= size
+
+
+def cache_stats():
+    """Retorna (cantidad_de_archivos, tamaño_total_en_bytes) de la caché."""
+    entradas = _entries()
+    return len(entradas), sum(e[1] for e in entradas)
+
+
+def clear_cache():
+    """Invalida toda la caché. Retorna la cantidad de archivos eliminados."""
+    entradas = _entries()
+    for path, _, _ in entradas:
+        _remove(path)
+    return len(entradas)
@@ -0,0 +1,174 @@
+# utils/catalog.py
+"""
+Catálogo de atributos de producto, calculado una vez por cada Descripcion distinta.
+
+Hay unos pocos cientos de SKUs contra millones de líneas de venta, así que los
+atributos que se derivan del texto (calibre, bultos, sabor Levite, calibre 330,
+"golden", etc.) se calculan sobre las descripciones únicas y se vuelven a
+expandir a las filas con los códigos de `pd.factorize`.
+
+El catálogo se guarda en disco entre sesiones: solo se parsean los SKUs nuevos.
+"""
+import os
+import re
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from utils.config import CACHE_DIR
+from utils.normalize import normalize_text, normalize_column
+from utils.parallel import parallel_apply_series
+
+# Subir este número cuando cambie alguna regla de extracción (descarta el catálogo guardado)
+CATALOG_VERSION = 1
+
+CATALOG_PATH = os.path.join(CACHE_DIR, f"catalogo_productos_v{CATALOG_VERSION}.parquet")
+
+_RE_CALIBRE = re.compile(r"(?:x\s*)?(\d{2,4})\s*(?:ml|cc|loc|l|lt)?")
+_RE_BULTOS = re.compile(r"(\d+)\s*[xX]")
+
+# Atributos que calcula el catálogo (columnas del DataFrame que devuelve)
+ATTRIBUTE_COLUMNS = [
+    "Calibre", "Calibre_CC", "Bultos", "NanduSin330",
+    "SaborLevite", "SaborValido", "Calibre330", "Golden",
+]
+
+# Catálogo en memoria: índice = Descripcion, columnas = ATTRIBUTE_COLUMNS
+_catalogo = None
+
+
+def extract_calibre(descripcion):
+    match = _RE_CALIBRE.search(str(descripcion).lower())
+    if match:
+        return match.group(1)
+    return "Sin Calibre"
+
+
+def extract_bultos(descripcion):
+    match = _RE_BULTOS.search(str(descripcion))
+    return int(match.group(1)) if match else 1
+
+
+def compute_attributes(descripciones):
+    """
+    Calcula los atributos de producto para una serie de descripciones
+    (con las mismas expresiones que se usaban fila por fila).
+    """
+    desc = pd.Series(descripciones).reset_index(drop=True)
+    attrs = pd.DataFrame(index=desc.index)
+
+    attrs["Calibre"] = parallel_apply_series(desc, extract_calibre).astype(object)
+    attrs["Calibre_CC"] = pd.to_numeric(desc.str.extract(r'(\d+)\s*cc')[0], errors='coerce').astype(float)
+    attrs["Bultos"] = parallel_apply_series(desc, extract_bultos).astype(np.int64)
+
+    # Filtro de 'ccc ñandu': solo cuenta con calibre 330
+    es_nandu = desc.str.contains('ñandu', case=False, na=False)
+    tiene_330 = desc.str.contains('330', na=False)
+    attrs["NanduSin330"] = (es_nandu & ~tiene_330).astype(bool)
+
+    # Sabor Levite (excluyendo "limonada" en SaborValido)
+    sabor = desc.astype(str).str.lower().str.extract(r"levite\s+([a-záéíóúñ]+(?:\s+[a-záéíóúñ]+)?)")[0]
+    sabor = sabor.fillna("").str.strip().str.title()
+    attrs["SaborLevite"] = sabor.astype(object)
+    attrs["SaborValido"] = ((sabor != "") & ~sabor.str.contains(r"limonada", case=False, na=False)).astype(bool)
+
+    # Calibre 330 y "golden" (para CCC Ñandú)
+    attrs["Calibre330"] = desc.astype(str).str.contains(r"\b330\b", na=False).astype(bool)
+    attrs["Golden"] = parallel_apply_series(desc, normalize_text).str.contains("golden", na=False).astype(bool)
+    return attrs
+
+
+def _load_catalog():
+    global _catalogo
+    if _catalogo is None:
+        try:
+            _catalogo = pd.read_parquet(CATALOG_PATH).set_index("Descripcion")
+        except Exception:
+            _catalogo = pd.DataFrame(columns=ATTRIBUTE_COLUMNS, index=pd.Index([], name="Descripcion", dtype=object))
+    return _catalogo
+
+
+def _save_catalog(catalogo):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = f"{CATALOG_PATH}.{uuid.uuid4().hex}.tmp"
+        catalogo.reset_index().to_parquet(tmp, index=False)
+        os.replace(tmp, CATALOG_PATH)
+    except Exception:
+        # El catálogo es solo una optimización: si no se puede guardar se recalcula
+        pass
+
+
+def _attributes_for_uniques(uniques):
+    """Atributos para cada descripción única, usando y ampliando el catálogo."""
+    global _catalogo
+    catalogo = _load_catalog()
+    uniques = pd.Index(uniques)
+    # Solo las descripciones de texto se guardan en el catálogo
+    es_texto = np.array([isinstance(u, str) for u in uniques], dtype=bool)
+    conocidas = es_texto & uniques.isin(catalogo.index)
+    nuevas = uniques[~conocidas]
+
+    partes = []
+    if conocidas.any():
+        partes.append(pd.DataFrame(catalogo.loc[uniques[conocidas]].to_numpy(),
+                                   columns=ATTRIBUTE_COLUMNS, index=np.flatnonzero(conocidas)))
+    if len(nuevas):
+        calculadas = compute_attributes(pd.Series(nuevas, dtype=object if uniques.dtype == object else uniques.dtype))
+        calculadas.index = np.flatnonzero(~conocidas)
+        partes.append(calculadas)
+        para_guardar = calculadas[es_texto[~conocidas]]
+        if len(para_guardar):
+            para_guardar = para_guardar.set_axis(nuevas[es_texto[~conocidas]].astype(object))
+            para_guardar.index.name = "Descripcion"
+            _catalogo = pd.concat([catalogo, para_guardar]) if len(catalogo) else para_guardar
+            _save_catalog(_catalogo)
+    return pd.concat(partes).sort_index() if partes else pd.DataFrame(columns=ATTRIBUTE_COLUMNS)
+
+
+def product_attributes(descripciones):
+    """
+    Atributos de producto para cada fila de `descripciones` (alineados a su índice).
+    Se calcula una vez por descripción distinta y se expande con los códigos factorizados.
+    """
+    codigos, uniques = pd.factorize(descripciones)
+    tabla = _attributes_for_uniques(uniques)
+    # Última fila: atributos de una descripción nula (código -1)
+    nula = compute_attributes(pd.Series([np.nan], dtype=object))
+    tabla = pd.concat([tabla, nula], ignore_index=True)
+    attrs = tabla.take(codigos)
+    attrs.index = descripciones.index
+    return attrs.astype({
+        "Calibre": str, "SaborLevite": str, "Calibre_CC": float, "Bultos": np.int64, "NanduSin330": bool,
+        "SaborValido": bool, "Calibre330": bool, "Golden": bool,
+    })
+
+
+def brand_tags(marcas):
+    """
+    Marcas objetivo de los indicadores (Levite, Heineken, Miller, Imperial) para
+    cada fila de `marcas`, calculadas una vez por marca distinta.
+    """
+    codigos, uniques = pd.factorize(marcas)
+    valores = pd.Series(pd.Index(uniques).append(pd.Index([np.nan], dtype=object)).astype(object))
+    marcas_norm = normalize_column(valores)
+    tabla = pd.DataFrame({
+        "Levite": valores.astype(str).str.strip().str.contains(r"\bLEVITE\b", case=False, na=False),
+        "Heineken": marcas_norm.str.contains("heineken", na=False),
+        "Miller": marcas_norm.str.contains("miller", na=False),
+        "Imperial": marcas_norm.str.contains("imperial", na=False),
+    }).astype(bool)
+    tags = tabla.take(codigos)
+    tags.index = marcas.index
+    return tags
+
+
+def clear_catalog():
+    """Descarta el catálogo guardado (memoria y disco)."""
+    global _catalogo
+    _catalogo = None
+    try:
+        os.remove(CATALOG_PATH)
+    except OSError:
+        pass
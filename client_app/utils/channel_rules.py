@@ -0,0 +1,169 @@
+# utils/channel_rules.py
+"""
+Reglas de canal: fuerzan el Canal de ciertos clientes (ej. SUBDISTRIBUIDOR).
+
+Las reglas se leen de un archivo JSON (canal_reglas.json en client_app/, o la
+ruta de DASHBOARD_CHANNEL_RULES) con la forma:
+
+    {
+      "reglas": [
+        {"canal": "SUBDISTRIBUIDOR", "nombres": ["palma jose lucas", ...]},
+        {"canal": "MAYORISTA", "codigos": ["10234", "10877"]},
+        {"canal": "KEY ACCOUNT", "planes": ["PLAN KA"]}
+      ]
+    }
+
+Cada regla asigna "canal" a los clientes cuyo nombre (Nombre o RazonSocial,
+comparado sin acentos ni mayúsculas) está en "nombres", cuyo código está en
+"codigos" o que pertenecen a alguno de los "planes" del archivo de PLANES. Si
+un cliente cumple varias reglas, gana la última. Sin archivo se usa la regla
+de siempre (los cuatro subdistribuidores).
+
+Las reglas se resuelven sobre los valores distintos de nombre y código (no
+por fila): se arma una tabla cliente -> regla y otra nombre -> regla, y el
+canal de cada fila sale de un `take` sobre esas tablas.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.config import CHANNEL_RULES_PATH
+from utils.normalize import normalize_column, normalize_text
+from utils.schema import as_text
+
+# Regla por defecto: clientes SUBDISTRIBUIDOR por nombre
+DEFAULT_RULES = [
+    {
+        "canal": "SUBDISTRIBUIDOR",
+        "nombres": [
+            "nieto raul edgardo",
+            "distribuciones aldana s.r.l",
+            "palma jose lucas",
+            "crede fernando miguel",
+        ],
+    },
+]
+
+_CRITERIOS = ("nombres", "codigos", "planes")
+
+_cargadas = {}
+
+
+def _read_rules(path):
+    if not os.path.exists(path):
+        return DEFAULT_RULES
+    with open(path, encoding="utf-8") as f:
+        contenido = json.load(f)
+    reglas = contenido.get("reglas", []) if isinstance(contenido, dict) else contenido
+    for i, regla in enumerate(reglas, start=1):
+        if not regla.get("canal"):
+            raise ValueError(f"{path}: la regla {i} no tiene 'canal'")
+        if not any(regla.get(c) for c in _CRITERIOS):
+            raise ValueError(f"{path}: la regla {i} no tiene 'nombres', 'codigos' ni 'planes'")
+    return reglas
+
+
+def load_rules(path=None):
+    """Reglas de canal del archivo (releído solo si cambia) o las de por defecto."""
+    path = path or CHANNEL_RULES_PATH
+    try:
+        estado = os.stat(path)
+        marca = (estado.st_mtime_ns, estado.st_size)
+    except OSError:
+        marca = None
+    if path not in _cargadas or _cargadas[path][0] != marca:
+        _cargadas[path] = (marca, _read_rules(path))
+    return _cargadas[path][1]
+
+
+def rules_version(path=None):
+    """Huella corta de las reglas vigentes (para las claves de caché de datos procesados)."""
+    texto = json.dumps(load_rules(path), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:16]
+
+
+def has_plan_rules(reglas=None):
+    """Indica si alguna regla depende del archivo de PLANES."""
+    reglas = load_rules() if reglas is None else reglas
+    return any(regla.get("planes") for regla in reglas)
+
+
+def rule_lookup(nombres=None, clientes=None, planes=None, reglas=None):
+    """
+    Regla que corresponde a cada nombre distinto y a cada código de cliente
+    distinto (índice en `reglas`, -1 = ninguna). Retorna dos arreglos alineados
+    a `nombres` y `clientes` (None si no se pasan).
+    """
+    reglas = load_rules() if reglas is None else reglas
+    por_nombre = por_cliente = None
+    if nombres is not None:
+        nombres_norm = normalize_column(pd.Series(nombres, dtype=object))
+        por_nombre = np.full(len(nombres), -1, dtype=np.int32)
+    if clientes is not None:
+        # Se compara contra los códigos en texto, igual que el filtro de planes
+        clientes_str = pd.Index(clientes).astype(str)
+        por_cliente = np.full(len(clientes), -1, dtype=np.int32)
+
+    for i, regla in enumerate(reglas):
+        if regla.get("nombres") and nombres is not None:
+            buscados = {normalize_text(n) for n in regla["nombres"]}
+            por_nombre[nombres_norm.isin(buscados).to_numpy()] = i
+        if clientes is not None:
+            codigos = {str(c).strip() for c in regla.get("codigos", [])}
+            for plan in regla.get("planes", []) if planes else []:
+                codigos.update(str(c) for c in planes.get(plan, []))
+            if codigos:
+                por_cliente[clientes_str.isin(codigos)] = i
+    return por_nombre, por_cliente
+
+
+def name_column(df):
+    """Columna con el nombre del cliente para las reglas (Nombre o, si no está, RazonSocial)."""
+    return next((c for c in ["Nombre", "RazonSocial"] if c in df.columns), None)
+
+
+def channel_column(df, planes=None, reglas=None):
+    """
+    Columna Canal de `df` con las reglas aplicadas (las reglas por plan solo si
+    se pasan los `planes`, {plan: [códigos]}). Retorna None si `df` no tiene
+    columnas de nombre ni de código de cliente. Si falta la columna Canal, los
+    clientes sin regla quedan como "SIN_CANAL".
+    """
+    reglas = load_rules() if reglas is None else reglas
+    nombre_col = name_column(df)
+    codigo_col = "CodigoCliente" if "CodigoCliente" in df.columns else None
+    if nombre_col is None and codigo_col is None:
+        return None
+
+    ids_nombre, nombres = pd.factorize(df[nombre_col]) if nombre_col else (None, None)
+    ids_cliente, clientes = pd.factorize(df[codigo_col]) if codigo_col else (None, None)
+    por_nombre, por_cliente = rule_lookup(nombres, clientes, planes, reglas)
+
+    # Regla de cada fila: la mayor entre la de su nombre y la de su cliente
+    # (la última posición de cada tabla es la de los valores nulos: ninguna regla)
+    regla_fila = np.full(len(df), -1, dtype=np.int32)
+    if nombre_col is not None:
+        regla_fila = np.maximum(regla_fila, np.append(por_nombre, -1)[ids_nombre])
+    if codigo_col is not None:
+        regla_fila = np.maximum(regla_fila, np.append(por_cliente, -1)[ids_cliente])
+
+    con_regla = regla_fila >= 0
+    if "Canal" in df.columns:
+        if not con_regla.any():
+            return df["Canal"]
+        canal = df["Canal"].to_numpy(dtype=object, copy=True)
+    else:
+        canal = np.full(len(df), "SIN_CANAL", dtype=object)
+    canales = np.array([regla["canal"] for regla in reglas], dtype=object)
+    canal[con_regla] = canales[regla_fila[con_regla]]
+    canal = pd.Series(canal, index=df.index, name="Canal")
+    if "Canal" not in df.columns:
+        return as_text(canal)
+    if isinstance(df["Canal"].dtype, pd.CategoricalDtype):
+        # Datos compactados: los canales de las reglas pueden no estar entre las categorías
+        return canal.astype("category")
+    # Mismo tipo de texto que el resto de las columnas
+    return canal.astype(df["Canal"].dtype)
@@ -0,0 +1,93 @@
+# utils/compact.py
+"""
+Representación compacta de las ventas en memoria.
+
+Después de leer los archivos, cada columna pasa al tipo más chico que no
+cambia ningún resultado:
+- Texto con pocos valores distintos (familia, marca, canal, vendedor, ...) ->
+  categoría: un código entero por fila más la tabla de valores, ordenada como
+  el texto para que los groupby y los filtros den lo mismo.
+- CodigoCliente -> entero más chico posible si ya es entero; si viene como
+  texto o como decimal (con nulos), categoría (código entero + tabla de
+  clientes), sin cambiar sus valores.
+- Enteros -> el entero más chico que contiene todos los valores.
+
+Las columnas decimales (Kg, NetoSD, ...) quedan en float64: pasarlas a
+float32 cambiaría las sumas del resumen y del Excel.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.config import COMPACT_CATEGORY_RATIO
+from utils.metrics import timed
+
+MB = 1024 * 1024
+
+# Fecha puede venir como serial de Excel o como fecha: la interpreta process_data
+_SIN_COMPACTAR = {"Fecha"}
+
+
+def _as_category(s, max_ratio):
+    """`s` como categoría con los valores ordenados, o None si tiene demasiados distintos."""
+    try:
+        codigos, valores = pd.factorize(s, sort=True)
+    except TypeError:
+        # Valores de tipos mezclados que no se pueden ordenar
+        return None
+    if len(valores) > max_ratio * len(s):
+        return None
+    tipo = pd.CategoricalDtype(valores)
+    return pd.Series(pd.Categorical.from_codes(codigos, dtype=tipo), index=s.index, name=s.name)
+
+
+def compact_column(s, max_ratio=COMPACT_CATEGORY_RATIO):
+    """Versión compacta de una columna (la misma columna si no hay nada que ganar)."""
+    if s.name in _SIN_COMPACTAR or isinstance(s.dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(s.dtype):
+        return s
+    if pd.api.types.is_integer_dtype(s.dtype):
+        return pd.to_numeric(s, downcast="integer")
+    es_texto = pd.api.types.is_object_dtype(s.dtype) or pd.api.types.is_string_dtype(s.dtype)
+    # CodigoCliente decimal (venía con nulos): categoría, sin cambiar sus valores
+    codigo_decimal = s.name == "CodigoCliente" and pd.api.types.is_float_dtype(s.dtype)
+    if es_texto or codigo_decimal:
+        compacta = _as_category(s, max_ratio)
+        if compacta is not None:
+            return compacta
+    return s
+
+
+@timed("compact")
+def compact_frame(df, max_ratio=COMPACT_CATEGORY_RATIO):
+    """
+    `df` con cada columna en su representación compacta. Las columnas que no
+    cambian no se copian.
+    """
+    cambios = {}
+    for col in df.columns:
+        compacta = compact_column(df[col], max_ratio)
+        if compacta is not df[col] and compacta.dtype != df[col].dtype:
+            cambios[col] = compacta
+    return df.assign(**cambios) if cambios else df
+
+
+def memory_report(antes, despues):
+    """
+    Memoria por columna antes y después de compactar: tipo, MB y ahorro.
+    La última fila es el total del DataFrame.
+    """
+    uso_antes = antes.memory_usage(deep=True, index=False)
+    uso_despues = despues.memory_usage(deep=True, index=False).reindex(uso_antes.index, fill_value=0)
+    reporte = pd.DataFrame({
+        "Tipo antes": antes.dtypes.astype(str),
+        "Tipo después": despues.dtypes.reindex(uso_antes.index).astype(str),
+        "MB antes": uso_antes / MB,
+        "MB después": uso_despues / MB,
+    })
+    reporte.loc["TOTAL"] = ["", "", uso_antes.sum() / MB, uso_despues.sum() / MB]
+    reporte["Ahorro %"] = np.where(
+        reporte["MB antes"] > 0,
+        100 * (1 - reporte["MB después"] / reporte["MB antes"].where(reporte["MB antes"] > 0, 1)),
+        0.0,
+    )
+    reporte.index.name = "Columna"
+    return reporte.round(2)
@@ -0,0 +1,52 @@
+# utils/config.py
+"""
+Parámetros de configuración de la aplicación.
+Todos se pueden sobreescribir con variables de entorno.
+"""
+import os
+
+# Directorio base de la aplicación (client_app/)
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Caché en disco de los archivos Excel ya parseados
+CACHE_DIR = os.environ.get("DASHBOARD_CACHE_DIR", os.path.join(APP_DIR, ".cache"))
+CACHE_MAX_MB = int(os.environ.get("DASHBOARD_CACHE_MAX_MB", "2048"))
+
+# Procesos para parsear archivos en paralelo (0 = uno por CPU)
+LOAD_WORKERS = int(os.environ.get("DASHBOARD_LOAD_WORKERS", "0"))
+
+# Modo streaming: filas por bloque al leer los archivos
+STREAM_CHUNK_ROWS = int(os.environ.get("DASHBOARD_STREAM_CHUNK_ROWS", "100000"))
+
+# Modo de carga por defecto: "archivos", "streaming" o "historico"
+LOAD_MODE_DEFAULT = os.environ.get("DASHBOARD_LOAD_MODE", "archivos")
+
+# Histórico local de ventas ya procesadas, particionado por año/mes
+STORE_DIR = os.environ.get("DASHBOARD_STORE_DIR", os.path.join(APP_DIR, "historico"))
+
+# Transformaciones de texto fila por fila en varios procesos
+# (0 = uno por CPU; PARALLEL_MIN_ROWS 0 = umbral medido automáticamente)
+PARALLEL_WORKERS = int(os.environ.get("DASHBOARD_PARALLEL_WORKERS", "0"))
+PARALLEL_MIN_ROWS = int(os.environ.get("DASHBOARD_PARALLEL_MIN_ROWS", "0"))
+
+# Caché en memoria de resultados (resumen, gráficos, Excel) por estado de filtros
+RESULT_CACHE_MAX_MB = int(os.environ.get("DASHBOARD_RESULT_CACHE_MAX_MB", "256"))
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get("DASHBOARD_RESULT_CACHE_MAX_ENTRIES", "64"))
+
+# Reglas que fuerzan el canal de ciertos clientes (ver utils/channel_rules.py)
+CHANNEL_RULES_PATH = os.environ.get("DASHBOARD_CHANNEL_RULES", os.path.join(APP_DIR, "canal_reglas.json"))
+
+# Motor de cálculo de process_data, resumen global y datos interanuales:
+# "pandas" o "duckdb" (SQL en proceso; requiere el paquete duckdb)
+BACKEND = os.environ.get("DASHBOARD_BACKEND", "pandas").lower()
+# DuckDB: hilos (0 = uno por CPU) y memoria máxima antes de volcar a disco ("" = la de DuckDB)
+DUCKDB_THREADS = int(os.environ.get("DASHBOARD_DUCKDB_THREADS", "0"))
+DUCKDB_MEMORY_LIMIT = os.environ.get("DASHBOARD_DUCKDB_MEMORY_LIMIT", "")
+
+# Compactación en memoria: el texto pasa a categoría si sus valores distintos
+# son a lo sumo esta fracción de las filas (0 = no compactar texto)
+COMPACT_CATEGORY_RATIO = float(os.environ.get("DASHBOARD_COMPACT_CATEGORY_RATIO", "0.5"))
+
+# Métricas por etapa (ver utils/metrics.py): "" = apagadas, "log" = logger
+# "dashboard.metrics", otro valor = archivo donde se agregan líneas JSON
+METRICS = os.environ.get("DASHBOARD_METRICS", "")
@@ -0,0 +1,94 @@
+# utils/cube.py
+"""
+Cubo pre-agregado de ventas: una fila por cliente × mes × canal × familia ×
+marca × producto × supervisor × vendedor, con las medidas sumadas.
+
+Todos los indicadores del dashboard se derivan de sumas y de la presencia de
+cada cliente, así que los filtros, el resumen global, los gráficos interanuales
+y los exportadores se calculan sobre el cubo en lugar de las líneas de venta,
+que son uno o dos órdenes de magnitud más.
+
+El cubo conserva la Descripcion del producto: el filtro de calibre, el sabor
+Levite y el calibre 330 de CCC Ñandú se leen de ella. Razón social, rubro y
+calibre dependen del cliente o del producto, así que no agrandan el cubo.
+
+Las filas con Kg > 0 (y Kg_Lt > 0) se agregan por separado de las demás, para
+que los filtros por fila "Kg > 0" de los indicadores sigan dando lo mismo.
+"""
+import pandas as pd
+import streamlit as st
+
+from utils.compact import compact_frame, memory_report
+from utils.data_loader import load_multiple_excels
+from utils.metrics import timed
+from utils.processor import process_data, exclude_families
+
+# Columnas que se suman en el cubo
+MEASURE_COLUMNS = ["Kg", "Kg_Lt", "HL", "NetoSD", "Bruto", "Neto", "Bultos"]
+
+# Columnas que identifican cada fila del cubo (además del mes)
+DIMENSION_COLUMNS = [
+    "CodigoCliente", "RazonSocial", "Descripcion", "Marcas", "Rubro", "Grupo",
+    "Canal", "NomSupervisor", "NomVendedor", "Calibre", "Calibre_CC",
+]
+
+
+@timed("build_cube")
+def build_cube(df):
+    """
+    Reduce filas procesadas (salida de process_data) al cubo por mes y
+    dimensiones, sumando las medidas. Fecha pasa a ser el primer día del mes.
+
+    Como el signo de la suma coincide con el del grupo, aplicar esta función
+    sobre la concatenación de varios cubos es la forma de combinarlos.
+    """
+    if df.empty:
+        return df
+
+    medidas = [col for col in MEASURE_COLUMNS if col in df.columns]
+    claves = ["Fecha"] + [col for col in DIMENSION_COLUMNS if col in df.columns]
+    tabla = df[claves + medidas].assign(
+        Fecha=pd.to_datetime(df["Fecha"]).dt.to_period("M").dt.start_time,
+        _kg_pos=df["Kg"] > 0,
+    )
+    claves.append("_kg_pos")
+    if "Kg_Lt" in df.columns:
+        tabla["_kglt_pos"] = df["Kg_Lt"] > 0
+        claves.append("_kglt_pos")
+
+    # observed=True: con dimensiones categóricas, solo las combinaciones que existen
+    cubo = tabla.groupby(claves, dropna=False, sort=False, observed=True)[medidas].sum().reset_index()
+    return cubo.drop(columns=[c for c in ("_kg_pos", "_kglt_pos") if c in cubo.columns])
+
+
+def merge_cubes(cubos):
+    """Combina varios cubos parciales en uno solo."""
+    cubos = [c for c in cubos if not c.empty]
+    if not cubos:
+        return pd.DataFrame()
+    if len(cubos) == 1:
+        return cubos[0]
+    return build_cube(pd.concat(cubos, ignore_index=True))
+
+
+@st.cache_data(show_spinner="Armando cubo de ventas...")
+def load_sales_cube(uploaded_files, date_from, date_to, reglas_version=None):
+    """
+    Carga los archivos, los procesa y arma el cubo (una sola vez por combinación
+    de archivos, fechas y reglas de canal; los cambios de filtros no vuelven a
+    procesar las líneas). `reglas_version` solo forma parte de la clave.
+    Los datos leídos se compactan (texto repetido como categoría, enteros
+    chicos) antes de procesarlos; el reporte de memoria compara ambos.
+    Retorna: (cubo, dict_planes_o_None, vista_previa_de_datos_crudos, reporte_memoria)
+    """
+    df, planes_data = load_multiple_excels(uploaded_files, date_from, date_to)
+    compacto = compact_frame(df)
+    reporte_memoria = memory_report(df, compacto)
+    df = compacto
+
+    # Excluir las familias 'POP' y 'PALLETS' de todos los análisis
+    df = exclude_families(df)
+    vista_previa = df.head(10)
+
+    cubo = build_cube(process_data(df, date_from, date_to, planes_data))
+    return cubo, planes_data, vista_previa, reporte_memoria
@@ -1,43 +1,243 @@
 # utils/data_loader.py
+import os
+import numpy as np
 import pandas as pd
 import streamlit as st
+from io import BytesIO
+from datetime import datetime
+import pyarrow as pa
+from utils.cache import file_bytes, fingerprint, cache_key, load_cached, store_cached, cached_schema
+from utils.config import LOAD_WORKERS
+from utils.metrics import timed
+from utils.parallel import process_pool
+from utils.schema import SCHEMA_VERSION, use_column, read_dtypes, apply_schema
 
-@st.cache_data(show_spinner="Cargando archivos...")
-def load_multiple_excels(uploaded_files):
+def _engine_for(filename):
+    """Motor de pandas para leer el archivo según su extensión."""
+    ext = filename.split(".")[-1].lower()
+    if ext == "xlsb":
+        return "pyxlsb"
+    elif ext == "xls":
+        # Requiere paquete 'xlrd'
+        return "xlrd"
+    # Para xlsx/xlsm usará openpyxl automáticamente
+    return None
+
+# Origen de los seriales de fecha de Excel
+EXCEL_EPOCH = pd.Timestamp("1899-12-30")
+
+def date_bounds(date_from, date_to):
     """
-    Carga múltiples archivos Excel y los concatena en un DataFrame.
-    También busca y procesa el archivo PLANES si existe.
-    Retorna: (DataFrame_combinado, dict_planes_o_None)
+    Límites para descartar filas antes de procesarlas, con un día de margen:
+    es un filtro grueso, el filtro exacto lo sigue haciendo process_data.
+    Retorna (desde, hasta) como Timestamp, o None si el límite no se aplica.
+    """
+    desde = pd.Timestamp(date_from) - pd.Timedelta(days=1) if date_from is not None else None
+    hasta = pd.Timestamp(date_to) + pd.Timedelta(days=1) if date_to is not None else None
+    return desde, hasta
+
+def _as_serial(ts):
+    return (ts - EXCEL_EPOCH) / pd.Timedelta(days=1)
+
+def fecha_filters(fecha_type, date_from, date_to):
+    """
+    Filtros de pyarrow sobre la columna Fecha cruda (serial de Excel o timestamp)
+    para leer de un Parquet solo los grupos de filas del rango. None si no se puede filtrar.
+    """
+    desde, hasta = date_bounds(date_from, date_to)
+    if desde is None and hasta is None:
+        return None
+    if pa.types.is_timestamp(fecha_type):
+        convertir = lambda ts: ts
+    elif pa.types.is_integer(fecha_type) or pa.types.is_floating(fecha_type):
+        convertir = _as_serial
+    else:
+        return None
+    filtros = []
+    if desde is not None:
+        filtros.append(("Fecha", ">=", convertir(desde)))
+    if hasta is not None:
+        filtros.append(("Fecha", "<=", convertir(hasta)))
+    return filtros
+
+def prefilter_dates(df, date_from, date_to):
+    """Descarta en memoria las filas cuya Fecha cruda cae fuera del rango (con margen)."""
+    desde, hasta = date_bounds(date_from, date_to)
+    if (desde is None and hasta is None) or "Fecha" not in df.columns:
+        return df
+    fecha = df["Fecha"]
+    if pd.api.types.is_datetime64_any_dtype(fecha):
+        convertir = lambda ts: ts
+    elif pd.api.types.is_numeric_dtype(fecha):
+        convertir = _as_serial
+    else:
+        # Fechas en texto u otros tipos: se dejan para process_data
+        return df
+    mask = pd.Series(True, index=df.index)
+    if desde is not None:
+        mask &= fecha >= convertir(desde)
+    if hasta is not None:
+        mask &= fecha <= convertir(hasta)
+    return df[mask].reset_index(drop=True)
+
+def cell_in_range(valor, desde, hasta):
+    """
+    Indica si una celda de Fecha cruda puede caer dentro del rango (límites de date_bounds).
+    Las celdas que no son número ni fecha se conservan.
+    """
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        if desde is not None and valor < _as_serial(desde):
+            return False
+        if hasta is not None and valor > _as_serial(hasta):
+            return False
+    elif isinstance(valor, datetime):
+        if desde is not None and valor < desde:
+            return False
+        if hasta is not None and valor > hasta:
+            return False
+    return True
+
+def _is_planes(filename):
+    """El archivo de PLANES se reconoce porque su nombre empieza con "PLANES"."""
+    return filename.upper().startswith("PLANES")
+
+def read_excel_cached(name, data, validate=None, key_options=None, **kwargs):
+    """
+    Lee el contenido de un archivo Excel usando la caché en disco (Parquet).
+    Si el mismo contenido ya fue parseado con el mismo motor, se carga desde la caché.
+    validate: función opcional que valida/normaliza el DataFrame antes de guardarlo.
+    key_options: opciones que distinguen la lectura en la clave de caché
+    (los kwargs pueden incluir funciones, que no sirven como clave).
+    """
+    engine = _engine_for(name)
+    key = cache_key(fingerprint(data), engine, **(key_options or {}))
+    df = load_cached(key)
+    if df is None:
+        df = pd.read_excel(BytesIO(data), engine=engine, **kwargs)
+        if validate is not None:
+            df = validate(df)
+        df = store_cached(key, df)
+    return df
+
+def read_sales_file(name, data, date_from=None, date_to=None):
+    """
+    Lee un archivo de ventas con el esquema declarado: solo las columnas
+    que usa el pipeline y con tipos explícitos. Falla si falta una columna requerida.
+    Si se indica un rango de fechas, desde la caché solo se leen los grupos de filas
+    del rango (un archivo que queda todo afuera no se lee).
+    """
+    engine = _engine_for(name)
+    key_options = {"esquema": SCHEMA_VERSION}
+    if date_from is not None or date_to is not None:
+        key = cache_key(fingerprint(data), engine, **key_options)
+        esquema = cached_schema(key)
+        if esquema is not None and "Fecha" in esquema.names:
+            filtros = fecha_filters(esquema.field("Fecha").type, date_from, date_to)
+            df = load_cached(key, filters=filtros)
+            if df is not None:
+                return df
+    df = read_excel_cached(
+        name, data,
+        validate=apply_schema,
+        key_options=key_options,
+        usecols=use_column,
+        dtype=read_dtypes(),
+    )
+    return prefilter_dates(df, date_from, date_to)
+
+def _parse_file(name, data, date_from=None, date_to=None):
+    """
+    Parsea un archivo subido. Se ejecuta dentro de un proceso del pool,
+    por eso recibe el nombre y el contenido en bytes en lugar del archivo de Streamlit.
+    """
+    if _is_planes(name):
+        return read_planes(name, data)
+    return read_sales_file(name, data, date_from, date_to)
+
+def _resolve_workers(max_workers, n_files):
+    if max_workers is None:
+        max_workers = LOAD_WORKERS or os.cpu_count() or 1
+    return max(1, min(max_workers, n_files))
+
+def parse_files(files, max_workers=None, date_from=None, date_to=None):
+    """
+    Parsea varios archivos en paralelo en un pool de procesos.
+    files: lista de (nombre, bytes).
+    date_from/date_to: descarta de antemano las filas fuera del rango (opcional).
+    Retorna una lista de (nombre, resultado, error) en el mismo orden de entrada;
+    un archivo con error no interrumpe la lectura de los demás.
+    """
+    workers = _resolve_workers(max_workers, len(files))
+    resultados = []
+    if workers == 1:
+        # Un solo archivo o un solo proceso: no vale la pena levantar el pool
+        for name, data in files:
+            try:
+                resultados.append((name, _parse_file(name, data, date_from, date_to), None))
+            except Exception as e:
+                resultados.append((name, None, e))
+        return resultados
+
+    # Procesos con forkserver/spawn: este código corre dentro del servidor de Streamlit, con varios hilos
+    with process_pool(workers) as executor:
+        futuros = [executor.submit(_parse_file, name, data, date_from, date_to) for name, data in files]
+        for (name, _), futuro in zip(files, futuros):
+            try:
+                resultados.append((name, futuro.result(), None))
+            except Exception as e:
+                resultados.append((name, None, e))
+    return resultados
+
+@timed("load")
+def read_files(files, date_from=None, date_to=None, max_workers=None):
+    """
+    Lee archivos de ventas y el de PLANES (si está) sin interfaz.
+    files: lista de (nombre, bytes).
+    Si se indica un rango de fechas solo se leen las filas que pueden caer en él
+    (el filtro exacto lo hace process_data). Los archivos se parsean en paralelo
+    (max_workers procesos; por defecto DASHBOARD_LOAD_WORKERS o la cantidad de CPUs).
+    Un archivo que falla no interrumpe la lectura de los demás.
+    Retorna: (DataFrame_combinado, dict_planes_o_None, nombre_planes_o_None, [(nombre, error), ...])
     """
     dfs = []
     planes_data = None
-    
-    for file in uploaded_files:
+    planes_name = None
+    errores = []
+
+    for name, resultado, error in parse_files(files, max_workers, date_from, date_to):
         # Verificar si es el archivo de PLANES (nombre debe empezar con "PLANES")
-        if file.name.upper().startswith("PLANES"):
-            planes_data = load_planes_file(file)
-            st.info(f"Archivo de planes cargado: {file.name}")
-            continue
-            
-        # Para archivos de datos regulares (lógica original)
-        ext = file.name.split(".")[-1].lower()
-        if ext == "xlsb":
-            df = pd.read_excel(file, engine="pyxlsb")
-        elif ext == "xls":
-            # Requiere paquete 'xlrd'
-            df = pd.read_excel(file, engine="xlrd")
-        else:
-            # Para xlsx/xlsm usará openpyxl automáticamente
-            df = pd.read_excel(file)
-        dfs.append(df)
-    
+        if _is_planes(name):
+            planes_name = name
+            planes_data = resultado if error is None else None
+        elif error is None:
+            dfs.append(resultado)
+        if error is not None:
+            errores.append((name, error))
+
     # Si no hay dataframes de datos, retornar DataFrame vacío
     if not dfs:
-        return pd.DataFrame(), planes_data
-        
+        return pd.DataFrame(), planes_data, planes_name, errores
+
     # Concatenar todos los DataFrames de datos (lógica original)
-    combined_df = pd.concat(dfs, ignore_index=True)
-    return combined_df, planes_data
+    return pd.concat(dfs, ignore_index=True), planes_data, planes_name, errores
+
+@st.cache_data(show_spinner="Cargando archivos...")
+def load_multiple_excels(uploaded_files, date_from=None, date_to=None, max_workers=None):
+    """
+    Carga múltiples archivos Excel subidos y los concatena en un DataFrame
+    (read_files, informando en la interfaz los errores y el archivo de PLANES).
+    Retorna: (DataFrame_combinado, dict_planes_o_None)
+    """
+    files = [(file.name, file_bytes(file)) for file in uploaded_files]
+    df, planes_data, planes_name, errores = read_files(files, date_from, date_to, max_workers)
+    for name, error in errores:
+        if _is_planes(name):
+            st.error(f"Error procesando archivo de planes: {str(error)}")
+        else:
+            st.error(f"❌ Error leyendo {name}: {str(error)}")
+    if planes_data is not None:
+        st.info(f"Archivo de planes cargado: {planes_name}")
+    return df, planes_data
 
 def load_planes_file(file):
     """
@@ -45,47 +245,103 @@ def load_planes_file(file):
     Retorna un diccionario con {nombre_plan: [lista_codigos_clientes]}
     """
     try:
-        # Leer el archivo Excel usando la misma lógica que load_multiple_excels
-        ext = file.name.split(".")[-1].lower()
-        if ext == "xlsb":
-            df = pd.read_excel(file, engine="pyxlsb", header=None)
-        elif ext == "xls":
-            df = pd.read_excel(file, engine="xlrd", header=None)
-        else:
-            df = pd.read_excel(file, header=None)
-        
-        planes_dict = {}
-        
-        # Procesar cada columna
-        for col_idx in range(len(df.columns)):
-            # Primera fila contiene el nombre del plan
-            nombre_plan = df.iloc[0, col_idx]
-            
-            # Si el nombre del plan no está vacío
-            if pd.notna(nombre_plan) and str(nombre_plan).strip():
-                nombre_plan = str(nombre_plan).strip()
-                
-                # Extraer códigos de clientes de esa columna (desde fila 1 en adelante)
-                codigos = []
-                for row_idx in range(1, len(df)):
-                    codigo = df.iloc[row_idx, col_idx]
-                    if pd.notna(codigo):
-                        # Convertir a string y limpiar
-                        codigo_str = str(codigo).strip()
-                        if codigo_str and codigo_str != 'nan':
-                            # Si es número, convertir a int para quitar decimales
-                            try:
-                                codigo_int = int(float(codigo_str))
-                                codigos.append(str(codigo_int))
-                            except:
-                                codigos.append(codigo_str)
-                
-                # Solo agregar si tiene códigos
-                if codigos:
-                    planes_dict[nombre_plan] = codigos
-        
-        return planes_dict
-        
+        return read_planes(file.name, file_bytes(file))
     except Exception as e:
         st.error(f"Error procesando archivo de planes: {str(e)}")
-        return None
\ No newline at end of file
+        return None
+
+def read_planes(name, data):
+    """
+    Lee el contenido del archivo de PLANES (sin interfaz; los errores se propagan).
+    Retorna un diccionario con {nombre_plan: [lista_codigos_clientes]}
+    """
+    # Leer el archivo Excel usando el mismo motor que load_multiple_excels
+    df = pd.read_excel(BytesIO(data), engine=_engine_for(name), header=None)
+    return parse_planes(df)
+
+def parse_planes(df):
+    """
+    Convierte la hoja de PLANES (sin encabezado) en {nombre_plan: [codigos]}.
+    La primera fila tiene el nombre del plan y debajo van los códigos de clientes.
+    Los códigos numéricos se normalizan a enteros en texto ("105.0" -> "105").
+    """
+    if df.empty:
+        return {}
+
+    n_filas = len(df) - 1
+    n_cols = len(df.columns)
+    # Todas las celdas de códigos en una sola columna, recorriendo columna por columna
+    valores = df.iloc[1:].to_numpy(dtype=object).ravel(order="F")
+    col_idx = np.repeat(np.arange(n_cols), n_filas)
+
+    presentes = pd.notna(valores)
+    codigos = pd.Series(valores[presentes], dtype=object).astype(str).str.strip()
+    col_idx = col_idx[presentes]
+    validos = ((codigos != "") & (codigos != "nan")).to_numpy()
+    codigos = codigos[validos].reset_index(drop=True)
+    col_idx = col_idx[validos]
+
+    # Si es número, convertir a int para quitar decimales (equivale a int(float(codigo)))
+    numeros = pd.to_numeric(codigos, errors="coerce").astype(float)
+    finitos = np.isfinite(numeros)
+    enteros = finitos & (numeros.abs() < 2**63)
+    codigos[enteros] = np.trunc(numeros[enteros]).astype(np.int64).astype(str)
+    # Números fuera del rango de int64 (casi nunca): conversión de Python
+    grandes = finitos & ~enteros
+    if grandes.any():
+        codigos[grandes] = [str(int(x)) for x in numeros[grandes]]
+
+    # Agrupar por columna manteniendo el orden de las filas
+    limites = np.searchsorted(col_idx, np.arange(n_cols + 1))
+    codigos = codigos.tolist()
+
+    planes_dict = {}
+    for j, nombre_plan in enumerate(df.iloc[0]):
+        # Si el nombre del plan no está vacío y la columna tiene códigos
+        if pd.notna(nombre_plan) and str(nombre_plan).strip():
+            codigos_plan = codigos[limites[j]:limites[j + 1]]
+            if codigos_plan:
+                planes_dict[str(nombre_plan).strip()] = codigos_plan
+    return planes_dict
+
+class PlanIndex:
+    """
+    Índice compacto plan -> clientes sobre los códigos de cliente factorizados.
+    Se construye una vez por dataset; filtrar por un plan es una búsqueda en
+    una tabla de booleanos por cliente, sin convertir la columna a texto.
+    """
+
+    def __init__(self, planes_data, codigos_cliente):
+        # ids: número de cliente por fila (-1 si el código es nulo)
+        ids, clientes = pd.factorize(codigos_cliente)
+        self.index = codigos_cliente.index
+        self.ids = ids.astype(np.int32)
+        self.n_clientes = len(clientes)
+        # Se compara contra los códigos en texto, igual que antes (astype(str))
+        clientes_str = pd.Index(clientes).astype(str)
+        self.planes = {
+            plan: np.flatnonzero(clientes_str.isin(codigos)).astype(np.int32)
+            for plan, codigos in (planes_data or {}).items()
+        }
+
+    def clients(self, plan):
+        """Ids (posiciones factorizadas) de los clientes del plan que aparecen en los datos."""
+        return self.planes.get(plan, np.empty(0, dtype=np.int32))
+
+    def mask(self, plan):
+        """Serie booleana (alineada a los datos) con las filas de clientes del plan."""
+        # La última posición corresponde a los códigos nulos (id -1): nunca pertenecen
+        en_plan = np.zeros(self.n_clientes + 1, dtype=bool)
+        en_plan[self.clients(plan)] = True
+        return pd.Series(en_plan[self.ids], index=self.index)
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def cached_plan_index(_planes_data, _codigos_cliente, clave):
+    """
+    PlanIndex de un dataset, construido una sola vez por `clave` (la misma
+    del índice de filtros: huellas de los archivos subidos, de donde salen
+    también los PLANES, fechas y versiones). `_planes_data` y
+    `_codigos_cliente` no se hashean.
+    """
+    return PlanIndex(_planes_data, _codigos_cliente)
@@ -0,0 +1,377 @@
+# utils/duckdb_backend.py
+"""
+Motor DuckDB: process_data, las sumas del resumen global y los datos
+interanuales como consultas SQL sobre una base DuckDB en proceso.
+
+Se activa con DASHBOARD_BACKEND=duckdb (requiere el paquete duckdb). DuckDB
+agrega en varios hilos y, con DASHBOARD_DUCKDB_MEMORY_LIMIT, vuelca a disco
+lo que no entra en memoria. Las consultas leen el DataFrame ya cargado: los
+Parquet del histórico guardan el Canal del ERP y las reglas de canal se
+aplican al leerlos (ver utils/store.py), así que no se consultan directo.
+
+La lógica de texto (atributos de producto, marcas objetivo, reglas de canal)
+es la misma del motor pandas: se calcula en Python una vez por valor distinto
+y se cruza en SQL como tablas chicas. Las sumas pueden diferir del motor pandas
+en el último decimal (otro orden de suma); crosscheck compara ambos motores.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.cache import normalize_for_parquet
+from utils.catalog import product_attributes, brand_tags
+from utils.channel_rules import load_rules, name_column, rule_lookup
+from utils.config import CACHE_DIR, DUCKDB_MEMORY_LIMIT, DUCKDB_THREADS
+from utils.schema import as_text
+
+# Carpeta para lo que DuckDB vuelca a disco cuando supera la memoria
+SPILL_DIR = os.path.join(CACHE_DIR, "duckdb")
+
+
+def connect():
+    """Conexión DuckDB en memoria (una por llamada: las sesiones de Streamlit corren en hilos)."""
+    try:
+        import duckdb
+    except ImportError as e:
+        raise ImportError("DASHBOARD_BACKEND=duckdb requiere el paquete duckdb (pip install duckdb)") from e
+    con = duckdb.connect()
+    if DUCKDB_THREADS:
+        con.execute(f"SET threads = {int(DUCKDB_THREADS)}")
+    if DUCKDB_MEMORY_LIMIT:
+        con.execute(f"SET memory_limit = '{_literal(DUCKDB_MEMORY_LIMIT)}'")
+    os.makedirs(SPILL_DIR, exist_ok=True)
+    con.execute(f"SET temp_directory = '{_literal(SPILL_DIR)}'")
+    return con
+
+
+def _literal(texto):
+    return str(texto).replace("'", "''")
+
+
+def _ident(nombre):
+    return '"' + str(nombre).replace('"', '""') + '"'
+
+
+def _register(con, datos):
+    """Registra la vista `ventas` sobre el DataFrame `datos`. Retorna las columnas disponibles."""
+    con.register("ventas_df", normalize_for_parquet(datos))
+    con.execute("CREATE VIEW ventas AS SELECT * FROM ventas_df")
+    return [fila[0] for fila in con.execute("DESCRIBE ventas").fetchall()]
+
+
+def _distinct(con, columna):
+    return con.execute(f"SELECT DISTINCT {_ident(columna)} FROM ventas").df()[columna]
+
+
+def _register_products(con):
+    """Tabla `productos`: atributos de cada Descripcion distinta (incluida la nula)."""
+    descripciones = _distinct(con, "Descripcion")
+    attrs = product_attributes(descripciones).reset_index(drop=True)
+    attrs.insert(0, "Descripcion", descripciones.to_numpy())
+    con.register("productos", attrs)
+    return attrs
+
+
+def _register_brands(con):
+    """Tabla `marcas`: marcas objetivo de cada valor distinto de Marcas (incluido el nulo)."""
+    marcas = _distinct(con, "Marcas")
+    tags = brand_tags(marcas).reset_index(drop=True)
+    tags.insert(0, "Marcas", marcas.to_numpy())
+    con.register("marcas", tags)
+
+
+def _fecha_expr(fecha):
+    """Expresión SQL de Fecha como timestamp (serial de Excel o fecha)."""
+    if pd.api.types.is_datetime64_any_dtype(fecha):
+        return 'v."Fecha"'
+    # Días desde 1899-12-30, con la precisión de microsegundos de DuckDB
+    return "TIMESTAMP '1899-12-30' + to_microseconds(CAST(round(v.\"Fecha\" * 86400000000) AS BIGINT))"
+
+
+def process_data(df, date_from, date_to, planes=None, channel_rules=True, reglas=None):
+    """
+    Igual que processor.process_data, en SQL. Fecha que no es ni serial ni
+    fecha (ej. texto) se convierte antes con pandas.
+    """
+    from utils.processor import _column, _parse_fecha
+
+    if not all(isinstance(c, str) and c == c.strip() for c in df.columns):
+        df = df.rename(columns=lambda c: str(c).strip())
+    fecha = _column(df, "Fecha")
+    if not (pd.api.types.is_datetime64_any_dtype(fecha) or pd.api.types.is_numeric_dtype(fecha)):
+        df = df.assign(Fecha=_parse_fecha(fecha))
+
+    con = connect()
+    columnas = _register(con, df)
+    con.register("filas", pd.DataFrame({"_fila": np.arange(len(df))}))
+    productos = _register_products(con)
+
+    # Reglas de canal resueltas por nombre y por cliente distintos (sin reglas: el Canal del ERP)
+    reglas = load_rules() if reglas is None else reglas
+    nombre_col = name_column(df) if channel_rules else None
+    nombres = _distinct(con, nombre_col) if nombre_col else None
+    clientes = _distinct(con, "CodigoCliente") if channel_rules and "CodigoCliente" in columnas else None
+    por_nombre, por_cliente = rule_lookup(nombres, clientes, planes, reglas)
+    joins = []
+    regla = None
+    if nombre_col:
+        con.register("reglas_nombre", pd.DataFrame({"valor": nombres.to_numpy(), "regla": por_nombre}))
+        joins.append(f"LEFT JOIN reglas_nombre rn ON v.{_ident(nombre_col)} = rn.valor")
+        regla = "COALESCE(rn.regla, -1)"
+    if clientes is not None:
+        con.register("reglas_cliente", pd.DataFrame({"valor": clientes.to_numpy(), "regla": por_cliente}))
+        joins.append('LEFT JOIN reglas_cliente rc ON v."CodigoCliente" = rc.valor')
+        regla = f"greatest({regla or -1}, COALESCE(rc.regla, -1))"
+    canal = 'v."Canal"' if "Canal" in columnas else None
+    if regla is not None:
+        # Regla de cada fila: la mayor entre la de su nombre y la de su cliente
+        con.register("canales", pd.DataFrame({
+            "regla": np.arange(len(reglas), dtype=np.int32),
+            "canal": [r["canal"] for r in reglas],
+        }))
+        joins.append(f"LEFT JOIN canales c ON c.regla = {regla}")
+        sin_regla = canal or "'SIN_CANAL'"
+        canal = f"CASE WHEN {regla} >= 0 THEN c.canal ELSE {sin_regla} END"
+
+    fecha_sql = _fecha_expr(df["Fecha"])
+    seleccion = []
+    for col in columnas:
+        if col == "Fecha":
+            seleccion.append(f'{fecha_sql} AS "Fecha"')
+        elif col == "Canal" and canal is not None:
+            seleccion.append(f'{canal} AS "Canal"')
+        else:
+            seleccion.append(f"v.{_ident(col)}")
+    seleccion += [
+        'v."Kg" / 100 AS "HL"',
+        'p."Calibre_CC"', 'p."Calibre"', 'p."Bultos"',
+        'v."NetoSD" AS "Bruto"',
+        'v."NetoSD" * (1 - (v."PorcDescLinea" / 100)) AS "Neto"',
+    ]
+    if "Canal" not in columnas and canal is not None:
+        seleccion.append(f'{canal} AS "Canal"')
+
+    condiciones = ["NOT p.\"NanduSin330\"", f"{fecha_sql} IS NOT NULL"]
+    parametros = []
+    for operador, limite in ((">=", date_from), ("<=", date_to)):
+        if limite is not None:
+            condiciones.append(f"{fecha_sql} {operador} ?")
+            parametros.append(pd.to_datetime(limite).to_pydatetime())
+
+    consulta = f"""
+        SELECT {', '.join(seleccion)}, f._fila
+        FROM ventas v POSITIONAL JOIN filas f
+        LEFT JOIN productos p ON v."Descripcion" IS NOT DISTINCT FROM p."Descripcion"
+        {' '.join(joins)}
+        WHERE {' AND '.join(condiciones)}
+        ORDER BY f._fila
+    """
+    resultado = con.execute(consulta, parametros).df()
+    con.close()
+
+    # Mismo índice y tipos que el motor pandas
+    resultado.index = df.index[resultado.pop("_fila").to_numpy()]
+    for col in ["Calibre_CC", "Calibre", "Bultos"]:
+        resultado[col] = resultado[col].astype(productos[col].dtype)
+    for col in resultado.columns:
+        if col in df.columns and col != "Fecha" and resultado[col].dtype != df[col].dtype:
+            tipo = df[col].dtype
+            if isinstance(tipo, pd.CategoricalDtype) and not resultado[col].dropna().isin(tipo.categories).all():
+                # Datos compactados: las reglas pueden agregar canales que no son categorías
+                tipo = "category"
+            resultado[col] = resultado[col].astype(tipo)
+    if "Canal" not in df.columns and "Canal" in resultado.columns:
+        resultado["Canal"] = as_text(resultado["Canal"])
+    return resultado
+
+
+def summary_measures(datos, date_to):
+    """Igual que processor.summary_measures, en SQL, sobre el DataFrame procesado `datos`."""
+    fecha_ref = pd.to_datetime(date_to)
+    con = connect()
+    columnas = _register(con, datos)
+    tiene = set(columnas)
+
+    sumas = con.execute(
+        """
+        SELECT
+            COUNT(*) FILTER (WHERE month("Fecha") = $mes AND year("Fecha") = $anio) AS filas_mes,
+            COALESCE(SUM("Kg") FILTER (WHERE month("Fecha") = $mes AND year("Fecha") = $anio), 0) AS kg_mes,
+            COALESCE(SUM("Kg"), 0) AS kg,
+            COALESCE(SUM("NetoSD"), 0) AS bruto,
+            COALESCE(SUM("Neto"), 0) AS neto
+        FROM ventas
+        """,
+        {"mes": fecha_ref.month, "anio": fecha_ref.year},
+    ).fetchone()
+    filas_mes, kg_mes, kg, bruto, neto = sumas
+    total_bultos = con.execute('SELECT COALESCE(SUM("Bultos"), 0) FROM ventas').fetchone()[0] if "Bultos" in tiene else 0
+
+    # Indicadores por cliente: una tabla por cliente y conteos sobre ella
+    por_producto = {"Marcas", "Descripcion"}.issubset(tiene)
+    medidas_cliente = ['SUM(kg) AS kg']
+    conteos = ['COUNT(*) FILTER (WHERE kg > 0)']
+    if "Rubro" in tiene:
+        medidas_cliente += [
+            "SUM(kg) FILTER (WHERE rubro = 'AGUA') AS kg_agua",
+            "SUM(kg) FILTER (WHERE rubro = 'SABORISADAS') AS kg_sab",
+        ]
+        conteos += ["COUNT(*) FILTER (WHERE kg_agua > 0)", "COUNT(*) FILTER (WHERE kg_sab > 0)"]
+    else:
+        conteos += ["0", "0"]
+    joins = ""
+    if por_producto:
+        _register_products(con)
+        _register_brands(con)
+        joins = """
+            LEFT JOIN productos p ON v."Descripcion" IS NOT DISTINCT FROM p."Descripcion"
+            LEFT JOIN marcas m ON v."Marcas" IS NOT DISTINCT FROM m."Marcas"
+        """
+        medidas_cliente += [
+            "COUNT(*) FILTER (WHERE levite) AS filas_levite",
+            "COUNT(DISTINCT sabor) FILTER (WHERE levite AND sabor_valido) AS sabores",
+            # Heineken, Miller, Imperial Golden u "otra" (que también cuenta como marca)
+            """COUNT(DISTINCT CASE WHEN heineken THEN 0 WHEN miller THEN 1
+                                   WHEN imperial AND golden THEN 2 ELSE 3 END)
+                   FILTER (WHERE calibre330 AND kg > 0) AS marcas_ccc""",
+        ]
+        conteos += [
+            "COUNT(*) FILTER (WHERE filas_levite > 0)",
+            "COALESCE(SUM(sabores), 0)",
+            "COUNT(*) FILTER (WHERE marcas_ccc > 1)",
+        ]
+    columnas_fila = ['v."CodigoCliente" AS cliente', 'v."Kg" AS kg']
+    if "Rubro" in tiene:
+        columnas_fila.append('upper(v."Rubro") AS rubro')
+    if por_producto:
+        columnas_fila += [
+            'm."Levite" AND v."Kg" > 0 AS levite', 'p."SaborLevite" AS sabor', 'p."SaborValido" AS sabor_valido',
+            'p."Calibre330" AS calibre330', 'p."Golden" AS golden',
+            'm."Heineken" AS heineken', 'm."Miller" AS miller', 'm."Imperial" AS imperial',
+        ]
+    if por_producto:
+        # Hubo filas Levite con venta positiva / con sabor válido (entre todas las filas)
+        conteos += [
+            "(SELECT COALESCE(bool_or(levite), false) FROM filas)",
+            "(SELECT COALESCE(bool_or(levite AND sabor_valido), false) FROM filas)",
+        ]
+    fila = con.execute(f"""
+        WITH filas AS (
+            SELECT {', '.join(columnas_fila)} FROM ventas v {joins}
+        ), por_cliente AS (
+            SELECT cliente, {', '.join(medidas_cliente)} FROM filas WHERE cliente IS NOT NULL GROUP BY cliente
+        )
+        SELECT {', '.join(conteos)} FROM por_cliente
+    """).fetchone()
+    con.close()
+
+    cce, cce_agua_pura, cce_agua_saborizada = (int(x) for x in fila[:3])
+    medidas = {
+        "hl": kg_mes / 100 if filas_mes else 0,
+        "hectolitro_real": kg / 100,
+        "bruto": bruto,
+        "neto": neto,
+        "total_bultos": int(total_bultos),
+        "cce": cce,
+        "cce_agua_pura": cce_agua_pura,
+        "cce_agua_saborizada": cce_agua_saborizada,
+        "compradores_levite": None,
+        "suma_sabores_levite": None,
+        "ccc_nandu": None,
+    }
+    if por_producto:
+        compradores, sabores, ccc, hay_levite, hay_sabores = fila[3:]
+        medidas["ccc_nandu"] = int(ccc)
+        if hay_levite:
+            medidas["compradores_levite"] = int(compradores)
+            if hay_sabores:
+                medidas["suma_sabores_levite"] = int(sabores)
+    return medidas
+
+
+def prepare_yoy_data(datos, ref_month):
+    """
+    Igual que processor.prepare_yoy_data para el mes de referencia `ref_month`,
+    con COUNT(DISTINCT) en SQL sobre el DataFrame procesado `datos`.
+    """
+    con = connect()
+    _register(con, datos)
+    consulta = """
+        SELECT CAST(year("Fecha") AS INTEGER) AS "Año", {clave},
+               COALESCE(SUM("HL"), 0) AS "Volumen", COUNT(DISTINCT "CodigoCliente") AS "CCC"
+        FROM ventas
+        WHERE "Fecha" IS NOT NULL AND month("Fecha") <= ? {no_nulo}
+        GROUP BY ALL
+    """
+    yoy_data = con.execute(
+        consulta.format(clave='CAST(month("Fecha") AS INTEGER) AS "Mes"', no_nulo=""), [ref_month]
+    ).df()
+    channel_data = con.execute(
+        consulta.format(clave='"Canal"', no_nulo='AND "Canal" IS NOT NULL'), [ref_month]
+    ).df()
+    con.close()
+
+    # Mismo orden y tipos que los groupby de pandas
+    yoy_data = yoy_data.sort_values(["Año", "Mes"], ignore_index=True)
+    channel_data = channel_data.sort_values(["Año", "Canal"], ignore_index=True)
+    for tabla in (yoy_data, channel_data):
+        tabla["CCC"] = tabla["CCC"].astype(np.int64)
+    if isinstance(channel_data["Canal"].dtype, pd.CategoricalDtype):
+        channel_data["Canal"] = channel_data["Canal"].astype(channel_data["Canal"].cat.categories.dtype)
+    return yoy_data, channel_data
+
+
+def crosscheck(df, date_from, date_to, tolerancia=1e-9, planes=None, reglas=None):
+    """
+    Corre process_data, el resumen global y los datos interanuales con ambos
+    motores sobre las mismas líneas de venta y lista las diferencias
+    (vacía si coinciden; las sumas se comparan con tolerancia relativa).
+    `planes` y `reglas` se pasan a process_data para comparar también las
+    reglas de canal por plan y por código (sin `reglas`, las vigentes).
+    """
+    from utils import processor
+
+    diferencias = []
+    pandas_proc = processor.process_data(df, date_from, date_to, planes, reglas=reglas, backend="pandas")
+    duck_proc = process_data(df, date_from, date_to, planes, reglas=reglas)
+
+    if list(pandas_proc.columns) != list(duck_proc.columns):
+        diferencias.append(f"process_data: columnas {list(pandas_proc.columns)} != {list(duck_proc.columns)}")
+    elif len(pandas_proc) != len(duck_proc):
+        diferencias.append(f"process_data: {len(pandas_proc)} filas != {len(duck_proc)}")
+    else:
+        for col in pandas_proc.columns:
+            a, b = pandas_proc[col], duck_proc[col]
+            if isinstance(a.dtype, pd.CategoricalDtype) and isinstance(b.dtype, pd.CategoricalDtype):
+                # Datos compactados: se comparan los valores (las categorías sin uso pueden diferir)
+                a, b = a.astype(object), b.astype(object)
+            if a.dtype != b.dtype:
+                iguales = False
+            elif pd.api.types.is_float_dtype(a):
+                iguales = np.allclose(a.to_numpy(float), b.to_numpy(float), rtol=tolerancia, equal_nan=True)
+            else:
+                iguales = a.reset_index(drop=True).equals(b.reset_index(drop=True))
+            if not iguales:
+                diferencias.append(f"process_data: columna {col} distinta")
+
+    medidas_pandas = processor.summary_measures(pandas_proc, date_to)
+    medidas_duck = summary_measures(pandas_proc, date_to)
+    for clave, valor in medidas_pandas.items():
+        otro = medidas_duck.get(clave)
+        if valor is None or otro is None:
+            iguales = valor is None and otro is None
+        else:
+            iguales = np.isclose(float(valor), float(otro), rtol=tolerancia, atol=0)
+        if not iguales:
+            diferencias.append(f"resumen: {clave} {valor} != {otro}")
+
+    ref_month = pd.to_datetime(date_to).month
+    for nombre, a, b in zip(("yoy_data", "channel_data"),
+                            processor.yoy_for_month(processor.yoy_tables(pandas_proc), ref_month),
+                            prepare_yoy_data(pandas_proc, ref_month)):
+        try:
+            pd.testing.assert_frame_equal(a, b, check_exact=False, rtol=tolerancia)
+        except AssertionError as e:
+            diferencias.append(f"{nombre}: {e}")
+    return diferencias
@@ -1,8 +1,8 @@
 import pandas as pd
 from io import BytesIO
-import plotly.graph_objects as go
-import plotly.express as px
+from utils.metrics import timed
 
+@timed("export_resumen")
 def export_to_excel(resumen_global_df, figuras=None):
     """
     Exporta:
@@ -16,6 +16,10 @@ def export_to_excel(resumen_global_df, figuras=None):
 
         # Hoja de gráficos (opcional)
         if figuras:
+            # plotly solo se importa si hay gráficos que exportar
+            import plotly.graph_objects as go
+            from plotly.colors import qualitative
+
             workbook = writer.book
             ws = workbook.add_worksheet("Graficos")
 
@@ -32,7 +36,7 @@ def export_to_excel(resumen_global_df, figuras=None):
                         fig_export.update_layout(template="plotly")
                     # Si no hay colorway, asignar una cualitativa por defecto
                     if not getattr(fig_export.layout, 'colorway', None):
-                        fig_export.update_layout(colorway=px.colors.qualitative.Plotly)
+                        fig_export.update_layout(colorway=qualitative.Plotly)
                     # Usar dimensiones del layout si existen
                     export_width = getattr(fig_export.layout, 'width', None) or 1400
                     export_height = getattr(fig_export.layout, 'height', None) or 700
@@ -54,6 +58,7 @@ def export_to_excel(resumen_global_df, figuras=None):
                     col = 1
     output.seek(0)
     return output
+@timed("export_clientes_y_sabores")
 def export_clientes_y_sabores(df_filtrado):
     """
     Exporta información detallada de:
@@ -63,32 +68,27 @@ def export_clientes_y_sabores(df_filtrado):
     Reutiliza la misma lógica que ya está implementada en build_global_summary()
     """
     from datetime import datetime
-    import unicodedata
     import numpy as np
-    import re
+    from utils.catalog import product_attributes, brand_tags
     
     output = BytesIO()
     
-    def _sin_acentos(s):
-        s = str(s) if pd.notna(s) else ""
-        return ''.join(c for c in unicodedata.normalize('NFD', s) if unicodedata.category(c) != 'Mn').lower().strip()
-    
     # =============================================================================
     # ANÁLISIS CCC ÑANDÚ - MISMA LÓGICA QUE EN build_global_summary
     # =============================================================================
     ccc_nandu_df = pd.DataFrame()
     
     if {"Marcas", "Descripcion"}.issubset(df_filtrado.columns):
-        marcas_norm = df_filtrado["Marcas"].apply(_sin_acentos)
-        desc_norm = df_filtrado["Descripcion"].apply(_sin_acentos)
+        attrs = product_attributes(df_filtrado["Descripcion"])
+        marcas = brand_tags(df_filtrado["Marcas"])
 
-        # Crear máscara para calibre 330 (buscando "330" en la descripción)
-        mask_calibre_330 = df_filtrado["Descripcion"].astype(str).str.contains(r"\b330\b", na=False)
+        # Máscara para calibre 330 (buscando "330" en la descripción)
+        mask_calibre_330 = attrs["Calibre330"]
         
         # Máscaras para cada marca de porrón
-        mask_heineken = marcas_norm.str.contains("heineken", na=False)
-        mask_miller = marcas_norm.str.contains("miller", na=False)
-        mask_imperial_golden = marcas_norm.str.contains("imperial", na=False) & desc_norm.str.contains("golden", na=False)
+        mask_heineken = marcas["Heineken"]
+        mask_miller = marcas["Miller"]
+        mask_imperial_golden = marcas["Imperial"] & attrs["Golden"]
 
         # Filtrar solo registros con calibre 330
         df_ccu = df_filtrado[mask_calibre_330 & (df_filtrado.get("Kg_Lt", 0) > 0)].copy()
@@ -108,12 +108,12 @@ def export_clientes_y_sabores(df_filtrado):
             df_ccu = df_ccu.dropna(subset=["MarcaCCC"])
 
             # Primero filtramos clientes con Kg_Lt acumulado > 0
-            clientes_con_kg_positivo = df_ccu.groupby("CodigoCliente")["Kg_Lt"].sum()
+            clientes_con_kg_positivo = df_ccu.groupby("CodigoCliente", observed=True)["Kg_Lt"].sum()
             clientes_con_kg_positivo = clientes_con_kg_positivo[clientes_con_kg_positivo > 0].index
             
             # Luego contamos marcas únicas solo para estos clientes
             marcas_por_cliente = df_ccu[df_ccu["CodigoCliente"].isin(clientes_con_kg_positivo)]
-            marcas_por_cliente_count = marcas_por_cliente.groupby("CodigoCliente")["MarcaCCC"].nunique()
+            marcas_por_cliente_count = marcas_por_cliente.groupby("CodigoCliente", observed=True)["MarcaCCC"].nunique()
             
             # Clientes con 2+ marcas
             clientes_ccc = marcas_por_cliente_count[marcas_por_cliente_count > 1].index
@@ -123,13 +123,13 @@ def export_clientes_y_sabores(df_filtrado):
                 clientes_info = df_ccu[df_ccu["CodigoCliente"].isin(clientes_ccc)].copy()
                 
                 # Agrupar para obtener datos por cliente
-                ccc_nandu_df = clientes_info.groupby(['CodigoCliente', 'RazonSocial']).agg({
+                ccc_nandu_df = clientes_info.groupby(['CodigoCliente', 'RazonSocial'], observed=True).agg({
                     'MarcaCCC': lambda x: len(x.unique()),  # Cantidad de marcas distintas
                     'Kg_Lt': 'sum'  # Total kg/lt
                 }).reset_index()
                 
                 # Obtener detalle de marcas por cliente
-                detalle_marcas = clientes_info.groupby(['CodigoCliente', 'RazonSocial'])['MarcaCCC'].apply(
+                detalle_marcas = clientes_info.groupby(['CodigoCliente', 'RazonSocial'], observed=True)['MarcaCCC'].apply(
                     lambda x: ', '.join(sorted(x.unique()))
                 ).reset_index()
                 
@@ -151,26 +151,23 @@ def export_clientes_y_sabores(df_filtrado):
     pv_levite_df = pd.DataFrame()
     
     if not df_filtrado.empty and "Marcas" in df_filtrado.columns and "Descripcion" in df_filtrado.columns:
-        marcas_norm = df_filtrado["Marcas"].astype(str).str.strip()
+        attrs = product_attributes(df_filtrado["Descripcion"])
+        marcas = brand_tags(df_filtrado["Marcas"])
         
         # Filtrar solo productos de marca LEVITE con ventas positivas
-        mask_levite = marcas_norm.str.contains(r"\bLEVITE\b", case=False, na=False)
-        df_levite = df_filtrado[mask_levite & (df_filtrado.get("Kg_Lt", 0) > 0)].copy()
+        mask_levite = (marcas["Levite"] & (df_filtrado.get("Kg_Lt", 0) > 0)).to_numpy()
+        df_levite = df_filtrado[mask_levite].copy()
         
         if not df_levite.empty:
-            # Extraer sabores (MISMA LÓGICA que build_global_summary)
-            extraido = df_levite["Descripcion"].astype(str).str.lower().str.extract(r"levite\s+([a-záéíóúñ]+(?:\s+[a-záéíóúñ]+)?)")[0]
-            df_levite["Sabor"] = extraido.fillna("").str.strip().str.title()
+            # Sabores del catálogo de productos (MISMA LÓGICA que build_global_summary)
+            df_levite["Sabor"] = attrs["SaborLevite"].to_numpy()[mask_levite]
             
             # Filtrar sabores válidos (no vacíos y que no sean "limonada")
-            df_levite_valido = df_levite[
-                (df_levite["Sabor"] != "") & 
-                (~df_levite["Sabor"].str.contains(r"limonada", case=False, na=False))
-            ].copy()
+            df_levite_valido = df_levite[attrs["SaborValido"].to_numpy()[mask_levite]].copy()
             
             if not df_levite_valido.empty:
                 # Sabores por cliente (igual que en build_global_summary)
-                sabores_por_cliente = df_levite_valido.groupby("CodigoCliente")["Sabor"].nunique()
+                sabores_por_cliente = df_levite_valido.groupby("CodigoCliente", observed=True)["Sabor"].nunique()
                 
                 # Solo clientes con sabores > 0
                 clientes_con_sabores = sabores_por_cliente[sabores_por_cliente > 0]
@@ -180,13 +177,13 @@ def export_clientes_y_sabores(df_filtrado):
                     clientes_levite = df_levite_valido[df_levite_valido["CodigoCliente"].isin(clientes_con_sabores.index)].copy()
                     
                     # Agrupar información por cliente
-                    pv_levite_df = clientes_levite.groupby(['CodigoCliente', 'RazonSocial']).agg({
+                    pv_levite_df = clientes_levite.groupby(['CodigoCliente', 'RazonSocial'], observed=True).agg({
                         'Sabor': 'nunique',  # Cantidad de sabores distintos
                         'Kg_Lt': 'sum'  # Total kg/lt
                     }).reset_index()
                     
                     # Obtener lista de sabores por cliente
-                    detalle_sabores = clientes_levite.groupby(['CodigoCliente', 'RazonSocial'])['Sabor'].apply(
+                    detalle_sabores = clientes_levite.groupby(['CodigoCliente', 'RazonSocial'], observed=True)['Sabor'].apply(
                         lambda x: ', '.join(sorted(x.unique()))
                     ).reset_index()
                     
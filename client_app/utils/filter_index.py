@@ -0,0 +1,161 @@
+# utils/filter_index.py
+"""
+Índice invertido para los filtros del dashboard.
+
+Para cada columna filtrable se factorizan los valores y se guarda, por cada
+valor, la lista ordenada de filas donde aparece (listas de posiciones en un
+solo arreglo + offsets). Para el filtro de calibre se indexan además los
+números que aparecen en cada descripción distinta.
+
+Una selección de varios valores de una columna se convierte en un bitmap de
+filas (bits empaquetados con numpy); los filtros se combinan con AND sobre los
+bitmaps y el DataFrame se recorta una sola vez al final. El costo de cada
+filtro depende de las filas de los valores elegidos, no de cuántos filtros hay
+activos.
+
+Las listas de opciones de los filtros en cascada salen de una tabla con las
+combinaciones distintas de valores de los filtros y se recuerdan según los
+filtros previos elegidos. El índice sale de st.cache_resource y lo comparten
+las sesiones (cada una en su hilo): ese recuerdo se protege con un lock.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Columnas con índice invertido (las de los filtros del dashboard)
+FILTER_COLUMNS = ["Grupo", "Canal", "Marcas", "NomSupervisor", "NomVendedor", "RazonSocial", "Calibre_CC"]
+
+# Listas de opciones recordadas por índice (una por combinación de filtros previos)
+_MAX_CACHED_OPTIONS = 256
+
+
+class FilterIndex:
+    """
+    Índice valor -> filas para las columnas de FILTER_COLUMNS de un DataFrame.
+    Los bitmaps son arreglos uint8 con un bit por fila (np.packbits).
+    """
+
+    def __init__(self, df):
+        self.n_filas = len(df)
+        self.codigos = {}
+        self.valores = {}
+        self.filas = {}
+        self.offsets = {}
+        for col in FILTER_COLUMNS + ["Descripcion"]:
+            if col not in df.columns:
+                continue
+            codigos, valores = pd.factorize(df[col])
+            # Filas agrupadas por valor (los nulos, código -1, quedan afuera)
+            orden = np.argsort(codigos, kind="stable")
+            n_nulos = int(np.count_nonzero(codigos < 0))
+            self.codigos[col] = codigos.astype(np.int32)
+            self.valores[col] = pd.Index(valores)
+            self.filas[col] = orden[n_nulos:].astype(np.int32)
+            self.offsets[col] = np.concatenate(
+                [[0], np.cumsum(np.bincount(codigos[codigos >= 0], minlength=len(valores)))]
+            )
+
+        # Tokens numéricos de cada descripción distinta -> descripciones que los contienen.
+        # Un token es una secuencia máxima de dígitos: "N" como token equivale a (?<!\d)N(?!\d)
+        self.tokens = {}
+        if "Descripcion" in self.valores:
+            tokens_por_desc = pd.Series(self.valores["Descripcion"]).astype(str).str.findall(r"\d+")
+            for codigo, tokens in enumerate(tokens_por_desc):
+                for token in set(tokens):
+                    self.tokens.setdefault(token, []).append(codigo)
+            self.tokens = {token: np.array(codigos, dtype=np.int32) for token, codigos in self.tokens.items()}
+
+        # Tabla de co-ocurrencia: combinaciones distintas de valores de los filtros
+        # (mucho más chica que las filas). Las opciones de cada filtro se calculan sobre ella.
+        self.combinaciones = pd.DataFrame(self.codigos).drop_duplicates().reset_index(drop=True)
+        self._opciones = OrderedDict()
+        self._lock = threading.Lock()
+
+    def all_rows(self):
+        """Bitmap con todas las filas seleccionadas."""
+        return self.from_mask(np.ones(self.n_filas, dtype=bool))
+
+    def from_mask(self, mask):
+        """Bitmap a partir de una máscara booleana por fila."""
+        return np.packbits(np.asarray(mask, dtype=bool))
+
+    def rows(self, bitmap):
+        """Máscara booleana por fila a partir de un bitmap."""
+        return np.unpackbits(bitmap, count=self.n_filas).astype(bool)
+
+    def _rows_of(self, col, codigos):
+        """Máscara booleana de las filas con alguno de los códigos (unión de sus listas de filas)."""
+        mask = np.zeros(self.n_filas, dtype=bool)
+        for codigo in codigos:
+            mask[self.filas[col][self.offsets[col][codigo]:self.offsets[col][codigo + 1]]] = True
+        return mask
+
+    def select(self, col, valores):
+        """Bitmap de las filas donde `col` toma alguno de `valores` (OR de las listas de filas)."""
+        codigos = self.valores[col].get_indexer(pd.Index(list(valores)))
+        return self.from_mask(self._rows_of(col, codigos[codigos >= 0]))
+
+    def select_calibres(self, calibres):
+        """
+        Bitmap de las filas cuya Descripcion contiene alguno de los calibres como
+        número completo (100 no coincide con 1000), buscando en el índice de tokens.
+        """
+        vacio = np.empty(0, dtype=np.int32)
+        codigos = np.unique(np.concatenate([vacio] + [self.tokens.get(str(int(c)), vacio) for c in calibres]))
+        return self.from_mask(self._rows_of("Descripcion", codigos))
+
+    def _combination_mask(self, estado):
+        """Combinaciones compatibles con los filtros de `estado` ([(columna, valores), ...])."""
+        mask = np.ones(len(self.combinaciones), dtype=bool)
+        for col, valores in estado:
+            if col == "Calibre":
+                vacio = np.empty(0, dtype=np.int32)
+                codigos = np.concatenate([vacio] + [self.tokens.get(str(int(c)), vacio) for c in valores])
+                col = "Descripcion"
+            else:
+                codigos = self.valores[col].get_indexer(pd.Index(list(valores)))
+                codigos = codigos[codigos >= 0]
+            # Última posición: valor nulo (código -1), nunca seleccionado
+            tabla = np.zeros(len(self.valores[col]) + 1, dtype=bool)
+            tabla[codigos] = True
+            mask &= tabla[self.combinaciones[col].to_numpy()]
+        return mask
+
+    def options(self, col, estado=()):
+        """
+        Valores distintos (sin nulos, ordenados) de `col` en los datos que quedan
+        después de los filtros de `estado` ([(columna, valores), ...]; la columna
+        "Calibre" filtra por los números de la descripción). Las listas se guardan
+        por estado, así que un cambio en otro filtro no las recalcula.
+        """
+        clave = (col, tuple((c, frozenset(v)) for c, v in estado))
+        with self._lock:
+            if clave in self._opciones:
+                self._opciones.move_to_end(clave)
+                return self._opciones[clave]
+
+        codigos = self.combinaciones[col].to_numpy()
+        if estado:
+            codigos = codigos[self._combination_mask(estado)]
+        presentes = np.unique(codigos[codigos >= 0])
+        opciones = sorted(self.valores[col][presentes])
+
+        with self._lock:
+            self._opciones[clave] = opciones
+            if len(self._opciones) > _MAX_CACHED_OPTIONS:
+                self._opciones.popitem(last=False)
+        return opciones
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def cached_filter_index(_df, clave):
+    """
+    Índice de filtros de un dataset, construido una sola vez por `clave`
+    (huellas del contenido de los archivos, fechas y versiones de los que salió
+    `_df`, que no se hashea). Se comparte entre sesiones: la clave no debe
+    depender solo de nombres o tamaños de archivo.
+    """
+    return FilterIndex(_df)
@@ -0,0 +1,150 @@
+# utils/kpis.py
+"""
+Motor de indicadores por cliente para el resumen global.
+
+En lugar de filtrar el DataFrame y agrupar por CodigoCliente una vez por
+indicador, se factoriza CodigoCliente y se calcula en una sola pasada agrupada
+una tabla compacta con una fila por cliente (Kg total, Kg de agua pura y
+saborizada, filas Levite, sabores Levite distintos, marcas CCC distintas).
+Los indicadores se derivan de esa tabla.
+
+Las medidas que solo cuentan en un subconjunto de filas se enmascaran con NaN
+(no con 0): la suma agrupada saltea los NaN, así que cada cliente suma
+exactamente las mismas filas, en el mismo orden, que con el filtro previo, y
+los resultados coinciden con los del cálculo original.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.catalog import product_attributes, brand_tags
+
+# Celdas grupo × código hasta las que los conteos usan una tabla densa (más allá, ordenan)
+MAX_DENSE_CELLS = 1 << 25
+
+def _masked(valores, mask):
+    return np.where(mask, valores, np.nan)
+
+
+def _pair_keys(grupos, codigos, mask):
+    mask = mask & (grupos >= 0) & (codigos >= 0)
+    base = int(codigos[mask].max()) + 1 if mask.any() else 1
+    return grupos[mask].astype(np.int64) * base + codigos[mask], base, mask
+
+
+def distinct_per_group(grupos, codigos, mask, n_grupos):
+    """
+    Cantidad de códigos distintos por grupo entre las filas de `mask`
+    (grupos y códigos factorizados; -1 = nulo, no cuenta). Cada par
+    (grupo, código) se codifica en un entero: si la tabla grupo × código es
+    chica se marcan los pares en un bitmap denso, si no se ordenan y se
+    cuentan los cambios.
+    """
+    pares, base, _ = _pair_keys(grupos, codigos, mask)
+    if not len(pares):
+        return np.zeros(n_grupos, dtype=np.int64)
+    if n_grupos * base <= MAX_DENSE_CELLS:
+        vistos = np.zeros(n_grupos * base, dtype=bool)
+        vistos[pares] = True
+        return np.count_nonzero(vistos.reshape(n_grupos, base), axis=1).astype(np.int64)
+    pares.sort()
+    pares = pares[np.r_[True, pares[1:] != pares[:-1]]]
+    return np.bincount(pares // base, minlength=n_grupos)
+
+
+def first_occurrence_counts(grupos, codigos, valores, n_grupos, n_valores):
+    """
+    Matriz (n_grupos × n_valores): cuántos códigos distintos de cada grupo
+    aparecen por primera vez (menor de `valores`, enteros entre 0 y n_valores - 1)
+    en cada valor. Ej.: clientes nuevos de cada canal por mes; su suma
+    acumulada da los clientes distintos hasta cada mes.
+    """
+    pares, base, mask = _pair_keys(grupos, codigos, np.ones(len(grupos), dtype=bool))
+    valores = valores[mask].astype(np.int64)
+    if n_grupos * base <= MAX_DENSE_CELLS:
+        # El tipo más chico que guarda n_valores (uint8 para los meses: la tabla ocupa lo mismo que un bitmap)
+        tipo = np.min_scalar_type(n_valores)
+        primero = np.full(n_grupos * base, n_valores, dtype=tipo)
+        np.minimum.at(primero, pares, valores.astype(tipo))
+        primero = primero.reshape(n_grupos, base)
+        fila, col = np.nonzero(primero < n_valores)
+        celdas = fila * n_valores + primero[fila, col]
+    else:
+        clave = pares * n_valores + valores
+        clave.sort()
+        par = clave // n_valores
+        clave = clave[np.r_[True, par[1:] != par[:-1]]] if len(clave) else clave
+        celdas = clave // (n_valores * base) * n_valores + clave % n_valores
+    return np.bincount(celdas, minlength=n_grupos * n_valores).reshape(n_grupos, n_valores)
+
+
+def client_table(df):
+    """
+    Tabla con una fila por cliente (índice = id factorizado de CodigoCliente) y
+    las columnas que necesitan los indicadores. Retorna (tabla, flags), donde
+    flags indica si hubo filas Levite y filas Levite con sabor válido.
+    """
+    ids, clientes = pd.factorize(df["CodigoCliente"])
+    n_clientes = len(clientes)
+    kg = df["Kg"].to_numpy(dtype=float)
+    kg_pos = kg > 0
+
+    columnas = {"Kg": kg}
+    if "Rubro" in df.columns:
+        rubro = df["Rubro"].str.upper()
+        columnas["KgAgua"] = _masked(kg, (rubro == "AGUA").to_numpy(dtype=bool))
+        columnas["KgSaborizada"] = _masked(kg, (rubro == "SABORISADAS").to_numpy(dtype=bool))
+
+    flags = {"levite": False, "sabores": False}
+    distintos = {}
+    if {"Marcas", "Descripcion"}.issubset(df.columns):
+        attrs = product_attributes(df["Descripcion"])
+        marcas = brand_tags(df["Marcas"])
+
+        # Levite con venta positiva: compradores y sabores distintos (sin "limonada")
+        mask_levite = marcas["Levite"].to_numpy() & kg_pos
+        columnas["FilasLevite"] = _masked(1.0, mask_levite)
+        mask_sabor = mask_levite & attrs["SaborValido"].to_numpy()
+        codigos_sabor, _ = pd.factorize(attrs["SaborLevite"])
+        distintos["SaboresLevite"] = distinct_per_group(ids, codigos_sabor, mask_sabor, n_clientes)
+
+        # CCC Ñandú: marcas distintas por cliente en calibre 330 con venta positiva
+        # (Heineken, Miller, Imperial Golden u "otra", que también cuenta como marca)
+        mask_ccc = attrs["Calibre330"].to_numpy() & kg_pos
+        codigos_marca = np.select(
+            [marcas["Heineken"].to_numpy(), marcas["Miller"].to_numpy(),
+             (marcas["Imperial"] & attrs["Golden"]).to_numpy()],
+            [0, 1, 2],
+            default=3,
+        )
+        distintos["MarcasCCC"] = distinct_per_group(ids, codigos_marca, mask_ccc, n_clientes)
+        flags = {"levite": bool(mask_levite.any()), "sabores": bool(mask_sabor.any())}
+
+    # Una sola pasada agrupada por cliente (los NaN no suman)
+    tabla = pd.DataFrame(columnas).groupby(ids).sum()
+    tabla = tabla.drop(index=-1, errors="ignore").reindex(range(n_clientes), fill_value=0)
+    for nombre, valores in distintos.items():
+        tabla[nombre] = valores
+    return tabla, flags
+
+
+def client_kpis(df):
+    """
+    Indicadores por cliente del resumen global, calculados a partir de client_table.
+    Retorna un diccionario con los conteos (None si faltan las columnas necesarias).
+    """
+    tabla, flags = client_table(df)
+    kpis = {
+        "cce": int((tabla["Kg"] > 0).sum()),
+        "cce_agua_pura": int((tabla["KgAgua"] > 0).sum()) if "KgAgua" in tabla else 0,
+        "cce_agua_saborizada": int((tabla["KgSaborizada"] > 0).sum()) if "KgSaborizada" in tabla else 0,
+        "compradores_levite": None,
+        "suma_sabores_levite": None,
+        "ccc_nandu": None,
+    }
+    if "MarcasCCC" in tabla:
+        kpis["ccc_nandu"] = int((tabla["MarcasCCC"] > 1).sum())
+        if flags["levite"]:
+            kpis["compradores_levite"] = int((tabla["FilasLevite"] > 0).sum())
+            if flags["sabores"]:
+                kpis["suma_sabores_levite"] = int(tabla["SaboresLevite"].sum())
+    return kpis
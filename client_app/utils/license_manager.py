@@ -1,4 +1,3 @@
-import requests
 import json
 import os
 from datetime import datetime
@@ -28,8 +27,13 @@ class LicenseManager:
                 return None
         return None
     
-    def fetch_licenses_from_cloud(self):
-        """Obtiene las licencias desde la nube"""
+    def fetch_licenses(self):
+        """
+        Obtiene las licencias desde la nube sin mostrar nada (sirve también sin
+        interfaz, ej. cli.py). Retorna (licencias, None) o (None, mensaje de error)
+        """
+        import requests  # se importa al verificar, no al cargar el módulo
+
         try:
             response = requests.get(self.license_url, timeout=10)
             response.raise_for_status()
@@ -39,24 +43,35 @@ class LicenseManager:
             
             # Parsear el JSON
             licenses_data = json.loads(licenses_text)
-            return licenses_data.get("Licencias", [])
+            return licenses_data.get("Licencias", []), None
             
         except requests.exceptions.RequestException as e:
-            st.error(f"❌ Error de conexión: No se pudo conectar al servidor de licencias. {str(e)}")
-            return None
+            return None, f"Error de conexión: No se pudo conectar al servidor de licencias. {str(e)}"
         except json.JSONDecodeError as e:
-            st.error(f"❌ Error de formato: El archivo de licencias tiene un formato inválido. {str(e)}")
-            return None
+            return None, f"Error de formato: El archivo de licencias tiene un formato inválido. {str(e)}"
         except Exception as e:
-            st.error(f"❌ Error inesperado al obtener licencias: {str(e)}")
-            return None
+            return None, f"Error inesperado al obtener licencias: {str(e)}"
+
+    def fetch_licenses_from_cloud(self):
+        """Obtiene las licencias desde la nube (los errores se muestran en la interfaz)"""
+        licenses, error = self.fetch_licenses()
+        if error:
+            st.error(f"❌ {error}")
+        return licenses
     
-    def verify_license(self, license_code):
-        """Verifica si una licencia está activa"""
-        licenses = self.fetch_licenses_from_cloud()
+    def verify_license(self, license_code, show_errors=True):
+        """
+        Verifica si una licencia está activa. Con show_errors=False no usa la
+        interfaz: el error de conexión vuelve en el mensaje
+        """
+        if show_errors:
+            licenses = self.fetch_licenses_from_cloud()
+            error = "No se pudo conectar al servidor de licencias"
+        else:
+            licenses, error = self.fetch_licenses()
         
         if licenses is None:
-            return False, "No se pudo conectar al servidor de licencias"
+            return False, error
         
         # Buscar la licencia en la lista
         for license_item in licenses:
@@ -69,8 +84,11 @@ class LicenseManager:
         
         return False, "Código de licencia no encontrado"
     
-    def check_license_status(self):
-        """Verifica el estado de la licencia actual SIEMPRE contra la nube"""
+    def check_license_status(self, show_errors=True):
+        """
+        Verifica el estado de la licencia actual SIEMPRE contra la nube
+        (show_errors=False: sin interfaz, ver verify_license)
+        """
         local_license = self.load_local_license()
         
         if not local_license:
@@ -81,7 +99,7 @@ class LicenseManager:
             return False, "Código de licencia inválido"
         
         # SIEMPRE verificar con el servidor en tiempo real
-        is_valid, message = self.verify_license(license_code)
+        is_valid, message = self.verify_license(license_code, show_errors)
         
         # NO actualizamos el estado local, solo verificamos contra la nube
         return is_valid, message
@@ -0,0 +1,166 @@
+# utils/metrics.py
+"""
+Instrumentación liviana del pipeline: tramos por etapa (carga, process_data,
+filtros, resumen, interanual, gráficos, exportación) con duración, filas y
+memoria, y eventos con los valores de diagnóstico.
+
+Se activa con DASHBOARD_METRICS:
+- vacío (por defecto): apagada. `timed` deja las funciones sin envolver y
+  `span`/`event` retornan enseguida, sin medir ni calcular nada.
+- "log": cada registro es una línea JSON en el logger "dashboard.metrics".
+- cualquier otro valor: ruta de un archivo donde se agregan los registros,
+  una línea JSON por registro.
+
+Cada registro lleva "tipo" ("span" o "evento"), "nombre", la hora y sus
+campos. Los tramos agregan "segundos", "rss_mb" (al terminar) y "memoria_mb"
+(cuánto creció el RSS durante el tramo).
+"""
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+
+from utils.config import METRICS
+
+MB = 1024 * 1024
+
+logger = logging.getLogger("dashboard.metrics")
+_lock = threading.Lock()
+
+
+def enabled():
+    """Indica si la instrumentación está activa."""
+    return bool(METRICS)
+
+
+def current_rss():
+    """RSS actual del proceso en bytes (Linux: /proc; otros sistemas: pico de getrusage)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico if sys.platform == "darwin" else pico * 1024
+
+
+def _emit(registro):
+    linea = json.dumps(registro, ensure_ascii=False, default=str)
+    if METRICS == "log":
+        if not logger.handlers:
+            logger.addHandler(logging.StreamHandler())
+            logger.setLevel(logging.INFO)
+        logger.info(linea)
+        return
+    with _lock, open(METRICS, "a", encoding="utf-8") as f:
+        f.write(linea + "\n")
+
+
+def _value(valor):
+    # Los valores de diagnóstico costosos se pasan como funciones: solo se calculan si hay métricas
+    valor = valor() if callable(valor) else valor
+    return valor.item() if hasattr(valor, "item") and getattr(valor, "ndim", None) == 0 else valor
+
+
+def _record(tipo, nombre, campos):
+    registro = {"tipo": tipo, "nombre": nombre, "hora": round(time.time(), 3)}
+    registro.update((clave, _value(valor)) for clave, valor in campos.items())
+    return registro
+
+
+def event(nombre, **campos):
+    """Registra un evento con valores de diagnóstico (los que sean funciones se llaman solo si está activa)."""
+    if not METRICS:
+        return
+    _emit(_record("evento", nombre, campos))
+
+
+class _Span:
+    """Tramo medido: duración y crecimiento del RSS, más los campos que se agreguen con `set`."""
+
+    def __init__(self, nombre, campos):
+        self.nombre = nombre
+        self.campos = dict(campos)
+
+    def set(self, **campos):
+        self.campos.update(campos)
+
+    def __enter__(self):
+        self._rss = current_rss()
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo_error, error, traza):
+        segundos = time.perf_counter() - self._inicio
+        rss = current_rss()
+        registro = _record("span", self.nombre, self.campos)
+        registro.update(
+            segundos=round(segundos, 6),
+            rss_mb=round(rss / MB, 1),
+            memoria_mb=round((rss - self._rss) / MB, 1),
+        )
+        if tipo_error is not None:
+            registro["error"] = tipo_error.__name__
+        _emit(registro)
+        return False
+
+
+class _NullSpan:
+    """Tramo sin efecto (métricas apagadas)."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo_error, error, traza):
+        return False
+
+    def set(self, **campos):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(nombre, **campos):
+    """
+    Contexto que mide un tramo del pipeline:
+
+        with span("filtros") as tramo:
+            recorte = df[filas]
+            tramo.set(filas=len(recorte))
+    """
+    return _Span(nombre, campos) if METRICS else _NULL_SPAN
+
+
+def rows(valor):
+    """Filas de un resultado (DataFrame, o el primero dentro de una tupla); None si no aplica."""
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return len(valor)
+    if isinstance(valor, tuple):
+        return next((len(v) for v in valor if isinstance(v, (pd.DataFrame, pd.Series))), None)
+    return None
+
+
+def timed(nombre):
+    """
+    Decorador: mide cada llamada como un tramo `nombre`, con las filas del
+    primer argumento y del resultado. Con las métricas apagadas deja la
+    función tal cual.
+    """
+    def decorador(func):
+        if not METRICS:
+            return func
+
+        @functools.wraps(func)
+        def medida(*args, **kwargs):
+            with span(nombre, filas_entrada=rows(args[0]) if args else None) as tramo:
+                resultado = func(*args, **kwargs)
+                tramo.set(filas=rows(resultado))
+            return resultado
+        return medida
+    return decorador
@@ -0,0 +1,42 @@
+# utils/normalize.py
+"""
+Normalización de texto para comparar nombres, marcas y descripciones:
+sin acentos (NFD sin marcas diacríticas), en minúsculas y sin espacios en los extremos.
+
+Cada valor distinto se normaliza una sola vez: las columnas se factorizan y
+solo se normalizan los valores únicos, con una memoria acotada compartida
+entre llamadas.
+"""
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Valores distintos que se recuerdan entre llamadas
+NORMALIZE_CACHE_SIZE = 65_536
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _normalize_value(s):
+    s = str(s)
+    s = ''.join(c for c in unicodedata.normalize('NFD', s) if unicodedata.category(c) != 'Mn')
+    return s.lower().strip()
+
+
+def normalize_text(s):
+    """Normaliza un valor: sin acentos, minúsculas y sin espacios en los extremos ("" si es nulo)."""
+    if pd.isna(s):
+        return ""
+    return _normalize_value(s)
+
+
+def normalize_column(series):
+    """
+    Normaliza una columna completa (mismo resultado que `series.apply(normalize_text)`),
+    normalizando una sola vez cada valor distinto.
+    """
+    codigos, uniques = pd.factorize(series)
+    # Última posición: valor normalizado de los nulos (código -1)
+    tabla = np.array([_normalize_value(u) for u in uniques] + [""], dtype=object)
+    return pd.Series(tabla[codigos], index=series.index, name=series.name).astype(str)
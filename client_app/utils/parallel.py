@@ -0,0 +1,228 @@
+# utils/parallel.py
+"""
+Ejecución en varios núcleos de transformaciones de texto fila por fila.
+
+Las funciones de texto (regex, normalización de acentos) son Python puro y un
+pool de hilos no las acelera por el GIL; acá se usa un pool de procesos. La
+columna de entrada se copia una sola vez a memoria compartida (bytes UTF-8
+concatenados + offsets) y cada proceso decodifica solo su tramo, en lugar de
+serializar los strings en cada tarea.
+
+Por debajo de un umbral de filas se ejecuta en serie. El umbral se mide: se
+estima el costo por fila de la función sobre una muestra y el costo fijo de
+levantar el pool, y solo se paraleliza cuando el ahorro supera ese costo fijo.
+El costo fijo se mide al levantar el pool que hace el trabajo (arranque de los
+procesos y una tarea vacía en cada uno); hasta la primera medición, el pool se
+levanta antes de decidir. El pool y la memoria compartida se importan solo al
+paralelizar.
+
+Los pools de procesos (los de este módulo y el de lectura de archivos) no usan
+fork: el servidor de Streamlit corre cada sesión en un hilo, y un proceso
+copiado mientras otro hilo tiene un lock (logging, imports, cachés) puede
+quedar colgado. Se usa forkserver, o spawn donde no existe (Windows). El
+servidor de forkserver importa una vez los módulos de las tareas (_PRELOAD) y
+cada proceso nuevo sale de él con esos módulos ya cargados. El script principal
+tampoco se vuelve a ejecutar en los procesos: app.py corre la app solo como
+__main__.
+"""
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.config import PARALLEL_WORKERS, PARALLEL_MIN_ROWS
+
+# Filas de la muestra con la que se mide el costo por fila
+_SAMPLE_ROWS = 200
+
+# Tramos por proceso (más de uno reparte mejor la carga)
+_CHUNKS_PER_WORKER = 4
+
+# Módulos de las tareas de los pools, importados una vez en el servidor de forkserver
+_PRELOAD = ["utils.data_loader", "utils.catalog"]
+
+# Si el servidor de forkserver de este proceso ya terminó de importar _PRELOAD
+_servidor_listo = False
+
+# Último costo fijo medido de levantar el pool y hacer una tarea, en segundos (por cantidad de procesos)
+_overhead_pool = {}
+
+
+def resolve_workers(n_jobs=None):
+    """Cantidad de procesos a usar (n_jobs, DASHBOARD_PARALLEL_WORKERS o uno por CPU)."""
+    if n_jobs is None:
+        n_jobs = PARALLEL_WORKERS or os.cpu_count() or 1
+    return max(1, n_jobs)
+
+
+def process_pool(workers):
+    """Pool de `workers` procesos iniciados con forkserver o spawn (nunca fork)."""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        from multiprocessing import forkserver
+
+        global _servidor_listo
+        contexto = multiprocessing.get_context("forkserver")
+        # Solo tiene efecto antes de que arranque el servidor (el primer pool)
+        contexto.set_forkserver_preload(_PRELOAD)
+        forkserver.ensure_running()
+        if not _servidor_listo:
+            # El servidor importa _PRELOAD antes de crear su primer proceso: se espera acá
+            # una vez, para que no cuente en lo que tarda cada pool en tener sus procesos
+            proceso = contexto.Process(target=_noop_task, args=(None,))
+            proceso.start()
+            proceso.join()
+            _servidor_listo = True
+    else:
+        contexto = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=contexto)
+
+
+def _start_pool(workers):
+    """
+    Levanta un pool de `workers` procesos con todos listos (una tarea vacía en
+    cada uno) y guarda lo que tardó en _overhead_pool. Retorna el pool.
+    """
+    executor = process_pool(workers)
+    inicio = time.perf_counter()
+    list(executor.map(_noop_task, range(workers)))
+    _overhead_pool[workers] = time.perf_counter() - inicio
+    return executor
+
+
+def _noop_task(_):
+    return None
+
+
+def sample_cost(func, valores):
+    """
+    Costo por fila de `func` en segundos, medido sobre una muestra de `valores`.
+    Retorna (costo, resultado_de_la_muestra): el resultado no se recalcula.
+    """
+    muestra = valores[:_SAMPLE_ROWS]
+    inicio = time.perf_counter()
+    resultado_muestra = [func(v) for v in muestra]
+    return (time.perf_counter() - inicio) / max(len(muestra), 1), resultado_muestra
+
+
+def serial_threshold(por_fila, workers, overhead):
+    """
+    Cantidad mínima de filas a partir de la cual conviene paralelizar una
+    función que cuesta `por_fila` segundos por fila, con un pool de `workers`
+    procesos que cuesta `overhead` segundos levantar.
+    """
+    if PARALLEL_MIN_ROWS:
+        return PARALLEL_MIN_ROWS
+    if por_fila <= 0:
+        return float("inf")
+    # En paralelo: overhead + n * por_fila / workers; en serie: n * por_fila
+    ahorro_por_fila = por_fila * (1 - 1 / workers)
+    return overhead / ahorro_por_fila
+
+
+def _is_null(valor):
+    return valor is None or (isinstance(valor, float) and valor != valor) or valor is pd.NA
+
+
+def _to_shared(valores):
+    """
+    Copia una lista de strings (o nulos) a un bloque de memoria compartida:
+    [offsets int64 (n+1)] [nulos bool (n)] [bytes UTF-8].
+    """
+    n = len(valores)
+    nulos = np.fromiter((_is_null(v) for v in valores), dtype=np.bool_, count=n)
+    codificados = [b"" if nulo else v.encode("utf-8", "surrogatepass") for v, nulo in zip(valores, nulos)]
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in codificados], out=offsets[1:])
+    datos = b"".join(codificados)
+
+    cabecera = offsets.nbytes + nulos.nbytes
+    from multiprocessing import shared_memory
+
+    shm = shared_memory.SharedMemory(create=True, size=max(cabecera + len(datos), 1))
+    shm.buf[:offsets.nbytes] = offsets.tobytes()
+    shm.buf[offsets.nbytes:cabecera] = nulos.tobytes()
+    shm.buf[cabecera:cabecera + len(datos)] = datos
+    return shm
+
+
+def _apply_shared(nombre, n, inicio, fin, func):
+    """Tarea de cada proceso: decodifica las filas [inicio, fin) y les aplica func."""
+    from multiprocessing import shared_memory
+
+    shm = shared_memory.SharedMemory(name=nombre)
+    try:
+        buf = shm.buf
+        offsets = np.frombuffer(buf, dtype=np.int64, count=n + 1)
+        nulos = np.frombuffer(buf, dtype=np.bool_, count=n, offset=offsets.nbytes)
+        base = offsets.nbytes + n
+        resultado = []
+        for i in range(inicio, fin):
+            if nulos[i]:
+                resultado.append(func(np.nan))
+            else:
+                texto = bytes(buf[base + offsets[i]:base + offsets[i + 1]]).decode("utf-8", "surrogatepass")
+                resultado.append(func(texto))
+        # Liberar las vistas antes de cerrar el bloque
+        del offsets, nulos, buf
+        return resultado
+    finally:
+        shm.close()
+
+
+def _map_shared(executor, valores, func, workers):
+    """Aplica `func` a `valores` en los procesos de `executor` (pool ya levantado)."""
+    n = len(valores)
+    shm = _to_shared(valores)
+    try:
+        paso = max(1, -(-n // (workers * _CHUNKS_PER_WORKER)))
+        tramos = [(i, min(i + paso, n)) for i in range(0, n, paso)]
+        futuros = [executor.submit(_apply_shared, shm.name, n, a, b, func) for a, b in tramos]
+        resultado = []
+        for futuro in futuros:
+            resultado.extend(futuro.result())
+        return resultado
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def parallel_map(valores, func, n_jobs=None):
+    """
+    Aplica `func` a cada valor (strings o nulos) y devuelve la lista de resultados.
+    `func` debe poder importarse desde un módulo (se ejecuta en otros procesos).
+    Para listas chicas, un solo proceso, o valores que no son texto, se ejecuta en serie.
+    """
+    valores = list(valores)
+    workers = resolve_workers(n_jobs)
+    if workers == 1 or len(valores) <= _SAMPLE_ROWS:
+        return [func(v) for v in valores]
+    if not all(isinstance(v, str) or _is_null(v) for v in valores):
+        # Solo el texto viaja por memoria compartida; el resto se resuelve en serie
+        return [func(v) for v in valores]
+
+    por_fila, resultado_muestra = sample_cost(func, valores)
+    resto = valores[len(resultado_muestra):]
+    executor = None
+    if workers not in _overhead_pool and not PARALLEL_MIN_ROWS and por_fila > 0:
+        # Costo fijo sin medir: se mide con el pool que después hace el trabajo
+        executor = _start_pool(workers)
+    try:
+        if len(valores) < serial_threshold(por_fila, workers, _overhead_pool.get(workers, 0.0)):
+            return resultado_muestra + [func(v) for v in resto]
+        if executor is None:
+            executor = _start_pool(workers)
+        return resultado_muestra + _map_shared(executor, resto, func, workers)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def parallel_apply_series(series, func, n_jobs=None):
+    """Como `series.apply(func)`, pero repartido entre procesos (ver parallel_map)."""
+    if series.empty:
+        return series.apply(func)
+    return pd.Series(parallel_map(series.tolist(), func, n_jobs), index=series.index, name=series.name)
@@ -0,0 +1,149 @@
+# utils/pipeline.py
+"""
+Pipeline del dashboard sin interfaz: carga, proceso, filtros, resumen,
+datos interanuales y exportación, para correr en un proceso batch, un worker
+o un benchmark sin runtime de Streamlit (ver cli.py).
+
+Las funciones reciben rutas de archivo, pares (nombre, bytes) o archivos con
+nombre (como los de st.file_uploader) y devuelven DataFrames y bytes; no
+escriben en la interfaz ni usan las cachés de Streamlit. Los errores de
+lectura de cada archivo se devuelven junto con los datos.
+"""
+import os
+
+from utils.cache import file_bytes
+from utils.compact import compact_frame
+from utils.cube import build_cube
+from utils.data_loader import PlanIndex, read_files
+from utils.filter_index import FilterIndex
+from utils.processor import build_global_summary, exclude_families, prepare_yoy_data, process_data
+
+# Extensiones de planillas que se leen de un directorio
+EXCEL_EXTENSIONS = (".xls", ".xlsx", ".xlsb")
+
+# Parámetros de proyección por defecto (los mismos que la interfaz)
+DEFAULT_SALIDAS_MES = 20
+DEFAULT_SALIDAS_ACTUALES = 10
+DEFAULT_CARTERA = 1000
+
+
+def as_files(fuentes):
+    """
+    Normaliza las fuentes a una lista de (nombre, bytes). Cada fuente puede ser
+    una ruta de archivo, un directorio (se toman sus planillas Excel en orden
+    alfabético), un par (nombre, bytes) o un archivo con atributo `name`.
+    """
+    archivos = []
+    for fuente in fuentes:
+        if isinstance(fuente, tuple):
+            archivos.append(fuente)
+        elif isinstance(fuente, (str, os.PathLike)):
+            ruta = os.fspath(fuente)
+            if os.path.isdir(ruta):
+                nombres = sorted(n for n in os.listdir(ruta) if n.lower().endswith(EXCEL_EXTENSIONS))
+                archivos.extend(as_files(os.path.join(ruta, n) for n in nombres))
+            else:
+                with open(ruta, "rb") as f:
+                    archivos.append((os.path.basename(ruta), f.read()))
+        else:
+            archivos.append((os.path.basename(fuente.name), file_bytes(fuente)))
+    return archivos
+
+
+def load(fuentes, date_from=None, date_to=None, max_workers=None, compact=True):
+    """
+    Lee las planillas de ventas y el archivo de PLANES, excluye las familias
+    POP y PALLETS y (si `compact`) compacta los datos en memoria.
+    Retorna: (ventas, dict_planes_o_None, [(nombre, error), ...])
+    """
+    ventas, planes, _, errores = read_files(as_files(fuentes), date_from, date_to, max_workers)
+    if compact:
+        ventas = compact_frame(ventas)
+    return exclude_families(ventas), planes, errores
+
+
+def process(ventas, date_from, date_to, planes=None, cube=False):
+    """Líneas procesadas del rango (process_data) o, con `cube`, el cubo pre-agregado."""
+    procesado = process_data(ventas, date_from, date_to, planes)
+    return build_cube(procesado) if cube else procesado
+
+
+def filter_sales(df, filtros=None, plan=None, planes=None):
+    """
+    Filtra como la interfaz: `filtros` es {columna: valores} (Grupo, Canal,
+    Marcas, NomSupervisor, NomVendedor, RazonSocial; "Calibre" con calibres en
+    cc, que se buscan en la Descripcion) y `plan` el nombre de un plan de
+    `planes`. Sin filtros ni plan devuelve `df` tal cual.
+    """
+    if not filtros and not plan:
+        return df
+    indice = FilterIndex(df)
+    seleccion = indice.all_rows()
+    for col, valores in (filtros or {}).items():
+        if col == "Calibre":
+            seleccion &= indice.select_calibres([int(c) for c in valores])
+        else:
+            seleccion &= indice.select(col, valores)
+    if plan:
+        if not planes or plan not in planes:
+            raise ValueError(f"El plan '{plan}' no está en el archivo de PLANES")
+        seleccion &= indice.from_mask(PlanIndex(planes, df["CodigoCliente"]).mask(plan))
+    return df[indice.rows(seleccion)]
+
+
+def summarize(df, date_to, salidas_mes=DEFAULT_SALIDAS_MES, salidas_actuales=DEFAULT_SALIDAS_ACTUALES,
+              cartera=DEFAULT_CARTERA):
+    """Resumen global de indicadores (una fila)."""
+    return build_global_summary(df, date_to, salidas_mes, salidas_actuales, cartera)
+
+
+def yoy(df, date_to):
+    """Datos de los gráficos interanuales: (yoy_data, channel_data)."""
+    return prepare_yoy_data(df, date_to)
+
+
+def export_summary(resumen, figuras=None):
+    """Contenido de resumen_ventas.xlsx (con las imágenes de `figuras`, si se pasan)."""
+    from utils.exporter import export_to_excel
+    return export_to_excel(resumen, figuras=figuras).getvalue()
+
+
+def export_clients(df):
+    """Planilla de CCC Ñandú y PV Levite: (bytes, nombre_de_archivo)."""
+    from utils.exporter import export_clientes_y_sabores
+    return export_clientes_y_sabores(df)
+
+
+def run(fuentes, date_from, date_to, filtros=None, plan=None, salidas_mes=DEFAULT_SALIDAS_MES,
+        salidas_actuales=DEFAULT_SALIDAS_ACTUALES, cartera=DEFAULT_CARTERA, figures=False, max_workers=None):
+    """
+    Corre el pipeline completo sobre las fuentes, como la interfaz en modo
+    archivos (sobre el cubo). Con `figures` el resumen incluye los gráficos
+    interanuales como imágenes (requiere kaleido).
+    Retorna un diccionario con: ventas (filas leídas), planes, errores y, si se
+    leyeron ventas, datos (filtrados), resumen, yoy_data, channel_data,
+    resumen_excel (bytes), clientes_excel (bytes) y clientes_excel_nombre.
+    """
+    ventas, planes, errores = load(fuentes, date_from, date_to, max_workers)
+    resultado = {"ventas": len(ventas), "planes": planes, "errores": errores}
+    if ventas.empty:
+        return resultado
+
+    datos = filter_sales(process(ventas, date_from, date_to, planes, cube=True), filtros, plan, planes)
+    resumen = summarize(datos, date_to, salidas_mes, salidas_actuales, cartera)
+    yoy_data, channel_data = yoy(datos, date_to)
+    figuras = None
+    if figures:
+        from utils.plotter import yoy_figures
+        figuras = list(yoy_figures(yoy_data, channel_data).values())
+    clientes_excel, clientes_nombre = export_clients(datos)
+    resultado.update({
+        "datos": datos,
+        "resumen": resumen,
+        "yoy_data": yoy_data,
+        "channel_data": channel_data,
+        "resumen_excel": export_summary(resumen, figuras),
+        "clientes_excel": clientes_excel,
+        "clientes_excel_nombre": clientes_nombre,
+    })
+    return resultado
@@ -1,6 +1,7 @@
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
+from utils.metrics import timed
 
 def plot_yearly_totals(df, metric='Volumen', title_suffix=''):
     """
@@ -294,3 +295,27 @@ def plot_volume_mix(df_channel):
         font=dict(color='white')
     )
     return fig
+
+
+@timed("plots")
+def yoy_figures(yoy_data, channel_data):
+    """
+    Figuras de la sección de comparación anual, en el orden en que se muestran
+    y se exportan. Retorna un diccionario vacío si no hay datos.
+    """
+    if yoy_data.empty or channel_data.empty:
+        return {}
+    # Totales por canal y año para los gráficos de barras
+    channel_totals = channel_data.groupby(['Canal', 'Año'])['Volumen'].sum().reset_index()
+    ccc_totals = channel_data.groupby(['Canal', 'Año'])['CCC'].sum().reset_index()
+    return {
+        'volumen_yoy': plot_yoy_comparison(yoy_data, metric='Volumen', period='YTD'),
+        'volumen_anual': plot_yearly_totals(yoy_data, metric='Volumen', title_suffix='(YTD)'),
+        'ccc_yoy': plot_yoy_comparison(yoy_data, metric='CCC', period='YTD'),
+        'ccc_anual': plot_yearly_totals(yoy_data, metric='CCC', title_suffix='(YTD)'),
+        'volumen_canal': plot_channel_breakdown(channel_data, metric='Volumen'),
+        'volumen_canal_anual': plot_yearly_totals(channel_totals, metric='Volumen', title_suffix='por Canal (YTD)'),
+        'ccc_canal': plot_channel_breakdown(channel_data, metric='CCC'),
+        'ccc_canal_anual': plot_yearly_totals(ccc_totals, metric='CCC', title_suffix='por Canal (YTD)'),
+        'mix_volumen': plot_volume_mix(channel_data),
+    }
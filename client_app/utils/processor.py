@@ -1,306 +1,207 @@
 import pandas as pd
-from datetime import datetime
 import numpy as np
-from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
-from functools import partial
-import multiprocessing as mp
-
-def extract_calibre(descripcion):
-    import re
-    match = re.search(r"(?:x\s*)?(\d{2,4})\s*(?:ml|cc|loc|l|lt)?", str(descripcion).lower())
-    if match:
-        return match.group(1)
-    return "Sin Calibre"
-
-def extract_bultos(descripcion):
-    import re
-    match = re.search(r"(\d+)\s*[xX]", str(descripcion))
-    return int(match.group(1)) if match else 1
-
-def process_chunk_parallel(chunk, extract_func):
-    """Procesa un chunk de datos en paralelo"""
-    return chunk.apply(extract_func)
+from utils.catalog import extract_calibre, extract_bultos, product_attributes
+from utils.parallel import parallel_apply_series
+from utils.channel_rules import channel_column
+from utils.config import BACKEND
+from utils.kpis import client_kpis, distinct_per_group, first_occurrence_counts
+from utils.metrics import event, timed
+
+# Familias que se excluyen de todos los análisis
+FAMILIAS_EXCLUIDAS = ['POP', 'PALLETS']
+
+def exclude_families(df):
+    """
+    Excluye las familias 'POP' y 'PALLETS' (columna 'Grupo').
+    Si no hay filas para excluir devuelve el mismo DataFrame, sin copiarlo.
+    """
+    if 'Grupo' in df.columns:
+        excluir = df['Grupo'].isin(FAMILIAS_EXCLUIDAS).to_numpy()
+        if excluir.any():
+            return df[~excluir]
+    return df
 
 def parallel_apply(series, func, n_jobs=None):
-    """Aplica una función a una serie usando múltiples hilos"""
-    if n_jobs is None:
-        n_jobs = min(mp.cpu_count(), 4)  # Limitar a 4 hilos máximo para evitar sobrecarga
-    
-    if len(series) < 1000:  # Para datasets pequeños, no vale la pena paralelizar
-        return series.apply(func)
-    
-    # Dividir la serie en chunks
-    chunk_size = max(len(series) // n_jobs, 100)
-    chunks = [series.iloc[i:i + chunk_size] for i in range(0, len(series), chunk_size)]
-    
-    # Procesar chunks en paralelo
-    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
-        results = list(executor.map(partial(process_chunk_parallel, extract_func=func), chunks))
-    
-    # Concatenar resultados
-    return pd.concat(results, ignore_index=True)
-
-def _norm_parallel(s):
-    """Función de normalización optimizada para paralelización"""
-    import unicodedata
-    s = str(s) if pd.notna(s) else ""
-    s = ''.join(c for c in unicodedata.normalize('NFD', s) if unicodedata.category(c) != 'Mn')
-    return s.lower().strip()
-
-def process_data(df, date_from, date_to):
-    import re
-
-    def extract_bultos(descripcion):
-        match = re.search(r"(\d+)\s*[xX]", str(descripcion))
-        return int(match.group(1)) if match else 1
-        
+    """
+    Aplica una función de texto a una serie usando varios procesos
+    (en serie por debajo del umbral medido, ver utils/parallel.py).
+    """
+    return parallel_apply_series(series, func, n_jobs)
+
+def date_range_mask(fecha, date_from, date_to):
+    """
+    Máscara de las fechas entre date_from y date_to (inclusive).
+    Un límite en None no se aplica (process_data(df, None, None) procesa todo el historial).
+    """
+    mask = pd.Series(True, index=fecha.index)
+    # Asegurarse de que los filtros de fecha sean datetime
+    if date_from is not None:
+        mask &= fecha >= pd.to_datetime(date_from)
+    if date_to is not None:
+        mask &= fecha <= pd.to_datetime(date_to)
+    return mask
+
+def filter_date_range(df, date_from, date_to):
+    """Filtra las filas con Fecha entre date_from y date_to (inclusive)."""
+    if date_from is None and date_to is None:
+        return df
+    return df[date_range_mask(df["Fecha"], date_from, date_to).to_numpy()]
+
+def _column(df, nombre):
+    """Columna `nombre` de df, aunque el encabezado venga con espacios."""
+    if nombre in df.columns:
+        return df[nombre]
+    return df[[c for c in df.columns if str(c).strip() == nombre][0]]
+
+def _parse_fecha(fecha):
+    # Verificar si la columna Fecha ya está en formato datetime
+    if pd.api.types.is_datetime64_any_dtype(fecha):
+        return fecha
+    # Si no es datetime, intentar la conversión desde días desde 1899-12-30
+    try:
+        return pd.to_datetime("1899-12-30") + pd.to_timedelta(fecha.astype(float), unit="D")
+    except (ValueError, TypeError):
+        # Si falla, intentar convertir directamente a datetime
+        return pd.to_datetime(fecha)
+
+@timed("process_data")
+def process_data(df, date_from, date_to, planes=None, channel_rules=True, reglas=None, backend=None):
+    """
+    Filtra y completa las líneas de venta (fechas, HL, calibre, bultos, neto, canal).
+    No modifica `df`: los filtros se combinan en una máscara, las filas válidas
+    se toman una sola vez y las columnas nuevas se agregan sobre ese resultado.
+    `planes` ({plan: [códigos]}) habilita las reglas de canal por plan.
+    Con `channel_rules=False` el Canal queda el del ERP (el histórico guarda
+    así las filas y aplica las reglas al leerlas). `reglas` reemplaza las de
+    canal_reglas.json y `backend` ("pandas" o "duckdb") al motor configurado.
+    """
+    if (backend or BACKEND) == "duckdb":
+        from utils import duckdb_backend
+        return duckdb_backend.process_data(df, date_from, date_to, planes, channel_rules, reglas)
+
+    # Atributos de producto: se calculan una vez por Descripcion distinta (ver utils/catalog.py)
+    attrs = product_attributes(df['Descripcion'])
+
     # Filtrar para que 'ccc ñandu' solo aparezca con calibre 330
-    mask_ccc = df['Descripcion'].str.contains('ñandu', case=False, na=False)
-    mask_calibre = ~df['Descripcion'].str.contains('330', na=False)
-    df = df[~(mask_ccc & mask_calibre)].copy()
+    mantener = ~attrs["NanduSin330"].to_numpy()
 
-    df.columns = df.columns.str.strip()
+    # Fechas (solo de las filas que quedan)
+    fecha = _column(df, "Fecha")
+    fecha = _parse_fecha(fecha if mantener.all() else fecha[mantener])
 
-    # Fechas
-    # Verificar si la columna Fecha ya está en formato datetime
-    if not pd.api.types.is_datetime64_any_dtype(df["Fecha"]):
-        # Si no es datetime, intentar la conversión desde días desde 1899-12-30
-        try:
-            df["Fecha"] = pd.to_datetime("1899-12-30") + pd.to_timedelta(df["Fecha"].astype(float), unit="D")
-        except (ValueError, TypeError):
-            # Si falla, intentar convertir directamente a datetime
-            df["Fecha"] = pd.to_datetime(df["Fecha"])
-    
-    # Asegurarse de que los filtros de fecha sean datetime
-    date_from_dt = pd.to_datetime(date_from)
-    date_to_dt = pd.to_datetime(date_to)
-    
     # Eliminar filas sin fecha y aplicar filtros
-    df = df.dropna(subset=["Fecha"])
-    df = df[(df["Fecha"] >= date_from_dt) & (df["Fecha"] <= date_to_dt)]
-
+    validas = (fecha.notna() & date_range_mask(fecha, date_from, date_to)).to_numpy()
+    filas = np.flatnonzero(mantener)[validas]
 
+    # Único recorte de los datos: el resultado es propio y se completa en el lugar
+    df = df.take(filas)
+    df.columns = df.columns.str.strip()
+    df["Fecha"] = fecha.array[validas]
 
     # HL y cálculos por fila
     df["HL"] = df["Kg"] / 100
-    # Extraer el calibre numérico de los 'cc' y guardarlo en una nueva columna
-    # Extraer el calibre numérico de los 'cc', mantener NaN si no se encuentra y luego convertir a Int64 (que soporta NaN)
-    df['Calibre_CC'] = pd.to_numeric(df['Descripcion'].str.findall(r'(\d+)\s*cc').str[0], errors='coerce')
-
-    df["Calibre"] = df["Descripcion"].apply(extract_calibre)
-    df["Bultos"] = df["Descripcion"].apply(extract_bultos)
+    # Calibre numérico de los 'cc' (NaN si no se encuentra), calibre y bultos por unidad
+    df['Calibre_CC'] = attrs["Calibre_CC"].to_numpy()[filas]
+    df["Calibre"] = attrs["Calibre"].array[filas]
+    df["Bultos"] = attrs["Bultos"].to_numpy()[filas]
 
     # Bonificación y neto
     df["Bruto"] = df["NetoSD"]
     df["Neto"] = df["NetoSD"] * (1 - (df["PorcDescLinea"]/100))
 
-    # --- Etiquetado de canal SUBDISTRIBUIDOR por lista de clientes ---
-    # Si el Excel no trae este canal, lo generamos en base a la columna 'Nombre' o 'RazonSocial'.
-    subdist_lista = {
-        "nieto raul edgardo",
-        "distribuciones aldana s.r.l",
-        "palma jose lucas",
-        "crede fernando miguel",
-    }
-
-    def _norm(s):
-        import unicodedata
-        s = str(s) if pd.notna(s) else ""
-        s = ''.join(c for c in unicodedata.normalize('NFD', s) if unicodedata.category(c) != 'Mn')
-        return s.lower().strip()
-
-    # Fuente principal de nombre de cliente
-    nombre_col = None
-    for c in ["Nombre", "RazonSocial"]:
-        if c in df.columns:
-            nombre_col = c
-            break
+    # --- Canal forzado por reglas (ej. SUBDISTRIBUIDOR por lista de clientes) ---
+    # Las reglas se leen de canal_reglas.json y se resuelven por cliente (ver utils/channel_rules.py)
+    canal = channel_column(df, planes, reglas) if channel_rules else None
+    if canal is not None:
+        df["Canal"] = canal
 
-    if nombre_col is not None:
-        nombres_norm = df[nombre_col].apply(_norm)
-        mask_subdist = nombres_norm.isin(subdist_lista)
-
-        # Crear columna 'Canal' si no existe
-        if "Canal" not in df.columns:
-            df["Canal"] = "SIN_CANAL"
+    return df
 
-        # Asignar/forzar canal SUBDISTRIBUIDOR para esos clientes
-        df.loc[mask_subdist, "Canal"] = "SUBDISTRIBUIDOR"
+def summary_measures(df, date_to):
+    """
+    Sumas e indicadores por cliente en los que se basa el resumen global
+    (motor pandas; utils/duckdb_backend.py calcula lo mismo en SQL).
+    """
+    # Todas las métricas EXCEPTO HL usan el rango completo (ya viene filtrado por fechas y otros filtros)
 
-    return df
+    # Filas solo del último mes para HL y HL Proyectado
+    # IMPORTANTE: El último mes debe estar dentro del rango de fechas ya filtrado
+    ultimo_mes = pd.to_datetime(date_to).month
+    ultimo_anio = pd.to_datetime(date_to).year
+    mask_mes = (df["Fecha"].dt.month == ultimo_mes) & (df["Fecha"].dt.year == ultimo_anio)
+
+    medidas = {
+        # HL del último mes (dentro del rango) y acumulado del rango completo filtrado
+        "hl": df.loc[mask_mes, "Kg"].sum() / 100 if "Kg" in df.columns and mask_mes.any() else 0,
+        "hectolitro_real": df["Kg"].sum() / 100 if "Kg" in df.columns else 0,
+        "bruto": df["NetoSD"].sum(),
+        # El Neto se calcula sumando la columna 'Neto', que ya fue calculada en process_data
+        "neto": df["Neto"].sum(),
+        "total_bultos": df["Bultos"].sum() if "Bultos" in df.columns else 0,
+    }
+    # Indicadores por cliente: una sola pasada agrupada sobre los clientes (ver utils/kpis.py)
+    medidas.update(client_kpis(df))
+    return medidas
 
+@timed("summary")
 def build_global_summary(df, date_to, salidas_mes, salidas_actuales, cartera_manual):
     if df.empty:
         return pd.DataFrame()
 
-    # DataFrame completo para todas las métricas EXCEPTO HL (ya viene filtrado por fechas y otros filtros)
-    df_completo = df.copy()
-
-    # DataFrame solo del último mes para HL y HL Proyectado
-    # IMPORTANTE: El último mes debe estar dentro del rango de fechas ya filtrado
-    ultimo_mes = pd.to_datetime(date_to).month
-    ultimo_anio = pd.to_datetime(date_to).year
-    df_mes = df_completo[(df_completo["Fecha"].dt.month == ultimo_mes) &
-                         (df_completo["Fecha"].dt.year == ultimo_anio)].copy()
+    if BACKEND == "duckdb":
+        from utils import duckdb_backend
+        medidas = duckdb_backend.summary_measures(df, date_to)
+    else:
+        medidas = summary_measures(df, date_to)
 
     # 1. HL (UM pasa a ser HL) - Litros VENDIDOS = KG / 100 -> SOLO DEL ULTIMO MES (dentro del rango)
-    hl = df_mes["Kg"].sum() / 100 if "Kg" in df_mes.columns and not df_mes.empty else 0
+    hl = medidas["hl"]
 
     # 2. UM PROYECTADO = HectoLitro / salida * Salida del mes -> BASADO EN HL DEL ULTIMO MES
     hl_proyectado = (hl / salidas_actuales) * salidas_mes if salidas_actuales else 0
 
     # 3. HECTOLITROREAL = HECTOLITROREAL -> ACUMULADO DEL RANGO COMPLETO FILTRADO
-    hectolitro_real = df_completo["Kg"].sum() / 100 if "Kg" in df_completo.columns else 0
+    hectolitro_real = medidas["hectolitro_real"]
 
     # 4. % BONIFICACION = Sale la Bruto - Neto / Bruto -> DEL RANGO COMPLETO FILTRADO
-    bruto = df_completo["NetoSD"].sum()
-    # El Neto se calcula sumando la columna 'Neto', que ya fue calculada en process_data
-    neto = df_completo["Neto"].sum()
-    print(f"--- DEBUG: VALOR DE NETO CALCULADO: {neto} ---")
+    bruto = medidas["bruto"]
+    neto = medidas["neto"]
     porc_bonif = ((bruto - neto) / bruto * 100) if bruto else 0
 
-    # 5. Cálculo de clientes con compra (CCE) para diferentes categorías
-    def calcular_cce(df_filtrado):
-        return (
-            df_filtrado.groupby("CodigoCliente")["Kg"]
-            .sum()
-            .loc[lambda x: x > 0]
-            .count()
-        )
-
-    # CCE General (todos los productos)
-    clientes_con_compra = calcular_cce(df_completo)
-    
-    # CCE Agua Pura (Rubro = 'AGUA')
-    cce_agua_pura = 0
-    if 'Rubro' in df_completo.columns:
-        df_agua_pura = df_completo[df_completo['Rubro'].str.upper() == 'AGUA']
-        cce_agua_pura = calcular_cce(df_agua_pura)
-        print(f"DEBUG -> CCE Agua Pura: {cce_agua_pura} clientes")
-    
+    # 5-9. Indicadores por cliente (ver utils/kpis.py)
+    # CCE General (todos los productos), CCE Agua Pura (Rubro = 'AGUA') y
     # CCE Agua Saborizada (Rubro = 'SABORISADAS')
-    cce_agua_saborizada = 0
-    if 'Rubro' in df_completo.columns:
-        df_agua_saborizada = df_completo[df_completo['Rubro'].str.upper() == 'SABORISADAS']
-        cce_agua_saborizada = calcular_cce(df_agua_saborizada)
-        print(f"DEBUG -> CCE Agua Saborizada: {cce_agua_saborizada} clientes")
-        if not df_agua_saborizada.empty:
-            print(f"DEBUG -> Ejemplo de Rubros encontrados: {df_agua_saborizada['Rubro'].unique()}")
-        else:
-            print("DEBUG -> No se encontraron registros con Rubro = 'SABORISADAS'")
-            print(f"DEBUG -> Valores únicos en Rubro: {df_completo['Rubro'].dropna().unique()}")
-
-    # Debug información de clientes con compra
-    clientes_con_kg = df_completo[df_completo["Kg"] > 0].groupby('CodigoCliente')['Kg'].sum().reset_index()
-    print("DEBUG Cobertura -> Clientes con compra y sus kg:")
-    for _, row in clientes_con_kg.head(10).iterrows():  # Mostrar solo los primeros 10 para no saturar
-        print(f"Código: {row['CodigoCliente']}, Kg: {row['Kg']:.2f}")
-    print(f"... y {len(clientes_con_kg) - 10} clientes más" if len(clientes_con_kg) > 10 else "")
+    clientes_con_compra = medidas["cce"]
+    cce_agua_pura = medidas["cce_agua_pura"]
+    cce_agua_saborizada = medidas["cce_agua_saborizada"]
 
     cobertura = (clientes_con_compra / cartera_manual) if cartera_manual else 0
 
     # 6. Drop = SUMA(BULTOS) / CCE (clientes con compra) -> DEL RANGO COMPLETO FILTRADO
-    total_bultos = df_completo["Bultos"].sum() if "Bultos" in df_completo.columns else 0
+    total_bultos = medidas["total_bultos"]
     drop = total_bultos / clientes_con_compra if clientes_con_compra else 0
-    print(f"DEBUG Drop -> Total Bultos: {total_bultos}, CCE: {clientes_con_compra}, Drop: {drop}")
-
 
     # 8. Sabores por PV -> Solo LEVITE. Promedio de sabores distintos por CodigoCliente
     #    (equivale a Cantidad de sabores comprados por código / Total compradores)
     #    Se excluye explícitamente el sabor "limonada" del cálculo
-    if not df_completo.empty and "Marcas" in df_completo.columns and "Descripcion" in df_completo.columns:
-        marcas_norm = df_completo["Marcas"].astype(str).str.strip()
-        desc_norm = df_completo["Descripcion"].astype(str).str.lower()
-        
-        # Filtrar solo productos de marca LEVITE con ventas positivas
-        mask_levite = marcas_norm.str.contains(r"\bLEVITE\b", case=False, na=False)
-        df_levite = df_completo[mask_levite & (df_completo.get("Kg", 0) > 0)].copy()
-        
-        if not df_levite.empty:
-            # Denominador: compradores de LEVITE (con venta > 0)
-            compradores_levite = df_levite["CodigoCliente"].nunique()
-            print(f"DEBUG Sabores-PV Levite -> Compradores Levite: {compradores_levite}")
-
-            # Numerador: sabores distintos por cliente (solo si se logró identificar el sabor)
-            import re
-            extraido = df_levite["Descripcion"].astype(str).str.lower().str.extract(r"levite\s+([a-záéíóúñ]+(?:\s+[a-záéíóúñ]+)?)")[0]
-            df_levite["Sabor"] = extraido.fillna("").str.strip().str.title()
-            
-            # Filtrar sabores válidos (no vacíos y que no sean "limonada")
-            df_levite = df_levite[
-                (df_levite["Sabor"] != "") & 
-                (~df_levite["Sabor"].str.contains(r"limonada", case=False, na=False))
-            ]
-            
-            if not df_levite.empty:
-                sabores_por_cliente = df_levite.groupby("CodigoCliente")["Sabor"].nunique()
-                suma_sabores = sabores_por_cliente.sum()
-                print(f"DEBUG Sabores-PV Levite -> Suma de sabores distintos entre clientes (excluyendo 'limonada'): {suma_sabores}")
-                productos_por_cliente = (suma_sabores / compradores_levite) if compradores_levite > 0 else 0
-                print(f"DEBUG Sabores-PV Levite -> Resultado KPI (suma_sabores/compradores): {productos_por_cliente}")
-            else:
-                print("DEBUG Sabores-PV Levite -> No se encontraron sabores válidos después de excluir 'limonada'")
-                productos_por_cliente = 0
-        else:
-            print("DEBUG Sabores-PV Levite -> No hay datos válidos después de filtrar")
-            productos_por_cliente = 0
-    else:
-        print("DEBUG Sabores-PV Levite -> No se pudo calcular: faltan columnas requeridas")
+    compradores_levite = medidas["compradores_levite"]
+    suma_sabores = medidas["suma_sabores_levite"]
+    if compradores_levite is None or suma_sabores is None:
+        # Sin compras de Levite con sabor identificado
         productos_por_cliente = 0
-    # 9. CCC Ñandú -> Clientes con compra de 2 o 3 marcas entre: Heineken, Miller, Imperial Golden
-    import unicodedata
-    def _sin_acentos(s):
-        s = str(s) if pd.notna(s) else ""
-        return ''.join(c for c in unicodedata.normalize('NFD', s) if unicodedata.category(c) != 'Mn').lower().strip()
-
-    if {"Marcas", "Descripcion"}.issubset(df_completo.columns):
-        marcas_norm = df_completo["Marcas"].apply(_sin_acentos)
-        desc_norm = df_completo["Descripcion"].apply(_sin_acentos)
-
-        # Crear máscara para calibre 330 (buscando "330" en la descripción)
-        mask_calibre_330 = df_completo["Descripcion"].astype(str).str.contains(r"\b330\b", na=False)
-        
-        # Máscaras para cada marca de porrón
-        mask_heineken = marcas_norm.str.contains("heineken", na=False)
-        mask_miller = marcas_norm.str.contains("miller", na=False)
-        mask_imperial_golden = marcas_norm.str.contains("imperial", na=False) & desc_norm.str.contains("golden", na=False)
-
-        # Filtrar solo registros con calibre 330
-        df_ccu = df_completo[mask_calibre_330 & (df_completo.get("Kg", 0) > 0)].copy()
-        
-        print(f"DEBUG CCC Ñandú -> Total registros con calibre 330: {len(df_ccu)}")
-
-        # Etiquetar la marca del set objetivo
-        import numpy as np
-        # Asegurarse de que los índices coincidan
-        mask_heineken = mask_heineken.reindex(df_ccu.index, fill_value=False)
-        mask_miller = mask_miller.reindex(df_ccu.index, fill_value=False)
-        mask_imperial_golden = mask_imperial_golden.reindex(df_ccu.index, fill_value=False)
-        
-        # Usar string vacío como valor por defecto en lugar de np.nan
-        df_ccu["MarcaCCC"] = np.select(
-            [mask_heineken, mask_miller, mask_imperial_golden],
-            ["Heineken", "Miller", "Imperial Golden"],
-            default=""
-        )
-        df_ccu = df_ccu.dropna(subset=["MarcaCCC"])  # seguridad
-
-        # Primero filtramos clientes con Kg acumulado > 0
-        clientes_con_kg_positivo = df_ccu.groupby("CodigoCliente")["Kg"].sum()
-        clientes_con_kg_positivo = clientes_con_kg_positivo[clientes_con_kg_positivo > 0].index
-        
-        # Luego contamos marcas únicas solo para estos clientes
-        marcas_por_cliente = df_ccu[df_ccu["CodigoCliente"].isin(clientes_con_kg_positivo)]
-        marcas_por_cliente = marcas_por_cliente.groupby("CodigoCliente")["MarcaCCC"].nunique()
-        
-        # Finalmente contamos los que tienen 2 o más marcas
-        ccc_nandu = (marcas_por_cliente > 1).sum()
-
-        # Debug
-        print(f"DEBUG CCC Ñandú -> Heineken rows: {mask_heineken.sum()}, Miller rows: {mask_miller.sum()}, Imperial Golden rows: {mask_imperial_golden.sum()}")
-        print(f"DEBUG CCC Ñandú -> Clientes con 2+ marcas: {((marcas_por_cliente>=2)&(marcas_por_cliente<=3)).sum()}")
     else:
-        ccc_nandu = 0
+        productos_por_cliente = (suma_sabores / compradores_levite) if compradores_levite > 0 else 0
+
+    # 9. CCC Ñandú -> Clientes con compra de 2 o 3 marcas entre: Heineken, Miller, Imperial Golden
+    #    (calibre 330, Kg > 0)
+    ccc_nandu = medidas["ccc_nandu"] or 0
+
+    # Valores intermedios del resumen (solo con métricas activas, ver utils/metrics.py)
+    event(
+        "resumen_global", neto=neto, cce=clientes_con_compra, cce_agua_pura=cce_agua_pura,
+        cce_agua_saborizada=cce_agua_saborizada, total_bultos=total_bultos, drop=drop,
+        suma_sabores_levite=suma_sabores, compradores_levite=compradores_levite, ccc_nandu=ccc_nandu,
+    )
 
     # 10. Función del BRUTO -> DEL RANGO COMPLETO FILTRADO
     funcion_bruto = bruto
@@ -311,17 +212,11 @@ def build_global_summary(df, date_to, salidas_mes, salidas_actuales, cartera_man
         "HL Proyectado": round(hl_proyectado, 1),
         "HectoLitro Real (Acumulado)": round(hectolitro_real, 1),
         "% Bonificación": f"{porc_bonif:.1f}%",
-        "CCE (Clientes con compra)": round(clientes_con_compra, 1)
+        "CCE (Clientes con compra)": round(clientes_con_compra, 1),
+        "CCE Agua Pura": round(cce_agua_pura, 1),
+        "CCE Agua Saborizada": round(cce_agua_saborizada, 1),
     }
     
-    # Agregar CCE Agua Pura si existe
-    if 'cce_agua_pura' in locals():
-        resumen_dict["CCE Agua Pura"] = round(cce_agua_pura, 1)
-    
-    # Agregar CCE Agua Saborizada si existe
-    if 'cce_agua_saborizada' in locals():
-        resumen_dict["CCE Agua Saborizada"] = round(cce_agua_saborizada, 1)
-    
     # Continuar con el resto de las columnas
     resumen_dict.update({
         "Cartera": round(cartera_manual, 1),
@@ -340,6 +235,128 @@ def build_global_summary(df, date_to, salidas_mes, salidas_actuales, cartera_man
 
     return resumen
 
+@timed("yoy_tables")
+def yoy_tables(df):
+    """
+    Tablas interanuales para todos los meses de referencia a la vez:
+    - 'mensual': Volumen (HL) y CCC por Año y Mes.
+    - 'canal': Volumen y CCC por Año y Canal acumulados desde enero hasta cada Mes
+      (un cliente cuenta desde el primer mes en que compró en ese año y canal).
+    Con estas tablas, prepare_yoy_data para cualquier mes de referencia es una selección.
+
+    Los clientes distintos se cuentan sobre ids enteros factorizados con los
+    conteos de utils/kpis.py, sin agregaciones por grupo en Python.
+    """
+    fecha = pd.to_datetime(df['Fecha'])
+    base = pd.DataFrame({
+        'Año': fecha.dt.year.array,
+        'Mes': fecha.dt.month.array,
+        'Canal': df['Canal'].array,
+        'HL': df['HL'].array,
+    })
+    clientes, _ = pd.factorize(df['CodigoCliente'])
+    todas = np.ones(len(base), dtype=bool)
+
+    # Por Año y Mes: Volumen y clientes distintos de cada mes
+    por_mes = base.groupby(['Año', 'Mes'], observed=True)
+    mensual = por_mes.agg(Volumen=('HL', 'sum')).reset_index()
+    mensual['CCC'] = distinct_per_group(por_mes.ngroup().to_numpy(), clientes, todas, len(mensual))
+
+    # Por Año y Canal, acumulado por mes (columnas 1 a 12 de cada grupo)
+    por_canal = base.groupby(['Año', 'Canal'], observed=True)
+    grupos = por_canal.ngroup().to_numpy()
+    claves = por_canal.size().index.to_frame(index=False)
+    if isinstance(claves['Canal'].dtype, pd.CategoricalDtype):
+        # Canal compactado: las tablas para los gráficos vuelven a texto
+        claves['Canal'] = claves['Canal'].astype(claves['Canal'].cat.categories.dtype)
+    n_grupos = len(claves)
+    validas = (grupos >= 0) & base['Mes'].notna().to_numpy()
+    g = grupos[validas].astype(np.int64)
+    m = base['Mes'].to_numpy()[validas].astype(np.int64)
+    celda = g * 13 + m
+
+    hl = base['HL'].to_numpy(dtype=float)[validas]
+    volumen = np.bincount(celda, weights=np.where(np.isnan(hl), 0.0, hl), minlength=n_grupos * 13)
+    volumen = volumen.reshape(n_grupos, 13).cumsum(axis=1)
+
+    # Clientes nuevos de cada grupo por mes (primer mes con compra); acumulados = clientes distintos
+    altas = first_occurrence_counts(g, clientes[validas], m, n_grupos, 13)
+    ccc = altas.cumsum(axis=1)
+
+    # Un grupo aparece desde el primer mes con ventas (aunque no tenga clientes identificados)
+    primer_mes = np.full(n_grupos, 13, dtype=np.int64)
+    np.minimum.at(primer_mes, g, m)
+
+    meses = np.tile(np.arange(1, 13), n_grupos)
+    fila = np.repeat(np.arange(n_grupos), 12)
+    presente = meses >= primer_mes[fila]
+    canal = claves.iloc[fila[presente]].reset_index(drop=True)
+    canal['Mes'] = meses[presente]
+    canal['Volumen'] = volumen[:, 1:].ravel()[presente]
+    canal['CCC'] = ccc[:, 1:].ravel()[presente]
+
+    return {'mensual': mensual, 'canal': canal}
+
+
+def yoy_for_month(tablas, ref_month, ref_year=None):
+    """
+    Datos de los gráficos interanuales (yoy_data, channel_data) para un mes de
+    referencia. Con `ref_year` se descartan los años posteriores (tablas
+    calculadas con datos hasta una fecha más adelante).
+    """
+    mensual = tablas['mensual']
+    filas = mensual['Mes'] <= ref_month
+    if ref_year is not None:
+        filas &= mensual['Año'] <= ref_year
+    yoy_data = mensual[filas.to_numpy()].reset_index(drop=True)
+
+    canal = tablas['canal']
+    filas = canal['Mes'] == ref_month
+    if ref_year is not None:
+        filas &= canal['Año'] <= ref_year
+    channel_data = canal[filas.to_numpy()].drop(columns='Mes').reset_index(drop=True)
+    return yoy_data, channel_data
+
+
+def yoy_tables_cover(calculadas_hasta, date_to):
+    """
+    Indica si las tablas de yoy_tables calculadas sobre datos hasta
+    `calculadas_hasta` sirven para `date_to` (los mismos datos cortados en otra
+    fecha). Sirven para la misma fecha y para un fin de mes anterior: los meses
+    hasta el de `date_to` están completos en ambos cortes y yoy_for_month
+    descarta los posteriores. Un corte a mitad de mes se recalcula.
+    """
+    hasta, corte = pd.Timestamp(calculadas_hasta), pd.Timestamp(date_to)
+    return corte == hasta or (corte < hasta and (corte + pd.Timedelta(days=1)).day == 1)
+
+
+def cached_yoy_data(cache, clave, datos, date_to):
+    """
+    prepare_yoy_data reutilizando las tablas de todos los meses guardadas en
+    `cache` (ResultCache) bajo `clave`, que identifica los datos y filtros sin
+    date_to: mover date_to a un fin de mes anterior no las recalcula (ver
+    yoy_tables_cover). `datos` es una función que devuelve el DataFrame; solo
+    se llama si hay que calcular. Se guardan las del corte más adelante.
+    """
+    if BACKEND == "duckdb":
+        # El motor DuckDB calcula solo el mes pedido (ver utils/duckdb_backend.py)
+        return prepare_yoy_data(datos(), date_to)
+
+    guardadas = cache.get(clave)
+    if guardadas is None or not yoy_tables_cover(guardadas[0], date_to):
+        df = datos()
+        if df.empty:
+            return pd.DataFrame(), pd.DataFrame()
+        tablas = yoy_tables(df)
+        if guardadas is None or pd.Timestamp(date_to) > pd.Timestamp(guardadas[0]):
+            cache.put(clave, (pd.Timestamp(date_to), tablas))
+    else:
+        tablas = guardadas[1]
+    corte = pd.Timestamp(date_to)
+    return yoy_for_month(tablas, corte.month, corte.year)
+
+
+@timed("yoy")
 def prepare_yoy_data(df, date_to):
     """
     Prepara los datos para los gráficos de comparación interanual (YTD y mensual)
@@ -348,39 +365,9 @@ def prepare_yoy_data(df, date_to):
     if df.empty:
         return pd.DataFrame(), pd.DataFrame()
 
-    # Asegurarse de que la fecha es datetime
-    df['Fecha'] = pd.to_datetime(df['Fecha'])
-    
-    # Extraer año y mes
-    df['Año'] = df['Fecha'].dt.year
-    df['Mes'] = df['Fecha'].dt.month
-
-    # Tomar los años presentes en los datos
-    available_years = sorted(df['Año'].unique())
-    if not available_years:
-        # No hay datos para procesar
-        return pd.DataFrame(), pd.DataFrame()
-    
-    # Usar todos los años disponibles
-    df_comp = df[df['Año'].isin(available_years)].copy()
-
     # Calcular el mes de referencia (el mes de 'date_to')
     ref_month = pd.to_datetime(date_to).month
-
-    # --- Cálculos para el gráfico YTD (Volumen y CCC) ---
-    # Filtrar datos hasta el mes de referencia para ambos años
-    df_ytd = df_comp[df_comp['Mes'] <= ref_month].copy()
-
-    # Agrupar por Año y Mes
-    yoy_data = df_ytd.groupby(['Año', 'Mes']).agg(
-        Volumen=('HL', 'sum'),
-        CCC=('CodigoCliente', pd.Series.nunique)
-    ).reset_index()
-
-    # --- Cálculos para el desglose por Canal (YTD) ---
-    channel_data = df_ytd.groupby(['Año', 'Canal']).agg(
-        Volumen=('HL', 'sum'),
-        CCC=('CodigoCliente', pd.Series.nunique)
-    ).reset_index()
-
-    return yoy_data, channel_data
+    if BACKEND == "duckdb":
+        from utils import duckdb_backend
+        return duckdb_backend.prepare_yoy_data(df, ref_month)
+    return yoy_for_month(yoy_tables(df), ref_month)
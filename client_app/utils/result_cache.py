@@ -0,0 +1,171 @@
+# utils/result_cache.py
+"""
+Caché en memoria de resultados del dashboard (resumen, datos interanuales,
+figuras y Excel exportado) según el estado de los filtros.
+
+La clave es una forma canónica de (clave de datos, filtros elegidos,
+parámetros de proyección): el orden en que se eligieron los valores de un
+filtro no cambia la clave. Volver a una combinación de filtros reciente
+devuelve los resultados sin recalcularlos.
+
+La caché es una sola para todas las sesiones del proceso, así que la clave de
+datos (data_key) identifica el contenido de los archivos (SHA-256), no su
+nombre ni su tamaño: dos archivos distintos nunca comparten resultados.
+
+Se desalojan primero los menos usados (LRU), con un tope de entradas y de
+memoria estimada. Los resultados guardados se comparten entre ejecuciones:
+quien los use no debe modificarlos.
+"""
+import sys
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.config import RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_MAX_MB
+
+
+def canonical(valor):
+    """
+    Forma canónica y hasheable de un valor de la clave: los conjuntos y las
+    selecciones de filtros quedan ordenados, las fechas como Timestamp y los
+    números de numpy como números de Python.
+    """
+    if isinstance(valor, dict):
+        return tuple(sorted((str(k), canonical(v)) for k, v in valor.items()))
+    if isinstance(valor, (set, frozenset)):
+        return tuple(sorted((canonical(v) for v in valor), key=repr))
+    if isinstance(valor, (list, tuple)):
+        return tuple(canonical(v) for v in valor)
+    if isinstance(valor, (datetime, date, np.datetime64)):
+        return pd.Timestamp(valor)
+    if isinstance(valor, np.generic):
+        return valor.item()
+    return valor
+
+
+def data_key(modo_carga, huellas, date_from, date_to, version_datos=None, version_reglas=None):
+    """
+    Clave del dataset sobre el que se calculan los resultados: modo de carga,
+    huellas SHA-256 de los archivos subidos (utils.cache.upload_fingerprints),
+    rango de fechas, versión del histórico y versión de las reglas de canal.
+    """
+    return canonical((modo_carga, tuple(huellas), date_from, date_to, version_datos, version_reglas))
+
+
+def filter_key(estado_filtros, plan=None):
+    """
+    Clave canónica de los filtros elegidos ([(columna, valores), ...] y plan):
+    no depende del orden de los valores dentro de cada filtro.
+    """
+    return (tuple((col, canonical(frozenset(valores))) for col, valores in estado_filtros), plan)
+
+
+def estimate_size(obj, _vistos=None):
+    """Tamaño aproximado en bytes de un resultado (DataFrames, arreglos, figuras y contenedores)."""
+    vistos = _vistos if _vistos is not None else set()
+    if id(obj) in vistos:
+        return 0
+    vistos.add(id(obj))
+    if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        uso = obj.memory_usage(deep=True)
+        return int(uso.sum()) if isinstance(uso, pd.Series) else int(uso)
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (bytes, bytearray, str)):
+        return sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_size(v, vistos) for v in obj.values())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(estimate_size(v, vistos) for v in obj)
+    if hasattr(obj, "to_plotly_json"):
+        # Figuras Plotly: el tamaño de sus datos y layout
+        return estimate_size(obj.to_plotly_json(), vistos)
+    return sys.getsizeof(obj)
+
+
+# Marca de "sin resultado guardado" (un resultado guardado puede ser None)
+_FALTA = object()
+
+
+class ResultCache:
+    """Caché LRU de resultados con tope de entradas y de memoria estimada."""
+
+    def __init__(self, max_entries=RESULT_CACHE_MAX_ENTRIES, max_bytes=RESULT_CACHE_MAX_MB * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, clave, func):
+        """
+        Devuelve el resultado guardado para `clave` o lo calcula con `func()` y lo guarda.
+        Un resultado más grande que el tope de memoria se devuelve sin guardarlo.
+        """
+        valor = self.get(clave, _FALTA)
+        if valor is _FALTA:
+            valor = func()
+            self.put(clave, valor)
+        return valor
+
+    def get(self, clave, default=None):
+        """Resultado guardado para `clave`, o `default` (cuenta como acierto o fallo)."""
+        clave = canonical(clave)
+        with self._lock:
+            if clave in self._entradas:
+                self._entradas.move_to_end(clave)
+                self.hits += 1
+                return self._entradas[clave][0]
+            self.misses += 1
+        return default
+
+    def put(self, clave, valor):
+        """
+        Guarda `valor` para `clave` (reemplaza el anterior). Un resultado más
+        grande que el tope de memoria no se guarda.
+        """
+        clave = canonical(clave)
+        tamano = estimate_size(valor)
+        if tamano > self.max_bytes or self.max_entries <= 0:
+            return
+
+        with self._lock:
+            if clave in self._entradas:
+                self._bytes -= self._entradas.pop(clave)[1]
+            self._entradas[clave] = (valor, tamano)
+            self._bytes += tamano
+            while len(self._entradas) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, liberado) = self._entradas.popitem(last=False)
+                self._bytes -= liberado
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Estadísticas: entradas, bytes estimados, aciertos, fallos, desalojos y tasa de aciertos."""
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / consultas if consultas else 0.0,
+            }
+
+
+@st.cache_resource(show_spinner=False)
+def result_cache():
+    """Caché de resultados compartido por todas las sesiones del proceso."""
+    return ResultCache()
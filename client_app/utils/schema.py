@@ -0,0 +1,81 @@
+# utils/schema.py
+"""
+Esquema declarado de los archivos de ventas del ERP.
+Solo se leen las columnas que usa el pipeline, con tipos explícitos.
+"""
+import pandas as pd
+
+# Subir este número cuando cambie el esquema (invalida la caché de archivos)
+SCHEMA_VERSION = 1
+
+# Columna -> tipo al leer. None = se deja inferir (Fecha puede venir como
+# serial de Excel o como fecha; CodigoCliente como número o como texto).
+INPUT_SCHEMA = {
+    "Fecha": None,
+    "Kg": "float64",
+    "Kg_Lt": "float64",
+    "Descripcion": str,
+    "NetoSD": "float64",
+    "PorcDescLinea": "float64",
+    "CodigoCliente": None,
+    "RazonSocial": str,
+    "Nombre": str,
+    "Marcas": str,
+    "Rubro": str,
+    "Grupo": str,
+    "Canal": str,
+    "NomSupervisor": str,
+    "NomVendedor": str,
+}
+
+# Columnas sin las cuales el dashboard no puede funcionar
+REQUIRED_COLUMNS = [
+    "Fecha", "Kg", "Descripcion", "NetoSD", "PorcDescLinea", "CodigoCliente",
+    "RazonSocial", "Marcas", "Grupo", "NomSupervisor", "NomVendedor",
+]
+
+
+# Tipo que produce pandas al leer con dtype=str (object, o "str" desde pandas 3)
+_TEXT_DTYPE = pd.Series(dtype=str).dtype
+
+
+def as_text(s):
+    """Convierte una columna a texto manteniendo los nulos."""
+    texto = s.astype(object)
+    mask = s.notna()
+    texto[mask] = s[mask].astype(str)
+    return texto if _TEXT_DTYPE == object else texto.astype(_TEXT_DTYPE)
+
+
+def use_column(nombre):
+    """Filtro para `usecols`: solo las columnas declaradas en el esquema."""
+    return str(nombre).strip() in INPUT_SCHEMA
+
+
+def read_dtypes():
+    """Tipos explícitos para `pd.read_excel(dtype=...)`."""
+    return {col: tipo for col, tipo in INPUT_SCHEMA.items() if tipo is not None}
+
+
+def apply_schema(df):
+    """
+    Valida y normaliza un DataFrame leído del Excel:
+    nombres de columna sin espacios, columnas requeridas presentes y tipos declarados.
+    Lanza ValueError con la lista de columnas faltantes.
+    """
+    if not all(isinstance(c, str) and c == c.strip() for c in df.columns):
+        df = df.rename(columns=lambda c: str(c).strip())
+
+    faltantes = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if faltantes:
+        raise ValueError(
+            f"Faltan columnas requeridas: {', '.join(faltantes)}. "
+            f"Columnas encontradas: {', '.join(map(str, df.columns))}"
+        )
+
+    # Asegurar los tipos declarados (cuando el encabezado traía espacios,
+    # `dtype` no pudo aplicarse durante la lectura)
+    for col, tipo in read_dtypes().items():
+        if col in df.columns and df[col].dtype != pd.Series(dtype=tipo).dtype:
+            df[col] = as_text(df[col]) if tipo is str else df[col].astype(tipo)
+    return df
@@ -0,0 +1,374 @@
+# utils/store.py
+"""
+Histórico local de ventas ya procesadas.
+
+Las filas salen de process_data (con Calibre, Bultos, Neto, etc.) y se
+guardan en Parquet particionado por año/mes, con el Canal del ERP y el nombre
+del cliente tal como vienen: las reglas de canal (canal_reglas.json y planes)
+se aplican al leer, así que agregar o quitar una regla no obliga a reprocesar.
+
+    historico/anio=2024/mes=03/datos.parquet
+
+Al subir archivos nuevos solo se procesan los que no se habían cargado antes
+(se reconocen por la huella de su contenido) y solo se reescriben los meses que
+traen. Dentro de cada mes, las filas nuevas reemplazan a las guardadas de los
+días que cubren (de su primera a su última fecha): un archivo que vuelve a
+exportar esos días corrige lo cargado y los demás días del mes se conservan.
+Cada fila guarda la huella del archivo del que salió (columna _archivo) y el
+manifiesto lleva, por archivo, cuántas filas suyas quedan en cada mes.
+Cada ingesta lee el manifiesto, combina los meses y lo guarda con el histórico
+bloqueado (entre sesiones y entre procesos, ej. cli.py), así dos cargas de
+archivos distintos al mismo tiempo no se pisan.
+El dashboard lee el histórico, así que el trabajo diario es proporcional a los
+datos nuevos.
+"""
+import contextlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from utils.cache import file_bytes, fingerprint, normalize_for_parquet, upload_fingerprints, ROW_GROUP_SIZE
+from utils.channel_rules import channel_column, rules_version
+from utils.compact import compact_frame
+from utils.config import STORE_DIR
+from utils.cube import build_cube
+from utils.data_loader import _is_planes, parse_files, read_planes
+from utils.metrics import timed
+from utils.processor import process_data, exclude_families, filter_date_range
+
+MANIFEST = "manifest.json"
+
+# Archivo de bloqueo entre procesos (en STORE_DIR)
+LOCK_FILE = ".lock"
+
+# Formato de las particiones (subir si cambia lo que se guarda en cada fila).
+# 1: sin _archivo (cada mes subido reemplazaba al mes guardado); 2: con _archivo;
+# 3: Canal del ERP, sin las reglas de canal aplicadas
+STORE_FORMAT = 3
+
+# Primer formato que guarda el Canal sin reglas
+_RAW_CHANNEL_FORMAT = 3
+
+# Columna con la huella del archivo de origen de cada fila
+SOURCE_COLUMN = "_archivo"
+
+# Bloqueo entre las sesiones de este proceso (cada una corre en su hilo)
+_lock = threading.Lock()
+
+
+def _manifest_path():
+    return os.path.join(STORE_DIR, MANIFEST)
+
+
+def load_manifest():
+    """
+    Manifiesto del histórico: archivos ya cargados (por huella, con sus filas
+    por mes), número de versión, que aumenta con cada escritura, y formato de
+    las particiones (un histórico sin "formato" es del formato 1).
+    """
+    try:
+        with open(_manifest_path(), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {"version": 0, "formato": STORE_FORMAT, "archivos": {}}
+    manifest.setdefault("formato", 1)
+    return manifest
+
+
+def _save_manifest(manifest):
+    os.makedirs(STORE_DIR, exist_ok=True)
+    tmp = f"{_manifest_path()}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, _manifest_path())
+
+
+def _lock_file(f, bloquear):
+    """Bloquea (o libera) `f` para los demás procesos; espera si otro lo tiene."""
+    if os.name == "nt":
+        import msvcrt
+        f.seek(0)
+        if not bloquear:
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            return
+        while True:
+            try:
+                # LK_LOCK reintenta durante 10 segundos y después falla: se sigue esperando
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+    else:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX if bloquear else fcntl.LOCK_UN)
+
+
+@contextlib.contextmanager
+def _store_lock():
+    """Histórico bloqueado para escribir: entre hilos de este proceso y entre procesos."""
+    with _lock:
+        os.makedirs(STORE_DIR, exist_ok=True)
+        with open(os.path.join(STORE_DIR, LOCK_FILE), "a+b") as f:
+            _lock_file(f, True)
+            try:
+                yield
+            finally:
+                _lock_file(f, False)
+
+
+def store_version():
+    """Versión actual del histórico (sirve como clave de caché de lecturas)."""
+    return load_manifest()["version"]
+
+
+def _partition_dir(anio, mes):
+    return os.path.join(STORE_DIR, f"anio={anio:04d}", f"mes={mes:02d}")
+
+
+def _write_partition(anio, mes, df):
+    """Reemplaza la partición anio/mes con las filas dadas (escritura atómica)."""
+    carpeta = _partition_dir(anio, mes)
+    os.makedirs(carpeta, exist_ok=True)
+    destino = os.path.join(carpeta, "datos.parquet")
+    tmp = f"{destino}.{uuid.uuid4().hex}.tmp"
+    normalize_for_parquet(df).to_parquet(tmp, index=False, row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp, destino)
+
+
+def _merge_partition(anio, mes, nuevas):
+    """
+    Agrega filas a la partición anio/mes: las guardadas de los días que cubren
+    las nuevas (de su primera a su última fecha) se reemplazan y el resto se
+    conserva. Retorna las filas que quedan de cada archivo ({huella: filas}).
+    """
+    path = os.path.join(_partition_dir(anio, mes), "datos.parquet")
+    if os.path.exists(path):
+        guardadas = pd.read_parquet(path)
+        desde, hasta = nuevas["Fecha"].min().normalize(), nuevas["Fecha"].max().normalize()
+        reemplazadas = guardadas["Fecha"].dt.normalize().between(desde, hasta).to_numpy()
+        nuevas = pd.concat([guardadas[~reemplazadas], nuevas], ignore_index=True)
+    _write_partition(anio, mes, nuevas)
+    return nuevas[SOURCE_COLUMN].value_counts().to_dict()
+
+
+def list_partitions():
+    """Lista de (anio, mes, ruta) de las particiones guardadas, en orden cronológico."""
+    particiones = []
+    if not os.path.isdir(STORE_DIR):
+        return particiones
+    for dir_anio in sorted(os.listdir(STORE_DIR)):
+        if not dir_anio.startswith("anio="):
+            continue
+        for dir_mes in sorted(os.listdir(os.path.join(STORE_DIR, dir_anio))):
+            path = os.path.join(STORE_DIR, dir_anio, dir_mes, "datos.parquet")
+            if dir_mes.startswith("mes=") and os.path.exists(path):
+                particiones.append((int(dir_anio[5:]), int(dir_mes[4:]), path))
+    return particiones
+
+
+def ingest_files(files, max_workers=None, huellas=None):
+    """
+    Agrega al histórico los archivos de ventas que todavía no se cargaron.
+    files: lista de (nombre, bytes).
+    huellas: huellas SHA-256 de `files`, si ya se calcularon.
+    Los archivos se leen y procesan sin bloquear; la lectura del manifiesto, la
+    combinación de los meses y el guardado del manifiesto, con el histórico bloqueado.
+    Retorna (archivos_nuevos, particiones_escritas, errores).
+    """
+    manifest = load_manifest()
+    nuevos = []
+    for i, (name, data) in enumerate(files):
+        huella = huellas[i] if huellas is not None else fingerprint(data)
+        if huella not in manifest["archivos"] and all(huella != h for h, _, _ in nuevos):
+            nuevos.append((huella, name, data))
+    if not nuevos:
+        return [], [], []
+
+    dfs = []
+    cargados = []
+    errores = []
+    resultados = parse_files([(name, data) for _, name, data in nuevos], max_workers=max_workers)
+    for (huella, name, _), (_, resultado, error) in zip(nuevos, resultados):
+        if error is not None:
+            errores.append((name, error))
+            continue
+        dfs.append(resultado.assign(**{SOURCE_COLUMN: huella}))
+        cargados.append((huella, name))
+    if not dfs:
+        return [], [], errores
+
+    # Procesar solo lo nuevo, sin filtro de fechas ni reglas de canal
+    df = exclude_families(pd.concat(dfs, ignore_index=True))
+    df = process_data(df, None, None, channel_rules=False)
+
+    with _store_lock():
+        nombres, escritas = _write_ingested(df, cargados)
+    return nombres, escritas, errores
+
+
+def _write_ingested(df, cargados):
+    """
+    Combina en el histórico las filas procesadas `df` de los archivos
+    `cargados` ([(huella, nombre)]) y los registra en el manifiesto.
+    Se llama con el histórico bloqueado. Retorna (archivos_nuevos, particiones_escritas).
+    """
+    # Otra sesión o proceso pudo cargar alguno de estos archivos mientras se leían
+    manifest = load_manifest()
+    ya_cargados = {huella for huella, _ in cargados if huella in manifest["archivos"]}
+    if ya_cargados:
+        cargados = [(huella, name) for huella, name in cargados if huella not in ya_cargados]
+        df = df[~df[SOURCE_COLUMN].isin(ya_cargados).to_numpy()]
+    if not cargados:
+        return [], []
+
+    # Registrar los archivos en el manifiesto
+    ahora = datetime.now().isoformat()
+    for huella, name in cargados:
+        manifest["archivos"][huella] = {"nombre": name, "particiones": {}, "fecha_carga": ahora}
+
+    escritas = []
+    for (anio, mes), particion in df.groupby([df["Fecha"].dt.year, df["Fecha"].dt.month], sort=True):
+        periodo = f"{int(anio):04d}-{int(mes):02d}"
+        filas = _merge_partition(int(anio), int(mes), particion.reset_index(drop=True))
+        # Filas de cada archivo en el mes (las de archivos anteriores pueden haber sido reemplazadas)
+        for huella, registro in manifest["archivos"].items():
+            particiones = registro.get("particiones")
+            if not isinstance(particiones, dict):
+                # Histórico del formato 1: lista de meses sin conteos
+                particiones = registro["particiones"] = {p: None for p in particiones or []}
+            if filas.get(huella):
+                particiones[periodo] = int(filas[huella])
+            elif particiones.get(periodo, 0) is not None:
+                # (None: fila del formato 1, sin _archivo; no se sabe si quedó)
+                particiones.pop(periodo, None)
+        escritas.append(periodo)
+    manifest["version"] += 1
+    _save_manifest(manifest)
+    return [name for _, name in cargados], escritas
+
+
+@timed("load_store")
+def read_store(date_from=None, date_to=None):
+    """
+    Lee el histórico (filas ya procesadas). Con un rango de fechas solo se abren
+    los meses que se cruzan con el rango y, dentro de cada uno, solo los grupos
+    de filas con fechas del rango.
+    """
+    desde = pd.Timestamp(date_from) if date_from is not None else None
+    hasta = pd.Timestamp(date_to) if date_to is not None else None
+    filtros = []
+    if desde is not None:
+        filtros.append(("Fecha", ">=", desde))
+    if hasta is not None:
+        filtros.append(("Fecha", "<=", hasta))
+
+    partes = []
+    for anio, mes, path in list_partitions():
+        inicio_mes = pd.Timestamp(anio, mes, 1)
+        if hasta is not None and inicio_mes > hasta:
+            continue
+        if desde is not None and inicio_mes + pd.offsets.MonthBegin(1) <= desde:
+            continue
+        partes.append(pd.read_parquet(path, filters=filtros or None))
+    if not partes:
+        return pd.DataFrame()
+    df = pd.concat(partes, ignore_index=True)
+    return df.drop(columns=[SOURCE_COLUMN]) if SOURCE_COLUMN in df.columns else df
+
+
+def clear_store():
+    """Borra el histórico completo."""
+    with _lock:
+        if os.path.isdir(STORE_DIR):
+            shutil.rmtree(STORE_DIR)
+
+
+@st.cache_data(show_spinner="Leyendo histórico...")
+def _read_store_cached(version, date_from, date_to, reglas_version=None, planes=None):
+    # `version` y `reglas_version` solo forman parte de la clave: cambian cada vez
+    # que se escribe el histórico o se editan las reglas de canal
+    df = read_store(date_from, date_to)
+    if df.empty:
+        return df
+    # Filas compactadas antes de armar el cubo, como en load_sales_cube
+    df = compact_frame(filter_date_range(df, date_from, date_to))
+    # Reglas de canal vigentes (las de plan necesitan el archivo de PLANES) sobre
+    # el Canal del ERP, por fila: las de nombre usan Nombre, que el cubo no guarda
+    canal = channel_column(df, planes)
+    if canal is not None:
+        df = df.assign(Canal=canal)
+    return build_cube(df)
+
+
+@st.cache_data(show_spinner=False)
+def _read_planes_cached(huella, name, _data):
+    # PLANES se lee una vez por contenido (`huella`); el error vuelve como texto
+    try:
+        return read_planes(name, _data), None
+    except Exception as e:
+        return None, str(e)
+
+
+@st.cache_data(show_spinner="Actualizando histórico...")
+def _ingest_cached(huellas, _files):
+    # Una sola ingesta por conjunto de archivos pendientes: un archivo que no se
+    # puede leer no se vuelve a parsear en cada ejecución
+    nuevos, escritas, errores = ingest_files(_files, huellas=list(huellas))
+    return nuevos, escritas, [(name, str(error)) for name, error in errores]
+
+
+def load_from_store(uploaded_files, date_from, date_to, huellas=None):
+    """
+    Carga los archivos nuevos al histórico y devuelve el cubo del rango de fechas.
+    huellas: huellas SHA-256 de `uploaded_files` (utils.cache.upload_fingerprints),
+    si ya se calcularon. Los archivos que ya están en el histórico no se leen.
+    Retorna: (cubo, dict_planes_o_None)
+    """
+    archivos = list(uploaded_files or [])
+    if huellas is None:
+        huellas = upload_fingerprints(archivos)
+    manifest = load_manifest()
+    cargados = manifest["archivos"]
+    if cargados and manifest["formato"] < _RAW_CHANNEL_FORMAT:
+        st.warning(
+            "⚠️ El histórico se armó con una versión anterior: sus filas ya tienen aplicadas las "
+            "reglas de canal de ese momento, y quitar una regla no las revierte. Borrá el histórico "
+            "y volvé a cargar los archivos para que el canal siga a canal_reglas.json."
+        )
+
+    planes_data = None
+    pendientes = []
+    for file, huella in zip(archivos, huellas):
+        if _is_planes(file.name):
+            planes_data, error = _read_planes_cached(huella, file.name, file_bytes(file))
+            if planes_data is None:
+                st.error(f"Error procesando archivo de planes: {error}")
+            else:
+                st.info(f"Archivo de planes cargado: {file.name}")
+            continue
+        if huella not in cargados:
+            pendientes.append((huella, file.name, file_bytes(file)))
+
+    if pendientes:
+        huellas_pendientes = tuple(huella for huella, _, _ in pendientes)
+        archivos_pendientes = [(name, data) for _, name, data in pendientes]
+        nuevos, escritas, errores = _ingest_cached(huellas_pendientes, archivos_pendientes)
+        # Un archivo que se leyó bien pero no está en el manifiesto (ej. el histórico se
+        # borró después de la carga guardada en caché) no cuenta como cargado: se vuelve a cargar
+        con_error = {name for name, _ in errores}
+        en_manifiesto = load_manifest()["archivos"]
+        if any(huella not in en_manifiesto and name not in con_error for huella, name, _ in pendientes):
+            _ingest_cached.clear()
+            nuevos, escritas, errores = _ingest_cached(huellas_pendientes, archivos_pendientes)
+        for name, error in errores:
+            st.error(f"❌ Error leyendo {name}: {error}")
+        if nuevos:
+            st.success(f"📚 Histórico actualizado con {len(nuevos)} archivo(s): meses {', '.join(escritas)}")
+
+    return _read_store_cached(store_version(), date_from, date_to, rules_version(), planes_data), planes_data
@@ -0,0 +1,178 @@
+# utils/streaming.py
+"""
+Modo streaming para historiales grandes (varios años de ventas).
+
+Los archivos se leen de a bloques de filas (openpyxl en modo solo lectura o
+iteración de filas de pyxlsb). Cada bloque pasa por process_data y se reduce a
+un agregado parcial; los parciales se combinan entre sí, de modo que el consumo
+de memoria queda acotado por el tamaño del bloque y por la cantidad de
+combinaciones distintas, no por el tamaño de los archivos.
+
+El agregado es el mismo cubo que arma utils/cube.py en los demás modos
+(una fila por combinación de cliente, producto, canal, etc. y mes), así que
+build_global_summary, prepare_yoy_data, los filtros y los exportadores
+funcionan sin cambios y dan los mismos resultados. El agregado final se
+compacta (utils/compact.py) como el cubo de los demás modos; los bloques no,
+porque ya ocupan poco y cada uno tendría sus propias categorías.
+"""
+from io import BytesIO
+
+import pandas as pd
+import streamlit as st
+
+from utils.cache import file_bytes
+from utils.compact import compact_frame
+from utils.config import STREAM_CHUNK_ROWS
+from utils.cube import build_cube, merge_cubes
+from utils.data_loader import _engine_for, _is_planes, read_planes, date_bounds, cell_in_range
+from utils.metrics import timed
+from utils.processor import process_data, exclude_families
+from utils.schema import use_column, read_dtypes, apply_schema, as_text
+
+# Valores que pandas interpreta como nulos por defecto al leer un Excel
+NA_VALUES = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+}
+
+# Cada cuántas filas acumuladas se combinan los parciales
+_MERGE_EVERY_ROWS = 500_000
+
+
+def _cell(valor):
+    """Convierte una celda igual que pandas al leer un Excel."""
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    if isinstance(valor, str) and valor in NA_VALUES:
+        return None
+    return valor
+
+
+def _iter_rows(name, data):
+    """Itera las filas de la primera hoja como tuplas de valores."""
+    engine = _engine_for(name)
+    if engine == "pyxlsb":
+        from pyxlsb import open_workbook
+        with open_workbook(BytesIO(data)) as wb:
+            with wb.get_sheet(1) as sheet:
+                for row in sheet.rows():
+                    yield tuple(c.v for c in row)
+    elif engine == "xlrd":
+        # xlrd siempre carga el libro completo (y un .xls no supera las 65.536 filas)
+        df = pd.read_excel(BytesIO(data), engine="xlrd", header=None)
+        for row in df.itertuples(index=False, name=None):
+            yield tuple(None if pd.isna(v) else v for v in row)
+    else:
+        from openpyxl import load_workbook
+        wb = load_workbook(BytesIO(data), read_only=True, data_only=True, keep_links=False)
+        try:
+            for row in wb.worksheets[0].iter_rows(values_only=True):
+                yield row
+        finally:
+            wb.close()
+
+
+def iter_excel_chunks(name, data, chunk_rows=None, date_from=None, date_to=None):
+    """
+    Lee un archivo de ventas de a bloques de `chunk_rows` filas.
+    Solo se leen las columnas del esquema declarado; si falta una columna
+    requerida se lanza ValueError antes de leer los datos.
+    Con un rango de fechas, las filas que caen afuera se descartan durante la
+    lectura, sin convertir el resto de sus celdas.
+    """
+    chunk_rows = chunk_rows or STREAM_CHUNK_ROWS
+    filas = _iter_rows(name, data)
+    encabezado = next(filas, None)
+    if encabezado is None:
+        return
+
+    indices = [i for i, col in enumerate(encabezado) if col is not None and use_column(col)]
+    columnas = [str(encabezado[i]).strip() for i in indices]
+    # Validar el encabezado antes de recorrer el archivo
+    apply_schema(pd.DataFrame(columns=columnas))
+    dtypes = {col: tipo for col, tipo in read_dtypes().items() if col in columnas}
+
+    desde, hasta = date_bounds(date_from, date_to)
+    i_fecha = indices[columnas.index("Fecha")]
+    filtrar = desde is not None or hasta is not None
+
+    bloque = []
+    for row in filas:
+        if filtrar and i_fecha < len(row) and not cell_in_range(row[i_fecha], desde, hasta):
+            continue
+        valores = [_cell(row[i]) if i < len(row) else None for i in indices]
+        if all(v is None for v in valores):
+            continue
+        bloque.append(valores)
+        if len(bloque) >= chunk_rows:
+            yield _to_frame(bloque, columnas, dtypes)
+            bloque = []
+    if bloque:
+        yield _to_frame(bloque, columnas, dtypes)
+
+
+def _to_frame(bloque, columnas, dtypes):
+    df = pd.DataFrame(bloque, columns=columnas)
+    for col, tipo in dtypes.items():
+        df[col] = as_text(df[col]) if tipo is str else df[col].astype(tipo)
+    return df
+
+
+@timed("load_streaming")
+def stream_process(files, date_from, date_to, chunk_rows=None, planes=None):
+    """
+    Procesa archivos de ventas de a bloques y devuelve el agregado final.
+    files: lista de (nombre, bytes) de archivos de ventas.
+    planes: {plan: [códigos]} para las reglas de canal por plan (opcional).
+    Retorna (agregado, errores) donde errores es una lista de (nombre, excepción).
+    """
+    parciales = []
+    errores = []
+    for name, data in files:
+        # Los parciales de un archivo solo se suman si el archivo se leyó completo
+        parciales_archivo = []
+        try:
+            for chunk in iter_excel_chunks(name, data, chunk_rows, date_from, date_to):
+                chunk = exclude_families(chunk)
+                if chunk.empty:
+                    continue
+                procesado = process_data(chunk, date_from, date_to, planes)
+                parcial = build_cube(procesado)
+                if parcial.empty:
+                    continue
+                parciales_archivo.append(parcial)
+                if sum(len(p) for p in parciales_archivo) > _MERGE_EVERY_ROWS:
+                    parciales_archivo = [merge_cubes(parciales_archivo)]
+        except Exception as e:
+            errores.append((name, e))
+            continue
+        parciales = [merge_cubes(parciales + parciales_archivo)]
+    return merge_cubes(parciales), errores
+
+
+@st.cache_data(show_spinner="Procesando archivos por bloques...")
+def load_multiple_excels_streaming(uploaded_files, date_from, date_to, chunk_rows=None, reglas_version=None):
+    """
+    Variante de load_multiple_excels + process_data para el modo streaming.
+    `reglas_version` (reglas de canal vigentes) solo forma parte de la clave.
+    El agregado se guarda compactado, como el cubo de load_sales_cube.
+    Retorna: (DataFrame_agregado_procesado, dict_planes_o_None)
+    """
+    planes_data = None
+    ventas = []
+    for file in uploaded_files:
+        if _is_planes(file.name):
+            try:
+                planes_data = read_planes(file.name, file_bytes(file))
+            except Exception as e:
+                st.error(f"Error procesando archivo de planes: {str(e)}")
+                planes_data = None
+            else:
+                st.info(f"Archivo de planes cargado: {file.name}")
+            continue
+        ventas.append((file.name, file_bytes(file)))
+
+    df, errores = stream_process(ventas, date_from, date_to, chunk_rows, planes_data)
+    for name, error in errores:
+        st.error(f"❌ Error leyendo {name}: {str(error)}")
+    return compact_frame(df), planes_data